@@ -1,5 +1,11 @@
-from flask import Flask, request, jsonify, render_template
+import atexit
+import json
+import os
+
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from main import Agent
+from module.nlu_cache import NLUCache
+from module.session_store import SessionStore
 from flask_cors import CORS  # Se o frontend for separado
 import logging
 
@@ -8,7 +14,19 @@ logging.getLogger("watchdog").setLevel(logging.WARNING)
 app = Flask(__name__, template_folder='/workspaces/IC-2025/agent')
 CORS(app)  # Permite requisições do frontend (CORS)
 
-agent = Agent(llm=True)
+# AGENT_FUSED_FRONTEND=1 ativa o front-end fundido (filtro, NLU e domínio do RAG em uma única chamada ao LLM)
+# Sessões dos usuários: AGENT_SESSION_TTL (segundos de inatividade), AGENT_MAX_SESSIONS e, opcionalmente,
+# AGENT_SESSION_DB (arquivo SQLite em que as sessões removidas da memória são serializadas)
+sessions = SessionStore(
+    ttl_seconds=float(os.getenv("AGENT_SESSION_TTL", "1800")),
+    max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "1000")),
+    path=os.getenv("AGENT_SESSION_DB"),
+)
+atexit.register(sessions.close)
+# AGENT_NLU_CACHE: arquivo JSON em que o cache das análises do NLU é persistido entre reinícios (opcional)
+nlu_cache = NLUCache(path=os.getenv("AGENT_NLU_CACHE"))
+atexit.register(nlu_cache.close)
+agent = Agent(llm=True, fused_frontend=os.getenv("AGENT_FUSED_FRONTEND") == "1", sessions=sessions, nlu_cache=nlu_cache)
 
 @app.route('/')
 def home():
@@ -21,8 +39,34 @@ def chat():
     if not user_message:
         return jsonify({'error': 'Mensagem vazia'}), 400
 
-    responses = agent.chat(user="local", text=user_message)
+    user = _session_id(data)
+
+    # Streaming (Server-Sent Events) quando solicitado pelo cliente
+    if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+        return Response(
+            stream_with_context(_sse(agent.chat_stream(user=user, text=user_message))),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    responses = agent.chat(user=user, text=user_message)
     return jsonify({'responses': responses})
 
+def _session_id(data: dict) -> str:
+    """ID da sessão do usuário: campo "session_id" do corpo, cabeçalho X-Session-Id ou, na falta deles, o IP."""
+    return str(data.get('session_id') or request.headers.get('X-Session-Id') or request.remote_addr or 'local')
+
+def _sse(events):
+    """Serializa os eventos de Agent.chat_stream no formato Server-Sent Events, terminando com o evento "done"."""
+    try:
+        for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        logging.error(f"Erro durante o streaming da resposta: {e}")
+        yield f"event: error\ndata: {json.dumps({'type': 'error', 'error': 'Erro ao gerar a resposta'})}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Servidor de desenvolvimento (FLASK_DEBUG=1 ativa o modo debug). Em produção, use server.py (ASGI, com pool
+    # de workers, controle de admissão, timeouts e /metrics)
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", threaded=True)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Benchmark do contexto do diálogo (BeliefTracker) em sessões longas.
+
+Compara a implementação anterior (deque percorrida inteira com pop/appendleft em cada busca, reset e
+reordenação) com o contexto indexado por (intenção, operação). Cada turno atualiza três estados já existentes
+e reseta um, e os dois rastreadores precisam terminar com o mesmo contexto.
+
+Uso (a partir de agent/):
+    python -m benchmarks.bench_belief_tracker [--states 10000] [--turns 200]
+"""
+import argparse
+import logging
+import random
+import time
+from collections import deque
+
+from model.intent import Intent
+from model.semantic_document import SemanticDocument
+from model.state import State
+from module.bt import BeliefTracker
+
+
+class LegacyBeliefTracker(BeliefTracker):
+    """Implementação anterior do contexto (deque), mantida aqui como referência."""
+
+    def __init__(self, user: str):
+        self.deque_context: deque[State] = deque()
+        self.user = user
+
+    @property
+    def context(self) -> list[State]:
+        return list(self.deque_context)
+
+    def update_state(self, semantic_doc: SemanticDocument) -> list[State]:
+        for state in self.deque_context:
+            state.current = False
+        for intent, operation, question in zip(semantic_doc.intents, semantic_doc.operations, semantic_doc.questions):
+            if not self.deque_context:
+                self.deque_context.append(self._fill_state(State(intent, operation, question), semantic_doc))
+            elif not intent:
+                state = self._fill_state(self.deque_context.pop(), semantic_doc)
+                state.update_question(question)
+                state.current = True
+                self.deque_context.append(state)
+            else:
+                state = self._find_same_context_state(intent, operation)
+                if not state:
+                    state = self._fill_state(State(intent, operation, question), semantic_doc)
+                state.current = True
+                state = self._fill_state(state, semantic_doc)
+                state.update_question(question)
+                self.deque_context.append(state)
+        self._sort_context(semantic_doc)
+        return list(self.deque_context)
+
+    def reset(self, intent: Intent, operation: str):
+        for _ in range(len(self.deque_context)):
+            state = self.deque_context.pop()
+            if state.intent == intent and state.operation == operation:
+                continue
+            self.deque_context.appendleft(state)
+
+    def _sort_context(self, semantic_doc: SemanticDocument):
+        priority_state = []
+        for _ in range(len(self.deque_context)):
+            state = self.deque_context.pop()
+            if state.current:
+                priority_state.append(state)
+                continue
+            self.deque_context.appendleft(state)
+        for state in priority_state:
+            self.deque_context.append(state)
+
+    def _find_same_context_state(self, intent: Intent, operation: str) -> State:
+        same_context_state = None
+        for _ in range(len(self.deque_context)):
+            state = self.deque_context.pop()
+            if self._is_same_context(intent, operation, state):
+                same_context_state = state
+            else:
+                self.deque_context.appendleft(state)
+        return same_context_state
+
+
+def document(intents: list, operations: list) -> SemanticDocument:
+    return SemanticDocument(
+        intents=intents, operations=operations, questions=[f"pergunta {op}" for op in operations],
+        entities=[], sentiment="", domain="", dependent=False, out_of_context=False,
+    )
+
+
+def populate(tracker: BeliefTracker, total_states: int) -> None:
+    # Um único turno com todos os estados: as duas implementações partem do mesmo contexto
+    operations = [f"op{i}" for i in range(total_states)]
+    tracker.update_state(document([Intent.QUESTION] * total_states, operations))
+
+
+def run(tracker: BeliefTracker, total_states: int, turns: int, seed: int) -> float:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(turns):
+        operations = [f"op{rng.randrange(total_states)}" for _ in range(3)]
+        tracker.update_state(document([Intent.QUESTION] * 3, operations))
+        reset = f"op{rng.randrange(total_states)}"
+        tracker.reset(Intent.QUESTION, reset)
+        # O estado resetado volta, para manter o tamanho da sessão
+        tracker.update_state(document([Intent.QUESTION], [reset]))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--states", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.disable(logging.DEBUG)
+
+    results = {}
+    contexts = {}
+    for name, cls in (("deque (anterior)", LegacyBeliefTracker), ("indexado", BeliefTracker)):
+        tracker = cls("bench")
+        populate(tracker, args.states)
+        elapsed = run(tracker, args.states, args.turns, args.seed)
+        results[name] = elapsed
+        contexts[name] = [(state.intent, state.operation, state.current) for state in tracker.context]
+
+    assert len({tuple(context) for context in contexts.values()}) == 1, "Os contextos finais divergem"
+
+    print(f"{args.states} estados, {args.turns} turnos (2 atualizações e 1 reset por turno)")
+    for name, elapsed in results.items():
+        print(f"  {name:<18} {elapsed * 1000:10.1f} ms  {elapsed / args.turns * 1e6:10.1f} us/turno")
+    baseline, indexed = results.values()
+    print(f"  ganho: {baseline / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark do NLU baseado em regras (module/nlu.py), em mensagens por segundo.
+
+Processa repetidamente um conjunto de mensagens típicas (saudações, perguntas com várias sentenças, pedidos de
+transferência com entidades) e reporta a vazão e a latência média por mensagem.
+
+Uso (a partir de agent/):
+    python -m benchmarks.bench_nlu [--messages 20000]
+"""
+import argparse
+import logging
+import time
+
+from model.input_message import InputMessage
+from module.nlu import NLU
+
+MESSAGES = [
+    "Olá, bom dia!",
+    "Qual o meu saldo?",
+    "O que é um PIX? E qual a diferença para a TED?",
+    "Quero fazer uma transferência por doc. Depois preciso pagar um boleto.",
+    "tchau",
+    "Bom dia! Qual o saldo da minha conta corrente? O que acontece se eu fizer um pix agora...",
+    "Não consegui acessar o aplicativo ontem à noite, aparece um erro na tela de login.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    nlu = NLU()
+    inputs = [InputMessage(message=MESSAGES[i % len(MESSAGES)], user="bench") for i in range(args.messages)]
+    nlu.process(inputs[0])
+
+    start = time.perf_counter()
+    for message in inputs:
+        nlu.process(message)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.messages} mensagens em {elapsed:.2f}s")
+    print(f"  {args.messages / elapsed:,.0f} mensagens/s  {elapsed / args.messages * 1e6:.1f} us/mensagem")
+
+
+if __name__ == "__main__":
+    main()
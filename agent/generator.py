@@ -1,10 +1,12 @@
 import logging
 import os
 
-from openai import OpenAI
 from dotenv import load_dotenv
 import re
 
+from agent.llm_client import GEMINI_BASE_URL, LLMClientFactory, get_default_factory
+from agent.llm_policy import LLMCallPolicy
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -15,14 +17,20 @@ logging.basicConfig(
 load_dotenv()
 
 class Generator:
-    def __init__(self, model_name="gemini-2.0-flash", max_tokens: int = 1024, temperature: float = 0.7, device=None):
+    def __init__(self, model_name="gemini-2.0-flash", max_tokens: int = 1024, temperature: float = 0.7, device=None,
+                 policy: LLMCallPolicy = None, base_url: str = GEMINI_BASE_URL, api_key: str = None,
+                 client_factory: LLMClientFactory = None):
         """
         Inicializa a classe NLU e configura o cliente para a API do Gemini (via SDK da OpenAI).
+
+        As chamadas seguem a política informada (timeouts, novas tentativas com backoff e hedging; ver
+        LLMCallPolicy). base_url e api_key permitem apontar para outro servidor compatível com a OpenAI. Os clientes
+        vêm de client_factory (por padrão, a fábrica compartilhada do processo) e reaproveitam o seu pool de conexões.
         """
         logging.info("Inicializando a classe NLU ...")
 
         # Carregar chave da API Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not api_key:
             logging.error("GEMINI_API_KEY não encontrado nas variáveis de ambiente.")
             raise ValueError("GEMINI_API_KEY não encontrado.")
@@ -30,16 +38,25 @@ class Generator:
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.policy = policy if policy else LLMCallPolicy()
+        self.client_factory = client_factory if client_factory else get_default_factory()
+        self._api_key = api_key
+        self._base_url = base_url
 
+        # Cliente OpenAI compatível com Gemini, no pool compartilhado. As novas tentativas do SDK ficam desativadas:
+        # quem repete é a política
+        self.client = self.client_factory.openai(api_key, base_url, timeout=self.policy.timeout())
 
+        logging.info(f"Modelo '{model_name}' configurado com sucesso para uso com Gemini.")
 
-        # Cliente OpenAI compatível com Gemini
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+    @staticmethod
+    def _validate_messages(messages):
+        if not isinstance(messages, list) or not messages:
+            raise ValueError("Formato inválido para 'messages'.")
 
-        logging.info(f"Modelo '{model_name}' configurado com sucesso para uso com Gemini.")
+        for msg in messages:
+            if not msg.get("role") or not msg.get("content"):
+                raise ValueError("Cada mensagem deve conter 'role' e 'content' não nulos.")
 
     def generate_answer(self, messages):
         """
@@ -64,26 +81,79 @@ class Generator:
         logging.info("___ Gerando texto com o modelo Gemini ...")
 
         try:
-            # Validação de mensagens
-            if not isinstance(messages, list) or not messages:
-                raise ValueError("Formato inválido para 'messages'.")
+            self._validate_messages(messages)
+
+            # Chamada à API
+            response = self.policy.call(lambda: self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            ))
+
+            generated_text = response.choices[0].message.content.strip()
+            logging.info(f"___ Texto gerado: {generated_text}")
+            return generated_text
+
+        except Exception as e:
+            # A exceção é propagada: a mensagem de erro não pode ser tratada (nem armazenada em cache) como resposta
+            logging.error(f"Erro ao gerar texto: {e}")
+            raise
 
-            for msg in messages:
-                if not msg.get("role") or not msg.get("content"):
-                    raise ValueError("Cada mensagem deve conter 'role' e 'content' não nulos.")
+    def generate_answer_stream(self, messages):
+        """
+        Versão em streaming de generate_answer: retorna um iterador com os trechos de texto à medida que o
+        modelo os gera. As mensagens seguem o mesmo formato de generate_answer.
+        """
+        logging.info("___ Gerando texto em streaming com o modelo Gemini ...")
+
+        try:
+            self._validate_messages(messages)
+
+            # Chamada à API. Apenas a abertura do streaming é repetida: depois do primeiro trecho entregue, uma
+            # nova tentativa duplicaria o texto
+            stream = self.policy.call(lambda: self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            ), hedge=False)
+
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            # Como em generate_answer, a exceção é propagada para que a mensagem de erro não chegue à resposta
+            logging.error(f"Erro ao gerar texto em streaming: {e}")
+            raise
+
+    async def agenerate_answer(self, messages):
+        """
+        Versão assíncrona de generate_answer, com o cliente AsyncOpenAI: não bloqueia o event loop enquanto
+        aguarda o modelo. As mensagens seguem o mesmo formato de generate_answer.
+        """
+        logging.info("___ Gerando texto (async) com o modelo Gemini ...")
+
+        try:
+            self._validate_messages(messages)
 
             # Chamada à API
-            response = self.client.chat.completions.create(
+            # Cliente assíncrono sobre o pool do event loop atual
+            async_client = self.client_factory.async_openai(self._api_key, self._base_url, timeout=self.policy.timeout())
+            response = await self.policy.acall(lambda: async_client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
-            )
+            ))
 
             generated_text = response.choices[0].message.content.strip()
             logging.info(f"___ Texto gerado: {generated_text}")
             return generated_text
 
         except Exception as e:
+            # Como em generate_answer, a exceção é propagada
             logging.error(f"Erro ao gerar texto: {e}")
-            return str(e)
\ No newline at end of file
+            raise
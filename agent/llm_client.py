@@ -0,0 +1,115 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+
+@dataclass
+class LLMSettings:
+    """Modelo e parâmetros de geração de um uso do LLM ("generation", "nlu", "filter")."""
+    model_name: str = "gemini-2.0-flash"
+    max_tokens: int = 1024
+    temperature: float = 0.7
+
+
+class LLMClientFactory:
+    """
+    Fábrica dos clientes OpenAI (API compatível do Gemini) usados pelo agente e pelo RAG.
+
+    Todos os clientes criados pela fábrica compartilham um único pool de conexões httpx, com keep-alive, HTTP/2
+    (quando o pacote h2 está instalado) e limites de conexões: as chamadas de um turno (filtro, NLU, seleção de
+    domínio, geração) reaproveitam as conexões TLS já abertas. Os clientes assíncronos compartilham um pool por
+    event loop, já que conexões assíncronas não podem ser usadas em outro loop.
+
+    A fábrica também guarda o modelo e os parâmetros de cada uso (settings), para que NLU, filtros e geração
+    sejam configurados em um único lugar.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry_seconds: float = 30.0, http2: bool = True,
+                 purposes: Optional[Dict[str, LLMSettings]] = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_seconds,
+        )
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logging.info("Pacote h2 nao instalado. Usando HTTP/1.1 com keep-alive")
+        self.purposes = {"generation": LLMSettings(), "nlu": LLMSettings(), "filter": LLMSettings(max_tokens=100)}
+        self.purposes.update(purposes or {})
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, llm_config) -> "LLMClientFactory":
+        """Cria a fábrica a partir da seção [llm] da configuração (LLMConfig)."""
+        generation = LLMSettings(llm_config.gemini_model_name, llm_config.max_new_tokens, llm_config.temperature)
+        return cls(
+            max_connections=llm_config.http_max_connections,
+            max_keepalive_connections=llm_config.http_max_keepalive_connections,
+            keepalive_expiry_seconds=llm_config.http_keepalive_expiry_seconds,
+            http2=llm_config.http2,
+            purposes={
+                "generation": generation,
+                "nlu": LLMSettings(llm_config.nlu_model_name or generation.model_name, 1024, 0.7),
+                "filter": LLMSettings(llm_config.filter_model_name or generation.model_name, 100, 0.7),
+            },
+        )
+
+    def settings(self, purpose: str) -> LLMSettings:
+        return self.purposes.get(purpose) or self.purposes["generation"]
+
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self.limits, http2=self.http2)
+            return self._http_client
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        """Pool assíncrono do event loop em execução."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_http_clients.get(loop)
+            if client is None:
+                client = self._async_http_clients[loop] = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+            return client
+
+    def openai(self, api_key: str, base_url: str = GEMINI_BASE_URL, timeout=None, max_retries: int = 0) -> OpenAI:
+        """Cliente síncrono sobre o pool compartilhado. Por padrão sem novas tentativas do SDK (ver LLMCallPolicy)."""
+        return OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries,
+                      http_client=self.http_client())
+
+    def async_openai(self, api_key: str, base_url: str = GEMINI_BASE_URL, timeout=None, max_retries: int = 0) -> AsyncOpenAI:
+        """Cliente assíncrono sobre o pool do event loop em execução; deve ser criado dentro do loop."""
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries,
+                           http_client=self.async_http_client())
+
+    def close(self) -> None:
+        """Fecha o pool síncrono. Os pools assíncronos são liberados junto com os seus event loops."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+_default_factory: Optional[LLMClientFactory] = None
+_default_factory_lock = threading.Lock()
+
+
+def get_default_factory() -> LLMClientFactory:
+    """Fábrica compartilhada do processo, usada pelos componentes criados sem uma fábrica explícita."""
+    global _default_factory
+    with _default_factory_lock:
+        if _default_factory is None:
+            _default_factory = LLMClientFactory()
+        return _default_factory
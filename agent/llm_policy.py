@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+
+T = TypeVar("T")
+
+# Códigos HTTP transitórios: timeout do servidor, conflito, limite de requisições e erros do servidor
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMCallPolicy:
+    """
+    Política das chamadas ao LLM (API compatível com a OpenAI): timeouts de conexão e de leitura, novas tentativas
+    com backoff exponencial e jitter em erros transitórios (conexão, timeout, 408/409/429 e 5xx) e, opcionalmente,
+    hedging: se a chamada passar do percentil hedge_percentile das latências recentes, uma segunda chamada idêntica
+    é disparada e vale a primeira resposta. Erros definitivos (400, 401, 404, ...) não são repetidos.
+
+    Os clientes devem ser criados com max_retries=0 e timeout=policy.timeout(), para que apenas esta política
+    faça as novas tentativas.
+
+    Com o hedging ativo, a chamada original nunca passa por um pool: começa imediatamente, sem fila que limite as
+    chamadas concorrentes ou atrase o seu início (o que contaria contra o atraso do hedging). Apenas as requisições
+    duplicadas vão para um executor de hedge_max_in_flight threads; com todas ocupadas, a chamada segue sem
+    duplicata, para que o hedging não aumente a carga de um servidor já sobrecarregado.
+    """
+
+    LATENCY_WINDOW = 200
+
+    def __init__(self, max_retries: int = 3, retry_delay_seconds: float = 2.0, retry_max_delay_seconds: float = 30.0,
+                 connect_timeout_seconds: float = 5.0, read_timeout_seconds: float = 60.0, hedge_enabled: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20, hedge_max_in_flight: int = 32):
+        self.max_retries = max_retries
+        self.retry_delay_seconds = retry_delay_seconds
+        self.retry_max_delay_seconds = retry_max_delay_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_in_flight = hedge_max_in_flight
+        self._hedge_slots = threading.BoundedSemaphore(hedge_max_in_flight)
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._latencies_lock = threading.Lock()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, llm_config) -> "LLMCallPolicy":
+        """Cria a política a partir da seção [llm] da configuração (LLMConfig)."""
+        return cls(
+            max_retries=llm_config.max_retries,
+            retry_delay_seconds=llm_config.retry_delay_seconds,
+            retry_max_delay_seconds=llm_config.retry_max_delay_seconds,
+            connect_timeout_seconds=llm_config.connect_timeout_seconds,
+            read_timeout_seconds=llm_config.read_timeout_seconds,
+            hedge_enabled=llm_config.hedge_enabled,
+            hedge_percentile=llm_config.hedge_percentile,
+            hedge_min_samples=llm_config.hedge_min_samples,
+            hedge_max_in_flight=llm_config.hedge_max_in_flight,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout_seconds, connect=self.connect_timeout_seconds)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, openai.APIConnectionError):  # inclui APITimeoutError
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+        return False
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Espera antes da tentativa attempt + 1: "full jitter" sobre retry_delay_seconds * 2^attempt, limitado a
+        retry_max_delay_seconds. Um Retry-After numérico do servidor é respeitado como espera mínima.
+        """
+        delay = random.uniform(0, min(self.retry_max_delay_seconds, self.retry_delay_seconds * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.retry_max_delay_seconds))
+            except ValueError:
+                pass
+        return delay
+
+    def record_latency(self, seconds: float) -> None:
+        with self._latencies_lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latência no percentil hedge_percentile das chamadas recentes, ou None se o hedging não se aplica."""
+        if not self.hedge_enabled:
+            return None
+        with self._latencies_lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100))]
+
+    def call(self, request: Callable[[], T], hedge: bool = True) -> T:
+        """
+        Executa request() com novas tentativas e, se habilitado, hedging. Com hedge=False (por exemplo, na abertura
+        de um streaming) a chamada não é duplicada nem entra nas latências usadas pelo hedging.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(request) if hedge else request()
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                logging.warning(f"Falha transitoria na chamada ao LLM ({e}). Tentativa {attempt + 1} em {delay:.2f}s")
+                time.sleep(delay)
+
+    async def acall(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Versão assíncrona de call: request() deve retornar uma nova corrotina a cada chamada."""
+        attempt = 0
+        while True:
+            try:
+                return await self._ahedged(request)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                logging.warning(f"Falha transitoria na chamada ao LLM ({e}). Tentativa {attempt + 1} em {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _timed(self, request: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = request()
+        self.record_latency(time.perf_counter() - start)
+        return result
+
+    def _run(self, future: Future, request: Callable[[], T]) -> None:
+        try:
+            future.set_result(self._timed(request))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _submit_hedge(self, request: Callable[[], T]) -> Optional[Future]:
+        """Dispara a requisição duplicada, ou retorna None se já houver hedge_max_in_flight duplicatas em andamento."""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        with self._latencies_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_max_in_flight, thread_name_prefix="llm-hedge")
+        future = self._hedge_executor.submit(self._timed, request)
+        future.add_done_callback(lambda _: self._hedge_slots.release())
+        return future
+
+    def _hedged(self, request: Callable[[], T]) -> T:
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is None:
+            return self._timed(request)
+
+        # A chamada original roda em uma thread própria, iniciada agora: a thread de quem chamou apenas aguarda a
+        # primeira resposta, que pode ser a da duplicata
+        primary = Future()
+        threading.Thread(target=self._run, args=(primary, request), name="llm-call", daemon=True).start()
+        pending = {primary}
+        done, pending = wait(pending, timeout=hedge_delay)
+        if not done:
+            hedge = self._submit_hedge(request)
+            if hedge is None:
+                logging.warning(f"Limite de {self.hedge_max_in_flight} requisicoes duplicadas em andamento. Chamada ao LLM segue sem hedge")
+            else:
+                logging.info(f"Chamada ao LLM acima de {hedge_delay:.2f}s. Disparando requisicao duplicada (hedge)")
+                pending.add(hedge)
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    # A chamada mais lenta não pode ser interrompida; o resultado dela é descartado
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    async def _ahedged(self, request: Callable[[], Awaitable[T]]) -> T:
+        async def timed() -> T:
+            start = time.perf_counter()
+            result = await request()
+            self.record_latency(time.perf_counter() - start)
+            return result
+
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is None:
+            return await timed()
+
+        pending = {asyncio.ensure_future(timed())}
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            logging.info(f"Chamada ao LLM acima de {hedge_delay:.2f}s. Disparando requisicao duplicada (hedge)")
+            pending.add(asyncio.ensure_future(timed()))
+
+        error = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # A requisição perdedora é cancelada
+            for task in pending:
+                task.cancel()
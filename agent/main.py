@@ -1,10 +1,17 @@
 # agent.py
 import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
 from model.input_message import InputMessage
 from module.UCGemini import UserConnection
 from module.NLUGemini import NLU
+from module.FrontEndGemini import FrontEnd
+from module.fast_nlu import FastIntentClassifier
+from module.nlu_cache import NLUCache
 from module.km import KnowledgeManagement
-from module.bt import BeliefTracker
+from module.session_store import SessionStore
 from module.policy import Policy
 from module.nlg import NLG
 from model.semantic_document import SemanticDocument
@@ -13,28 +20,82 @@ log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class Agent:
-    def __init__(self, llm=True):
-        self.nlu = NLU()
+    def __init__(self, llm=True, fused_frontend=False, fast_nlu=True, sessions: SessionStore = None,
+                 executor_workers: int = 4, nlu_cache: NLUCache = None):
+        """
+        Args:
+            llm: Habilita os filtros de entrada e saída com LLM.
+            fused_frontend: Substitui o filtro de entrada, o NLU e a seleção de domínio do RAG por uma única
+                chamada ao LLM (FrontEnd). Requer llm=True.
+            fast_nlu: Classifica localmente (FastIntentClassifier) saudações, despedidas e sugestões de resposta
+                rápida, sem chamadas ao LLM.
+            sessions: Sessões dos usuários (um BeliefTracker por usuário). Se None, sessões apenas em memória com
+                os limites padrão de SessionStore.
+            executor_workers: Threads do executor interno (NLU em paralelo ao filtro de entrada e filtros de
+                saída), compartilhado por todos os turnos em andamento.
+            nlu_cache: Cache das análises do NLU com LLM. Se None, cache apenas em memória com os limites padrão
+                de NLUCache.
+        """
         self.km = KnowledgeManagement()
-        self.bt = BeliefTracker(self.km)
-        self.policy = Policy(self.bt, self.km)
+        # Uma única fábrica de clientes (pool de conexões com keep-alive) para NLU, filtros e RAG
+        self.client_factory = self.km.client_factory
+        self.nlu_cache = nlu_cache if nlu_cache is not None else NLUCache()
+        self.nlu = NLU(client_factory=self.client_factory, cache=self.nlu_cache)
+        self.sessions = sessions if sessions else SessionStore()
+        self.policy = Policy(self.sessions, self.km)
         self.nlg = NLG(llm)
-        self.user_connection = UserConnection(use_llm=llm)
+        self.user_connection = UserConnection(use_llm=llm, client_factory=self.client_factory)
+        self.fast_nlu = FastIntentClassifier() if fast_nlu else None
+        self.frontend = FrontEnd(self.km.list_domains, client_factory=self.client_factory) if llm and fused_frontend else None
+        # Executa o NLU em paralelo ao filtro de entrada e o filtro de saída em paralelo à geração da resposta seguinte
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="agent")
 
-    def chat(self, user: str, text: str) -> list[str]:
+    def _analyze(self, user: str, text: str) -> tuple[SemanticDocument | None, list[str] | None]:
+        """
+        Filtra a mensagem e executa o NLU.
+
+        O filtro de entrada e o NLU dependem apenas do texto: o NLU roda no executor enquanto o filtro roda nesta
+        thread, e o turno espera apenas pela chamada mais lenta. Se o filtro recusar a mensagem, o NLU é cancelado
+        (ou, se já estiver em andamento, o seu resultado é descartado). Antes disso, o classificador local
+        (fast_nlu) tenta reconhecer a mensagem sem nenhuma chamada ao LLM. A análise não depende da sessão e roda
+        fora do lock da sessão.
+
+        Returns:
+            O documento semântico, ou None e as respostas de recusa quando a mensagem não pode ser respondida.
+        """
         message = InputMessage(message=text, user=user)
-        filter_result = self.user_connection.filter_input(message.message)
+        analysis_start = time.perf_counter()
+        fast_doc = self.fast_nlu.classify(message.message) if self.fast_nlu else None
+        if fast_doc:
+            # Mensagens reconhecidas pelo classificador local são fixas e seguras (whitelisted): o filtro de
+            # entrada e o NLU com LLM não são chamados
+            semantic_doc = fast_doc
+        elif self.frontend:
+            # Front-end fundido: filtro, NLU e domínio do RAG em uma única chamada
+            filter_result, semantic_doc = self.frontend.analyze(message.message)
+            if not filter_result.valid:
+                return None, ['Não posso responder essa sua mensagem pelo filtro']
+        else:
+            nlu_future = self._executor.submit(self.nlu.process, message)
+            try:
+                filter_result = self.user_connection.filter_input(message.message)
+            except Exception:
+                nlu_future.cancel()
+                raise
 
-        if not filter_result.valid:
-            return ['Não posso responder essa sua mensagem pelo filtro']
+            if not filter_result.valid:
+                nlu_future.cancel()
+                return None, ['Não posso responder essa sua mensagem pelo filtro']
 
-        semantic_doc = self.nlu.process(message)
-        analysis = semantic_doc.get("analysis", {})
+            semantic_doc = nlu_future.result()
+        if self.fast_nlu and not fast_doc:
+            self.fast_nlu.record_llm_latency(time.perf_counter() - analysis_start)
+        analysis = semantic_doc.get("analysis") or {}
 
         if not analysis.get('intents'):
-            return ['Não posso responder essa sua mensagem pelo intent']
+            return None, ['Não posso responder essa sua mensagem pelo intent']
 
-        semantic_doc_obj = SemanticDocument(
+        return SemanticDocument(
             intents=analysis.get("intents", []),
             operations=analysis.get("operations", []),
             questions=analysis.get("questions", []),
@@ -42,21 +103,101 @@ class Agent:
             sentiment=analysis.get("sentiment", ""),
             domain=analysis.get("domain", ""),
             dependent=analysis.get("dependent", False),
-            out_of_context=False
-        )
+            out_of_context=False,
+            rag_domain=analysis.get("rag_domain")
+        ), None
 
-        states = self.bt.update_state(semantic_doc_obj)
-        if not states:
-            return ['Não posso responder essa sua mensagem pelo state']
+    def _act(self, user: str, text: str, stream: bool = False) -> tuple[list | None, list[str] | None]:
+        """
+        Analisa a mensagem e, sob o lock da sessão do usuário, atualiza o estado do diálogo e decide as ações.
+        Turnos concorrentes do mesmo usuário são serializados a partir daqui; em streaming, a consulta ao RAG e a
+        geração acontecem depois, fora do lock.
 
-        actions = self.policy.act(user, states, text)
+        Returns:
+            As ações do turno, ou None e as respostas de recusa quando a mensagem não pode ser respondida.
+        """
+        semantic_doc, refusal = self._analyze(user, text)
+        if refusal:
+            return None, refusal
 
-        responses = []
+        with self.sessions.session(user) as tracker:
+            states = tracker.update_state(semantic_doc)
+            if not states:
+                return None, ['Não posso responder essa sua mensagem pelo state']
+            return self.policy.act(user, states, text, stream=stream), None
+
+    def chat(self, user: str, text: str) -> list[str]:
+        actions, refusal = self._act(user, text)
+        if refusal:
+            return refusal
+
+        # Cada resposta é filtrada no executor enquanto as seguintes são geradas; a ordem é preservada
+        filtered = []
         for action in actions:
             response = self.nlg.generate(action)
             if response:
-                if not self.user_connection.filter_output(response):
-                    response = 'Opa, não posso responder essa mensagem'
-                responses.append(response)
+                filtered.append(self._submit_output_filter(response))
+
+        return [future.result() for future in filtered]
+
+    def _submit_output_filter(self, response: str) -> Future:
+        """Agenda o filtro de saída da resposta; o Future retorna a resposta ou a mensagem de recusa."""
+        if not self.user_connection.use_llm:
+            # Sem LLM o filtro sempre aceita: não há chamada a sobrepor
+            future = Future()
+            future.set_result(response)
+            return future
+        return self._executor.submit(self._filter_output, response)
+
+    def _filter_output(self, response: str) -> str:
+        if not self.user_connection.filter_output(response).valid:
+            return 'Opa, não posso responder essa mensagem'
+        return response
+
+    def chat_stream(self, user: str, text: str) -> Iterator[dict]:
+        """
+        Versão em streaming de chat. Produz eventos:
+            - {"type": "delta", "index": i, "text": ...}: trecho da i-ésima resposta, à medida que é gerado;
+            - {"type": "response", "index": i, "text": ...}: texto final da i-ésima resposta, já filtrado.
+
+        O filtro de saída só consegue avaliar a resposta completa. Por isso os trechos (delta) só são enviados
+        quando o filtro está desabilitado (UserConnection sem LLM); com o filtro habilitado, cada resposta é
+        acumulada e apenas o evento "response" é emitido depois da filtragem. Nesse caso o streaming ainda
+        antecipa as respostas já prontas, mas não o texto de uma resposta em geração: nenhum texto não filtrado
+        chega ao usuário. A filtragem de cada resposta roda no executor enquanto a resposta seguinte é gerada, e
+        os eventos "response" são emitidos na ordem das respostas assim que os seus filtros terminam.
+        """
+        actions, refusal = self._act(user, text, stream=True)
+        if refusal:
+            for index, response in enumerate(refusal):
+                yield {"type": "response", "index": index, "text": response}
+            return
+
+        stream_deltas = not self.user_connection.use_llm
+
+        # Filtros de saída em andamento, na ordem das respostas: (índice, Future)
+        pending = deque()
+        index = 0
+        for action in actions:
+            parts = []
+            for part in self.nlg.generate_stream(action):
+                yield from self._ready_responses(pending)
+                if part:
+                    parts.append(part)
+                    if stream_deltas:
+                        yield {"type": "delta", "index": index, "text": part}
+
+            response = "".join(parts)
+            if response:
+                pending.append((index, self._submit_output_filter(response)))
+                index += 1
+            yield from self._ready_responses(pending)
+
+        yield from self._ready_responses(pending, wait=True)
 
-        return responses
+    @staticmethod
+    def _ready_responses(pending: deque, wait: bool = False) -> Iterator[dict]:
+        """Emite, em ordem, os eventos "response" cujos filtros já terminaram (ou todos, com wait=True)."""
+        while pending and (wait or pending[0][1].done()):
+            index, future = pending.popleft()
+            yield {"type": "response", "index": index, "text": future.result()}
@@ -19,6 +19,8 @@ class SemanticDocument:
         sentiment (str): Sentimento extraído do texto, como 'positivo' ou 'negativo'.
         domain (str): O domínio da mensagem, por padrão 'transacional'.
         dependent (bool): Indica se a pergunta depende de uma mensagem anterior.
+        rag_domain (str | None): Domínio de conhecimento do RAG escolhido para a mensagem (front-end fundido), ou
+            None para a seleção automática.
 
     Métodos:
         get_sentences(): Retorna um iterador de sentenças, onde cada sentença é uma string gerada a partir dos tokens do texto.
@@ -31,6 +33,7 @@ class SemanticDocument:
     out_of_context: bool = False
     domain: str = 'transacional'
     dependent: bool = False
+    rag_domain: str | None = None
 
     def get_sentences(self) -> Iterator[str]:
         """
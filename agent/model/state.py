@@ -25,6 +25,7 @@ class State:
         - domain: Domínio da interação (por padrão 'transacional').
         - whitelisted: Indica se o estado é parte de uma lista branca.
         - dependent: Indica se o estado depende de outro contexto ou interação.
+        - rag_domain: Domínio de conhecimento do RAG escolhido para a pergunta (opcional).
         - complexity: Nível de complexidade da pergunta associada ao estado.
     Métodos:
         - update_slots: Atualiza os slots com novas entidades.
@@ -43,6 +44,7 @@ class State:
     domain: str = 'transacional'
     whitelisted: bool = False
     dependent: bool = False
+    rag_domain: str = None
 
     # --------------------------------------------------------------
     # Método para atualizar os slots com novas entidades
@@ -1,10 +1,16 @@
 import logging
 import os
+import sys
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
 import re
 
+# Adiciona a raiz do projeto ao sys.path (fábrica de clientes compartilhada em agent/llm_client.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from agent.llm_client import LLMClientFactory, get_default_factory
+from model.input_message import InputMessage
+from module.nlu_cache import NLUCache
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -15,9 +21,13 @@ logging.basicConfig(
 load_dotenv()
 
 class NLU:
-    def __init__(self, model_name="gemini-2.0-flash", device=None):
+    def __init__(self, model_name=None, device=None, client_factory: LLMClientFactory = None, cache: NLUCache = None):
         """
         Inicializa a classe NLU e configura o cliente para a API do Gemini (via SDK da OpenAI).
+
+        O cliente vem de client_factory (por padrão, a fábrica compartilhada do processo), no pool de conexões
+        compartilhado; o modelo e os parâmetros são os do uso "nlu" da fábrica, a não ser que model_name seja informado.
+        Se cache for informado, mensagens repetidas (normalizadas, no mesmo domínio) reaproveitam a análise em cache.
         """
         logging.info("Inicializando a classe NLU ...")
 
@@ -27,15 +37,16 @@ class NLU:
             logging.error("GEMINI_API_KEY não encontrado nas variáveis de ambiente.")
             raise ValueError("GEMINI_API_KEY não encontrado.")
 
-        self.model_name = model_name
+        client_factory = client_factory if client_factory else get_default_factory()
+        self.settings = client_factory.settings("nlu")
+        self.model_name = model_name or self.settings.model_name
 
         # Cliente OpenAI compatível com Gemini
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+        self.client = client_factory.openai(api_key, max_retries=2)
+
+        self.cache = cache
 
-        logging.info(f"Modelo '{model_name}' configurado com sucesso para uso com Gemini.")
+        logging.info(f"Modelo '{self.model_name}' configurado com sucesso para uso com Gemini.")
 
     def generate(self, messages):
         """
@@ -56,8 +67,8 @@ class NLU:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                max_tokens=1024,
-                temperature=0.7
+                max_tokens=self.settings.max_tokens,
+                temperature=self.settings.temperature
             )
 
             generated_text = response.choices[0].message.content.strip()
@@ -120,12 +131,18 @@ class NLU:
             logging.error(f"Erro ao decodificar JSON: {e}")
             return {"error": "Erro ao processar resposta como JSON."}
 
-    def process(self, message: str) -> dict:
+    def process(self, message: str | InputMessage) -> dict:
         """
         Processa a mensagem do usuário e gera um documento semântico estruturado.
+
+        A mensagem pode ser o texto ou um InputMessage, cujo domínio faz parte da chave do cache.
         """
         logging.info("Iniciando o processamento da mensagem.")
 
+        domain = ''
+        if isinstance(message, InputMessage):
+            message, domain = message.message, message.domain
+
         if not message:
             logging.warning("Mensagem vazia recebida.")
             return {
@@ -133,6 +150,11 @@ class NLU:
                 "analysis": None
             }
 
+        if self.cache is not None:
+            analysis = self.cache.get(message, domain)
+            if analysis is not None:
+                return {"original_sentence": message, "analysis": analysis}
+
         semantic_info = self.generate_semantic_information(message)
 
         if "error" in semantic_info:
@@ -143,4 +165,6 @@ class NLU:
                 "error": semantic_info["error"]
             }
 
+        if self.cache is not None and isinstance(semantic_info.get("analysis"), dict) and semantic_info["analysis"].get("intents"):
+            self.cache.put(message, domain, semantic_info["analysis"])
         return semantic_info
@@ -1,11 +1,15 @@
 import logging
 import os
+import sys
 from model.filter_result import FilterResult
 from model.input_message import InputMessage
 from model.env import Env
-from openai import OpenAI
 from dotenv import load_dotenv
 
+# Adiciona a raiz do projeto ao sys.path (fábrica de clientes compartilhada em agent/llm_client.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from agent.llm_client import LLMClientFactory, get_default_factory
+
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -17,8 +21,11 @@ logging.basicConfig(
 )
 
 class UserConnection:
-    def __init__(self, use_llm=False):
+    def __init__(self, use_llm=False, client_factory: LLMClientFactory = None):
         self.use_llm = use_llm
+        # Cliente, modelo e parâmetros do uso "filter" da fábrica (por padrão, a fábrica compartilhada do processo)
+        client_factory = client_factory if client_factory else get_default_factory()
+        self.settings = client_factory.settings("filter")
 
         # Verificar se o uso de LLM está habilitado
         if self.use_llm:
@@ -27,23 +34,21 @@ class UserConnection:
             if not openai_api_key:
                 raise ValueError("GEMINI_PROJECT_ID Key não fornecida.")
             
-            # Configurar a chave da OpenAI
-            OpenAI.api_key = openai_api_key
+            self.client = client_factory.openai(openai_api_key, max_retries=2)
             log.info("Configuração da OpenAI API bem-sucedida.")
-            self.client = OpenAI(api_key=openai_api_key, base_url="https://generativelanguage.googleapis.com/v1beta/openai/")
             # Não há necessidade de login como na Hugging Face. A API da OpenAI usa apenas a chave de API.
 
-    def generate(self, prompt, model="gemini-2.0-flash", max_tokens=100):
+    def generate(self, prompt, model=None, max_tokens=None):
         """
         Gera uma resposta utilizando a API da OpenAI (GPT-4 ou outro modelo).
         """
         try:
             response = self.client.chat.completions.create(
-                model=model,
+                model=model or self.settings.model_name,
                 messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
+                max_tokens=max_tokens or self.settings.max_tokens,
                 n=1,
-                temperature=0.7  # Controla a aleatoriedade da resposta gerada
+                temperature=self.settings.temperature  # Controla a aleatoriedade da resposta gerada
             )
             generated_text = response.choices[0].message.content.strip()
             return generated_text
@@ -65,7 +70,7 @@ class UserConnection:
             try:
                 # Usar a API da OpenAI para processar a entrada
                 log.debug(f"Processando texto de entrada: {text}")
-                response = self.generate(text, model="gemini-2.0-flash", max_tokens=100)
+                response = self.generate(text)
                 
                 # Verificar se a resposta gerada é válida
                 if response and len(response) > 0:
@@ -91,7 +96,7 @@ class UserConnection:
         try:
             # Usar a API da OpenAI para verificar a saída
             log.debug(f"Processando texto de saída: {output_text}")
-            response = self.generate(output_text, model="gemini-2.0-flash", max_tokens=100)
+            response = self.generate(output_text)
 
             # Verificar se a resposta gerada é válida
             if response and len(response) > 0:
@@ -1,5 +1,4 @@
 import logging
-from collections import deque
 
 from model.semantic_document import SemanticDocument
 from model.state import State
@@ -14,16 +13,43 @@ class BeliefTracker:
     Responsável por gerenciar o contexto do diálogo e os estados de intenção/operacional, além de
     gerenciar a proatividade com base no feedback do usuário.
 
+    O contexto é um dicionário indexado por (intenção, operação): cada par tem no máximo um estado, e a ordem de
+    inserção do dicionário é a ordem do diálogo (o estado mais recente por último; mover um estado para o fim é
+    removê-lo e inseri-lo de novo). Os estados atuais ficam também em um conjunto ordenado separado. Assim, buscar, resetar e mover um estado custa O(1), e desativar e
+    reordenar os estados atuais custa O(k), para k estados atuais, independentemente do tamanho da sessão.
+
     Atributos:
-        context (deque[State]): Fila que armazena os estados atuais do diálogo.
+        context (list[State]): Estados do diálogo, do mais antigo ao mais recente.
         user (str): Identificador do usuário.
     """
 
     def __init__(self, user: str):
         # Inicializa o Belief Tracker com o usuário especificado.
-        self.context: deque[State] = deque()
+        self._states: dict[tuple, State] = {}
+        self._current: dict[tuple, None] = {}
         self.user = user
 
+    @property
+    def context(self) -> list[State]:
+        return list(self._states.values())
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __setstate__(self, state: dict):
+        # Sessões serializadas antes do índice guardam o contexto em uma deque ("context")
+        legacy_context = state.pop('context', None)
+        self.__dict__.update(state)
+        if legacy_context is not None:
+            self._states = {}
+            self._current = {}
+            for context_state in legacy_context:
+                key = _key(context_state.intent, context_state.operation)
+                self._states.pop(key, None)
+                self._states[key] = context_state
+                if context_state.current:
+                    self._current[key] = None
+
     def update_state(self, semantic_doc: SemanticDocument) -> list[State]:
         """
         Atualiza o estado do diálogo com base no documento semântico observado.
@@ -46,33 +72,31 @@ class BeliefTracker:
             semantic_doc.operations, 
             semantic_doc.questions
         ):
-            if not self.context:
+            if not self._states:
                 state = State(intent, operation, question)
                 state = self._fill_state(state, semantic_doc)
-                self.context.append(state)
+                self._append(state)
                 log.debug('Creating first state')
             else:
                 if not intent:
                     log.debug('Updating last state')
-                    # Atualiza o último estado na fila de contexto
-                    state = self.context.pop()
+                    # Atualiza o último estado do contexto, que continua por último
+                    key, state = next(reversed(self._states.items()))
                     state = self._fill_state(state, semantic_doc)
                     state.update_question(question)
-                    state.current = True
-                    self.context.append(state)
+                    self._set_current(key, state)
                 else:
                     state = self._find_same_context_state(intent, operation)
                     if not state:
                         log.debug('No state with same intent found, creating a new one')
                         state = State(intent, operation, question)
                         state = self._fill_state(state, semantic_doc)
-                    state.current = True
                     state = self._fill_state(state, semantic_doc)
                     state.update_question(question)
-                    self.context.append(state)
-            log.debug(self.context)
+                    self._append(state)
+            log.debug(state)
         self._sort_context(semantic_doc)
-        return list(self.context)
+        return self.context
 
     def reset(self, intent: Intent, operation: str):
         """
@@ -83,16 +107,27 @@ class BeliefTracker:
             operation (str): Operação associada à intenção que será resetada.
         """
         log.debug('reseting  ' + str(intent) + ' ' + str(operation))
-        for _ in range(len(self.context)):
-            state = self.context.pop()
-            if state.intent == intent and state.operation == operation:
-                continue
-            self.context.appendleft(state)
-        log.debug(str(self.context))
+        key = _key(intent, operation)
+        self._states.pop(key, None)
+        self._current.pop(key, None)
+        log.debug(f'{len(self._states)} states left')
 
     def clear(self):
         """Limpa o contexto e os contextos armazenados."""
-        self.context = deque()
+        self._states = {}
+        self._current = {}
+
+    def _append(self, state: State):
+        # Coloca o estado, como atual, no fim do contexto.
+        key = _key(state.intent, state.operation)
+        self._states.pop(key, None)
+        self._states[key] = state
+        self._set_current(key, state)
+
+    def _set_current(self, key: tuple, state: State):
+        state.current = True
+        self._current.pop(key, None)
+        self._current[key] = None
 
     def _fill_state(self, state: State, semantic_doc: SemanticDocument) -> State:
         """
@@ -109,32 +144,33 @@ class BeliefTracker:
         state.out_of_context = semantic_doc.out_of_context
         state.domain = semantic_doc.domain
         state.dependent = semantic_doc.dependent
+        state.rag_domain = semantic_doc.rag_domain
         return state
 
     def _sort_context(self, semantic_doc: SemanticDocument):
-        """Ordena o contexto, movendo para o topo as operações mais importantes."""
-        priority_state = []
-        for _ in range(len(self.context)):
-            state = self.context.pop()
-            if state.current:
-                priority_state.append(state)
-                continue
-            self.context.appendleft(state)
-        for state in priority_state:
-            self.context.append(state)
+        """
+        Ordena o contexto, movendo para o topo as operações mais importantes.
+
+        Os estados atuais vão para o fim do contexto, do mais recente ao mais antigo (a ordem da implementação
+        original, que os desempilhava do fim da fila).
+        """
+        self._current = dict.fromkeys(reversed(self._current))
+        for key in self._current:
+            self._states[key] = self._states.pop(key)
 
     def _toggle_off_current_state(self):
         # Desativa o estado atual, tornando todos os estados não atuais.
-        for state in self.context:
-            state.current = False
+        for key in self._current:
+            self._states[key].current = False
+        self._current.clear()
 
     def _select_state(self) -> State:
         # Seleciona o último estado no contexto.
-        return self.context[-1]
+        return next(reversed(self._states.values()))
 
     def _find_same_context_state(self, intent: Intent, operation: str) -> State:
         """
-        Procura por um estado no contexto que tenha a mesma intenção e operação.
+        Procura por um estado no contexto que tenha a mesma intenção e operação e o remove do contexto.
 
         Args:
             intent (Intent): Intenção procurada.
@@ -143,21 +179,24 @@ class BeliefTracker:
         Returns:
             State: Estado correspondente com a mesma intenção e operação ou None.
         """
-
-        same_context_state = None
-        for _ in range(len(self.context)):
-            state = self.context.pop()
-            if self._is_same_context(intent, operation, state):
-                same_context_state = state
-            else:
-                self.context.appendleft(state)
-        return same_context_state
+        key = _key(intent, operation)
+        self._current.pop(key, None)
+        return self._states.pop(key, None)
 
     def _is_same_context(self, intent: Intent, operation: str, state: State) -> bool:
         # Verifica se o estado possui a mesma intenção e operação.
         return intent == state.intent and operation == state.operation
 
 
+def _key(intent: Intent, operation: str) -> tuple:
+    """Chave do índice do contexto. Operações não hasheáveis (por exemplo, listas vindas do NLU) usam o repr."""
+    try:
+        hash(operation)
+    except TypeError:
+        operation = repr(operation)
+    return intent, operation
+
+
 def convert_to_slots(entities: list[tuple[str, str]]) -> dict[str, str]:
     """
     Converte uma lista de entidades (pares de nome-valor) em um dicionário de slots.
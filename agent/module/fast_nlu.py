@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import re
+import threading
+
+from unidecode import unidecode
+from model.intent import Intent
+
+log = logging.getLogger(__name__)
+
+# Regras do nlu.py (saudações, despedidas) compiladas em expressões que precisam casar com a mensagem inteira,
+# já normalizada: "bom dia" é uma saudação, "bom dia, qual o meu saldo?" não é e segue para o NLU com LLM
+GREETING = r"(oi+|ola|bom dia|boa tarde|boa noite|e ai|eai|hey|hello|opa|salve)( (tudo bem|tudo bom|como vai))?"
+GOODBYE = r"(tchau|ate logo|ate mais|ate breve|ate amanha|adeus|falou|flw)"
+
+# Sugestões de resposta rápida da interface: perguntas fixas enviadas ao RAG. O arquivo é a única fonte da lista,
+# também carregado pelo front-end (agent/static/app.js)
+QUICK_REPLIES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'quick_replies.json')
+
+
+def load_quick_replies(path: str = QUICK_REPLIES_PATH) -> list[str]:
+    """Todas as sugestões de resposta rápida do arquivo: as iniciais, as de continuação e as padrão."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        log.error(f"Erro ao carregar as respostas rapidas de {path}: {e}")
+        return []
+    replies = data.get('initial', []) + data.get('default', [])
+    for rule in data.get('follow_up', []):
+        replies += rule['replies']
+    return list(dict.fromkeys(replies))
+
+
+QUICK_REPLIES = load_quick_replies()
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e sem pontuação, com espaços simples."""
+    text = re.sub(r"[^\w\s]", " ", unidecode(text.lower()))
+    return " ".join(text.split())
+
+
+class FastIntentClassifier:
+    """
+    Classificador local de intenções, consultado antes do NLU com LLM (NLUGemini).
+
+    Reconhece apenas mensagens inteiras de alta confiança (saudações, despedidas e as sugestões de resposta
+    rápida) com uma única expressão regular compilada, e retorna o documento semântico no mesmo formato de
+    NLUGemini.process. As demais mensagens retornam None e seguem para o LLM.
+
+    Mantém a taxa de acerto e uma estimativa da latência economizada: cada acerto economiza a latência média
+    (EWMA) do caminho com LLM, medida pelo Agent com record_llm_latency.
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, quick_replies: list[str] = None):
+        quick_replies = QUICK_REPLIES if quick_replies is None else quick_replies
+        self._questions = {normalize(text): text for text in quick_replies}
+        alternatives = [f"(?P<greeting>{GREETING})", f"(?P<goodbye>{GOODBYE})"]
+        if self._questions:
+            alternatives.append("(?P<question>" + "|".join(re.escape(text) for text in sorted(self._questions, key=len, reverse=True)) + ")")
+        self._pattern = re.compile("|".join(alternatives))
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._llm_latency: float | None = None
+
+    def classify(self, text: str) -> dict | None:
+        """Retorna o documento semântico da mensagem, ou None se a classificação local não for confiável."""
+        normalized = normalize(text or "")
+        match = self._pattern.fullmatch(normalized)
+        if not match:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if match.group("greeting"):
+            analysis = self._analysis(Intent.SAUDACAO)
+        elif match.group("goodbye"):
+            analysis = self._analysis(Intent.DESPEDIDA)
+        else:
+            analysis = self._analysis(Intent.QUESTION, question=self._questions[normalized])
+
+        with self._lock:
+            self.hits += 1
+            saved = self._llm_latency or 0.0
+            self.saved_seconds += saved
+            hit_rate = self.hits / (self.hits + self.misses)
+        log.info(f"NLU local: intencao {analysis['intents'][0]} (taxa de acerto {hit_rate:.1%}, "
+                 f"~{saved:.2f}s economizados, {self.saved_seconds:.1f}s no total)")
+        return {"original_sentence": text, "analysis": analysis}
+
+    @staticmethod
+    def _analysis(intent: Intent, question: str = None) -> dict:
+        return {
+            "intents": [intent],
+            "operations": [None],
+            "questions": [question],
+            "entities": [],
+            "sentiment": "",
+            "domain": "",
+            "dependent": False,
+        }
+
+    def record_llm_latency(self, seconds: float) -> None:
+        """Registra a latência de uma análise feita pelo caminho com LLM (filtro de entrada e NLU)."""
+        with self._lock:
+            if self._llm_latency is None:
+                self._llm_latency = seconds
+            else:
+                self._llm_latency += self.EWMA_ALPHA * (seconds - self._llm_latency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "llm_latency_seconds": self._llm_latency,
+            }
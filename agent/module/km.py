@@ -1,38 +1,142 @@
 import sys
 import os
+import json
 import logging
+from pathlib import Path
+from typing import Iterator
+
+from unidecode import unidecode
 
 # Adiciona a raiz do projeto (/workspaces/IC-2025) ao sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 rag_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../rag'))
 from rag.RAGInterface import RAGInterface
+from rag.src.config.config_manager import ConfigManager
+from agent.llm_client import LLMClientFactory
+
+# Arquivo JSON com o mapeamento dos domínios do NLU para os domínios do RAG, usado quando domain_mapping não é informado
+DOMAIN_MAPPING_ENV = "AGENT_DOMAIN_MAPPING"
+
+
+def normalize_domain(label: str) -> str:
+    """Rótulo de domínio em minúsculas, sem acentos e com "_" e "-" como espaços: "Educação" -> "educacao"."""
+    return " ".join(unidecode(label.lower()).replace("_", " ").replace("-", " ").split())
+
 
 class KnowledgeManagement:
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, client_factory: LLMClientFactory = None,
+                 domain_mapping: dict[str, str | list[str]] = None):
+        """
+        Args:
+            config_path: Configuração do RAG (por padrão, rag/config.toml).
+            client_factory: Fábrica de clientes do LLM. Se None, criada a partir da seção [llm] da configuração.
+            domain_mapping: Mapeamento dos rótulos de domínio do NLU (por exemplo, "financeiro") para um ou mais
+                domínios do RAG. Se None, lido do arquivo JSON em AGENT_DOMAIN_MAPPING, se houver.
+        """
         # Set the correct config path relative to THIS file's location
         if config_path is None:
             # Get the directory where this Python file is located
             current_dir = os.path.dirname(os.path.abspath(__file__))
             # Go up two levels (from agent/module/ to project root) then to rag/config.toml
             config_path = os.path.join(current_dir, '../../rag/config.toml')
+        # Fábrica de clientes do LLM (pool de conexões compartilhado), configurada pela seção [llm]. O Agent a
+        # repassa ao NLU e aos filtros, para que todas as chamadas de um turno usem as mesmas conexões
+        if client_factory is None:
+            client_factory = LLMClientFactory.from_config(ConfigManager(Path(config_path)).get_config().llm)
+        self.client_factory = client_factory
         # Inicializando o RAGInterface dentro do KM
-        self.rag_interface = RAGInterface(config_path=config_path)
+        self.rag_interface = RAGInterface(config_path=config_path, client_factory=client_factory)
+
+        if domain_mapping is None and os.getenv(DOMAIN_MAPPING_ENV):
+            with open(os.getenv(DOMAIN_MAPPING_ENV), encoding="utf-8") as f:
+                domain_mapping = json.load(f)
+        self.domain_mapping = {
+            normalize_domain(label): [names] if isinstance(names, str) else list(names)
+            for label, names in (domain_mapping or {}).items()
+        }
     
-    def query_knowledge(self, question: str, domain: str = "Teste") -> str:
+    def list_domains(self) -> list[tuple[str, str]]:
+        """Domínios do RAG que já receberam documentos, como pares (nome, descrição)."""
+        return [(domain.name, domain.description) for domain in self.rag_interface.list_domains(populated_only=True)]
+
+    def forget_session(self, session_id: str) -> None:
+        """Descarta a recuperação guardada no RAG para a sessão (fim da conversa)."""
+        self.rag_interface.forget_session(session_id)
+
+    def resolve_domains(self, domain: str = None, rag_domain: str = None) -> list[str] | None:
+        """
+        Resolve os domínios do RAG de uma consulta, na ordem:
+            1. rag_domain, o domínio do RAG escolhido pelo front-end fundido;
+            2. o domínio do NLU, pelo mapeamento domain_mapping;
+            3. o domínio do NLU, quando é o próprio nome (normalizado) de um domínio do RAG.
+        Apenas domínios do RAG existentes e populados são usados.
+
+        Returns:
+            Os nomes dos domínios do RAG, ou None quando o domínio não está mapeado: o RAG então seleciona os
+            domínios automaticamente (roteador por embeddings e, se necessário, o LLM).
+        """
+        known = {normalize_domain(name): name for name, _ in self.list_domains()}
+        if rag_domain and normalize_domain(rag_domain) in known:
+            return [known[normalize_domain(rag_domain)]]
+        if not domain:
+            return None
+
+        label = normalize_domain(domain)
+        if label in self.domain_mapping:
+            names = [known[normalize_domain(name)] for name in self.domain_mapping[label] if normalize_domain(name) in known]
+            if names:
+                return names
+            logging.warning(f"Dominios do RAG mapeados para '{domain}' inexistentes ou vazios: {self.domain_mapping[label]}")
+        if label in known:
+            return [known[label]]
+        return None
+
+    def query_knowledge(self, question: str, domain: str = None, rag_domain: str = None, session_id: str = None,
+                        follow_up: bool = False) -> str:
         """
         Método para consultar o RAGInterface e retornar uma resposta.
 
         Args:
             question: A pergunta do usuário.
-            domain: O domínio relacionado à consulta.
+            domain: O domínio da consulta identificado pelo NLU.
+            rag_domain: O domínio do RAG escolhido pelo front-end fundido, se houver (tem precedência).
+            session_id: A sessão do usuário. O RAG guarda a recuperação de cada turno da sessão.
+            follow_up: Se a pergunta depende da anterior (SemanticDocument.dependent): o RAG reaproveita os
+                domínios e os chunks do turno anterior da sessão.
 
         Returns:
             A resposta gerada pelo RAGInterface.
         """
         try:
-            result = self.rag_interface.query_llm(question, domains=["Teste"])
+            domains = self.resolve_domains(domain, rag_domain)
+            logging.info(f"Dominio da consulta: {domain or rag_domain} -> {domains or 'selecao automatica'}")
+            result = self.rag_interface.query_llm(question, domains=domains, session_id=session_id, follow_up=follow_up)
             return result["answer"]
         except Exception as e:
             # Logar erro e retornar uma mensagem padrão
             logging.error(f"Erro ao consultar o RAGInterface: {e}")
-            return "Desculpe, houve um erro ao acessar o sistema de conhecimento."
\ No newline at end of file
+            return "Desculpe, houve um erro ao acessar o sistema de conhecimento."
+
+    def query_knowledge_stream(self, question: str, domain: str = None, rag_domain: str = None,
+                               session_id: str = None, follow_up: bool = False) -> Iterator[str]:
+        """
+        Versão em streaming de query_knowledge: retorna os trechos da resposta à medida que são gerados.
+
+        Args:
+            question: A pergunta do usuário.
+            domain: O domínio da consulta identificado pelo NLU.
+            rag_domain: O domínio do RAG escolhido pelo front-end fundido, se houver (tem precedência).
+            session_id: A sessão do usuário, como em query_knowledge.
+            follow_up: Se a pergunta depende da anterior, como em query_knowledge.
+
+        Returns:
+            Iterador com os trechos da resposta gerada pelo RAGInterface.
+        """
+        try:
+            domains = self.resolve_domains(domain, rag_domain)
+            logging.info(f"Dominio da consulta: {domain or rag_domain} -> {domains or 'selecao automatica'}")
+            yield from self.rag_interface.query_llm_stream(question, domains=domains, session_id=session_id, follow_up=follow_up)
+        except Exception as e:
+            # Logar erro e retornar uma mensagem padrão
+            logging.error(f"Erro ao consultar o RAGInterface: {e}")
+            yield "Desculpe, houve um erro ao acessar o sistema de conhecimento."
@@ -1,4 +1,5 @@
 import logging
+from typing import Iterator
 from model.action import Action
 from model.intent import Intent
 from response_generator.response_generator import ResponseGenerator
@@ -34,3 +35,13 @@ class NLG:
             return "Até logo!"
         else:
             return "Desculpe, não entendi sua solicitação."
+
+    def generate_stream(self, action: Action) -> Iterator[str]:
+        """
+        Versão em streaming de generate: repassa os trechos do slot "resposta_stream", quando houver;
+        as demais ações produzem a resposta completa de uma vez.
+        """
+        if action.intent == Intent.INFORMAR and "resposta_stream" in action.slots:
+            yield from action.slots["resposta_stream"]
+        else:
+            yield self.generate(action)
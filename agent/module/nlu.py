@@ -1,6 +1,5 @@
 import logging
-import spacy
-import nltk
+import re
 from unidecode import unidecode
 from model.question import Question
 from model.intent import Intent
@@ -8,15 +7,35 @@ from model.semantic_document import SemanticDocument
 from model.semantic_token import SemanticToken
 from model.input_message import InputMessage
 
-nltk.download('punkt_tab')
-
 log = logging.getLogger(__name__)
 
+# Pipeline de pré-processamento, compilado uma única vez e compartilhado por todas as mensagens: divisão em
+# sentenças (após ".", "!", "?" ou reticências) e tokenização em palavras e sinais de pontuação
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?\u2026])\s+")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# Regras de intenção, operação e pergunta pelo início da sentença normalizada, avaliadas em uma única expressão
+SENTENCE_RULES = re.compile(r"(?P<saudacao>ola|bom)|(?P<despedida>tchau)|(?P<qual>qual)|(?P<o_que>o que)")
+
+# Entidades por palavra-chave: (valor, tipo). A ordem da tabela é a ordem das entidades de cada sentença
+ENTITY_KEYWORDS = {
+    'ted': ('TED', 'tipo_transferencia'),
+    'doc': ('DOC', 'tipo_transferencia'),
+    'pix': ('PIX', 'tipo_transferencia'),
+}
+ENTITY_ORDER = {keyword: index for index, keyword in enumerate(ENTITY_KEYWORDS)}
+# Autômato das palavras-chave: uma única alternação compilada, casando apenas palavras inteiras
+ENTITY_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in sorted(ENTITY_KEYWORDS, key=len, reverse=True)) + r")\b")
+
 
 class NLU:
     """
     Classe responsável por realizar o processamento de linguagem natural (NLU) de mensagens,
     incluindo classificação de intenções, operações, perguntas (inclusive sua dependência e complexidade), e entidades.
+
+    O texto é normalizado e tokenizado uma única vez por mensagem, com expressões compiladas no carregamento do
+    módulo (sem pipelines por sentença nem downloads); as sentenças resultantes são reaproveitadas pela
+    classificação de intenções, operações e perguntas e pela extração de entidades.
     """
 
     def process(self, message: InputMessage) -> SemanticDocument:
@@ -33,16 +52,18 @@ class NLU:
         domain = message.domain
         document = SemanticDocument()
         document.sentences = self._pre_process(text)
-        document.intents = self._classify_intents(document, domain)
-        document.operations = self._classify_operations(document, domain)
-        document.questions = self._classify_questions(document, domain)
-        document.entities = self._ner(document, domain)
+        sentences = list(document.get_sentences())
+        rules = [SENTENCE_RULES.match(sentence) for sentence in sentences]
+        document.intents = self._classify_intents(rules, domain)
+        document.operations = self._classify_operations(rules, domain)
+        document.questions = self._classify_questions(rules, domain)
+        document.entities = self._ner(sentences, domain)
         document.domain = domain
         return document
 
     def _pre_process(self, text: str) -> list[list[SemanticToken]]:
         """
-        Pré-processa o texto normalizando e tokenizando em sentenças e palavras usando a biblioteca NLTK.
+        Pré-processa o texto normalizando (minúsculas, sem acentos) e tokenizando em sentenças e palavras.
 
         Args:
             text (str): Texto a ser pré-processado.
@@ -50,103 +71,79 @@ class NLU:
         Returns:
             list[list[SemanticToken]]: Lista de sentenças tokenizadas.
         """
-        sentences = []
-        normalized_text = unidecode(text.lower())
-
-        for sentence in nltk.sent_tokenize(normalized_text, language='portuguese'):
-            tokens = []
-            pipeline = spacy.blank('pt')
-
-            for token in pipeline(sentence, disable=['parser', 'ner', 'textcat']):
-                semantic_token = SemanticToken(token.text, token.pos_)
-                tokens.append(semantic_token)
-
-            sentences.append(tokens)
-
-        return sentences
-
-    def _classify_intents(self, document: SemanticDocument, domain: str = 'transacional') -> list[Intent]:
+        normalized_text = unidecode(text.lower()).strip()
+        if not normalized_text:
+            return []
+        return [
+            [SemanticToken(token) for token in TOKEN.findall(sentence)]
+            for sentence in SENTENCE_BOUNDARY.split(normalized_text)
+        ]
+
+    def _classify_intents(self, rules: list[re.Match | None], domain: str = 'transacional') -> list[Intent]:
         """
-        Classifica as intenções em um documento semântico dentro de um domínio específico.
+        Classifica as intenções das sentenças dentro de um domínio específico.
 
         Args:
-            document (SemanticDocument): Documento contendo as sentenças processadas.
+            rules (list[re.Match | None]): Regra (SENTENCE_RULES) casada no início de cada sentença.
             domain (str): Domínio para classificação (default é 'transacional').
 
         Returns:
             list[Intent]: Lista de intenções identificadas.
         """
         intents = []
-        for sentence in document.get_sentences():
-            if sentence.startswith('ola') or sentence.startswith('bom'):
+        for rule in rules:
+            if rule and rule.lastgroup == 'saudacao':
                 intents.append(Intent.SAUDACAO)
-            elif sentence.startswith('tchau'):
+            elif rule and rule.lastgroup == 'despedida':
                 intents.append(Intent.DESPEDIDA)
-            elif sentence.startswith('qual'):
+            elif rule and rule.lastgroup == 'qual':
                 intents.append(Intent.REALIZAR)
-            elif sentence.startswith('o que'):
+            elif rule and rule.lastgroup == 'o_que':
                 intents.append(Intent.INFORMAR)
             else:
                 intents.append(None)
                 log.warning('Nenhuma intenção classificada')
         return intents
 
-    def _classify_operations(self, document: SemanticDocument, domain: str = 'transacional') -> list[str]:
+    def _classify_operations(self, rules: list[re.Match | None], domain: str = 'transacional') -> list[str]:
         """
-        Classifica as operações em um documento semântico dentro de um domínio específico.
+        Classifica as operações das sentenças dentro de um domínio específico.
 
         Args:
-            document (SemanticDocument): Documento contendo as sentenças processadas.
+            rules (list[re.Match | None]): Regra (SENTENCE_RULES) casada no início de cada sentença.
             domain (str): Domínio para classificação (default é 'transacional').
 
         Returns:
             list[str]: Lista de operações identificadas.
         """
-        operations = []
-        for sentence in document.get_sentences():
-            if sentence.startswith('qual'):
-                operations.append('consulta_de_saldo')
-            else:
-                operations.append(None)
-        return operations
+        return ['consulta_de_saldo' if rule and rule.lastgroup == 'qual' else None for rule in rules]
 
-    def _classify_questions(self, document: SemanticDocument, domain: str = 'transacional') -> list[Question]:
+    def _classify_questions(self, rules: list[re.Match | None], domain: str = 'transacional') -> list[Question]:
         """
-        Classifica as perguntas em um documento semântico dentro de um domínio específico.
+        Classifica as perguntas das sentenças dentro de um domínio específico.
 
         Args:
-            document (SemanticDocument): Documento contendo as sentenças processadas.
+            rules (list[re.Match | None]): Regra (SENTENCE_RULES) casada no início de cada sentença.
             domain (str): Domínio para classificação (default é 'transacional').
 
         Returns:
             list[Question]: Lista de perguntas identificadas.
         """
-        questions = []
-        for sentence in document.get_sentences():
-            if sentence.startswith('o que'):
-                questions.append(Question.O_QUE)
-            else:
-                questions.append(None)
-        return questions
+        return [Question.O_QUE if rule and rule.lastgroup == 'o_que' else None for rule in rules]
 
-    def _ner(self, document: SemanticDocument, domain: str = 'transacional') -> list[tuple[str, str]]:
+    def _ner(self, sentences: list[str], domain: str = 'transacional') -> list[tuple[str, str]]:
         """
-        Extrai entidades nomeadas em um documento semântico dentro de um domínio específico.
+        Extrai entidades nomeadas das sentenças (já tokenizadas) dentro de um domínio específico.
 
         Args:
-            document (SemanticDocument): Documento contendo as sentenças processadas.
+            sentences (list[str]): Sentenças normalizadas, com os tokens separados por espaço.
             domain (str): Domínio para classificação (default é 'transacional').
 
         Returns:
             list[tuple[str, str]]: Lista de entidades nomeadas e seus tipos.
         """
         entities = []
-        for sentence in document.get_sentences():
-            words = nltk.word_tokenize(sentence, language='portuguese')
-            if 'ted' in words:
-                entities.append(('TED', 'tipo_transferencia'))
-            if 'doc' in words:
-                entities.append(('DOC', 'tipo_transferencia'))
-            if 'pix' in words:
-                entities.append(('PIX', 'tipo_transferencia'))
+        for sentence in sentences:
+            keywords = set(ENTITY_PATTERN.findall(sentence))
+            entities.extend(ENTITY_KEYWORDS[keyword] for keyword in sorted(keywords, key=ENTITY_ORDER.get))
         return entities
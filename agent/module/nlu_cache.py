@@ -0,0 +1,146 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from unidecode import unidecode
+
+log = logging.getLogger('nlu_cache')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples. A pontuação é mantida ("pix" e "pix?" são mensagens diferentes)."""
+    return " ".join(unidecode(text.lower()).split())
+
+
+class NLUCache:
+    """
+    Cache das análises do NLU com LLM (NLUGemini), indexado pela mensagem normalizada (normalize) e pelo domínio.
+
+    Mensagens repetidas (sugestões de resposta rápida, "olá", perguntas frequentes) reaproveitam a análise já feita,
+    sem chamada ao LLM. As entradas expiram após ttl_seconds; acima de max_entries, as menos usadas recentemente
+    são descartadas. Apenas análises válidas são guardadas.
+
+    Opcionalmente (path), o cache é persistido em um arquivo JSON local, carregado na inicialização, para que
+    reinícios do agente mantenham as análises. O arquivo é regravado (de forma atômica) no máximo a cada
+    save_interval_seconds, quando há entradas novas, e no fechamento (close). A gravação é feita fora do lock das
+    entradas, a partir de uma cópia delas, para não bloquear get e put durante a escrita do arquivo.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0, max_entries: int = 5000, path: str = None,
+                 save_interval_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.save_interval_seconds = save_interval_seconds
+        self._lock = threading.Lock()
+        # Serializa as gravações do arquivo, para que uma cópia mais antiga não sobrescreva uma mais nova
+        self._save_lock = threading.Lock()
+        # (mensagem normalizada, domínio) -> (criação em time.time(), análise)
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, dict]]" = OrderedDict()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str, domain: str = '') -> dict | None:
+        """Cópia da análise em cache da mensagem no domínio, ou None."""
+        key = (normalize(text), domain or '')
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            hit_rate = self.hits / (self.hits + self.misses)
+        log.info(f"Analise do NLU em cache (taxa de acerto {hit_rate:.1%})")
+        return copy.deepcopy(entry[1])
+
+    def put(self, text: str, domain: str, analysis: dict) -> None:
+        key = (normalize(text), domain or '')
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(analysis))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            save_due = self.path and time.monotonic() - self._last_save >= self.save_interval_seconds
+        if save_due:
+            # Se outra gravação estiver em andamento, as entradas novas ficam para a próxima
+            self._save(blocking=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def close(self) -> None:
+        """Grava as entradas pendentes no arquivo, se houver."""
+        if self.path:
+            self._save()
+
+    def _save(self, blocking: bool = True) -> None:
+        if not self._save_lock.acquire(blocking=blocking):
+            return
+        try:
+            # As análises guardadas são cópias que não são alteradas depois de inseridas; basta copiar a lista
+            with self._lock:
+                if not self._dirty:
+                    return
+                now = time.time()
+                entries = [
+                    {"text": text, "domain": domain, "created_at": created_at, "analysis": analysis}
+                    for (text, domain), (created_at, analysis) in self._entries.items()
+                    if now - created_at <= self.ttl_seconds
+                ]
+                self._dirty = False
+                self._last_save = time.monotonic()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                log.error(f"Erro ao gravar o cache do NLU em {self.path}: {e}")
+                with self._lock:
+                    self._dirty = True
+        finally:
+            self._save_lock.release()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.error(f"Erro ao carregar o cache do NLU de {self.path}: {e}")
+            return
+        now = time.time()
+        for entry in entries[-self.max_entries:]:
+            if now - entry["created_at"] <= self.ttl_seconds:
+                self._entries[(entry["text"], entry["domain"])] = (entry["created_at"], entry["analysis"])
+        log.info(f"Cache do NLU carregado: {len(self._entries)} analises")
@@ -4,8 +4,8 @@ from model.action import Action
 from model.intent import Intent
 from model.state import State
 from model.question import Question
-from module.bt import BeliefTracker
 from module.km import KnowledgeManagement
+from module.session_store import SessionStore
 
 log = logging.getLogger('policy')
 
@@ -19,12 +19,17 @@ RECOMENDAR = 'recomendar'
 
 
 class Policy:
-    def __init__(self, bt: BeliefTracker, km: KnowledgeManagement, use_llm: bool = False):
-        self.bt = bt
+    def __init__(self, sessions: SessionStore, km: KnowledgeManagement, use_llm: bool = False):
+        """
+        Args:
+            sessions: Sessões dos usuários; act deve ser chamado dentro de sessions.session(user).
+            km: Gerenciador de conhecimento (RAG).
+        """
+        self.sessions = sessions
         self.km = km
         self._use_llm = use_llm
 
-    def act(self, user: str, states: list[State], original_message: str) -> list[Action]:
+    def act(self, user: str, states: list[State], original_message: str, stream: bool = False) -> list[Action]:
         """
         Decide quais ações tomar com base no estado atual e na mensagem original do usuário.
 
@@ -32,16 +37,17 @@ class Policy:
             user: Nome/ID do usuário.
             states: Lista de estados atuais.
             original_message: Mensagem original enviada pelo usuário.
+            stream: Se True, as respostas do KM são entregues em streaming (slot "resposta_stream").
 
         Returns:
             Lista de ações a serem executadas.
         """
         actions = []
         for state in self._select_states(states):
-            actions.extend(self.act_single_state(user, state, original_message))
+            actions.extend(self.act_single_state(user, state, original_message, stream))
         return actions
 
-    def act_single_state(self, user: str, state: State, original_message: str) -> list[Action]:
+    def act_single_state(self, user: str, state: State, original_message: str, stream: bool = False) -> list[Action]:
         if state.out_of_context:
             return [Action(intent=Intent.FORA_CONTEXTO)]
 
@@ -52,7 +58,7 @@ class Policy:
             return [self._act_goodbye(user)]
 
         elif state.intent == Intent.QUESTION or state.intent == Intent.INFORMAR:
-            return [self._act_question(original_message, state.domain)]
+            return [self._act_question(original_message, state.domain, state.rag_domain, stream, user, state.dependent)]
 
         # Fora dos intents válidos
         return [Action(intent=Intent.FORA_CONTEXTO)]
@@ -61,15 +67,23 @@ class Policy:
         return Action(intent=Intent.SAUDACAO, slots={"nome": user})
 
     def _act_goodbye(self, user: str) -> Action:
-        self.bt.clear()
+        self.sessions.get(user).clear()
+        self.km.forget_session(user)
         return Action(intent=Intent.DESPEDIDA)
 
-    def _act_question(self, message: str, domain: str) -> Action:
+    def _act_question(self, message: str, domain: str = None, rag_domain: str = None, stream: bool = False,
+                      user: str = None, dependent: bool = False) -> Action:
         """
-        Consulta o KM (RAG) com a pergunta original e o domínio identificado.
+        Consulta o KM (RAG) com a pergunta original, o domínio identificado pelo NLU e, se escolhido pelo
+        front-end, o domínio do RAG; o KM resolve os domínios do RAG a consultar. O usuário identifica a sessão no
+        RAG: perguntas dependentes da anterior reaproveitam a recuperação do turno anterior. Em streaming, a
+        consulta só é executada quando o NLG consome o slot "resposta_stream".
         """
+        if stream:
+            return Action(intent=Intent.INFORMAR, slots={"resposta_stream": self.km.query_knowledge_stream(message, domain, rag_domain, user, dependent)})
+
         try:
-            answer = self.km.query_knowledge(message)
+            answer = self.km.query_knowledge(message, domain, rag_domain, user, dependent)
             return Action(intent=Intent.INFORMAR, slots={"resposta": answer})
         except Exception as e:
             log.error(f"Erro ao consultar conhecimento: {e}")
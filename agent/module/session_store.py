@@ -0,0 +1,216 @@
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from module.bt import BeliefTracker
+
+log = logging.getLogger('session_store')
+
+
+@dataclass
+class Session:
+    """Sessão de um usuário: o Belief Tracker do diálogo e o lock que serializa os turnos da sessão."""
+    user: str
+    tracker: BeliefTracker
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    last_access: float = field(default_factory=time.monotonic)
+    states: int = 0
+    active: int = 0
+
+
+class SessionStore:
+    """
+    Gerenciador de sessões do agente: um BeliefTracker por usuário/sessão.
+
+    As sessões ficam em memória em ordem LRU. Uma sessão ociosa há mais de ttl_seconds expira e é descartada;
+    acima de max_sessions sessões ou de max_states estados somados (o limite de memória), as sessões usadas há
+    mais tempo são removidas. Sessões com turnos em andamento nunca são removidas.
+
+    Cada sessão tem o seu próprio lock (reentrante): turnos concorrentes do mesmo usuário são serializados,
+    enquanto usuários diferentes são atendidos em paralelo.
+
+    Opcionalmente (path), as sessões removidas pelo limite de memória e as sessões abertas no fechamento do
+    gerenciador são serializadas em um banco SQLite local e recarregadas no próximo acesso do usuário, desde que
+    não tenham expirado.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800.0, max_sessions: int = 1000, max_states: int = 50000,
+                 path: str = None):
+        """
+        Args:
+            ttl_seconds: Tempo máximo de inatividade de uma sessão.
+            max_sessions: Número máximo de sessões em memória.
+            max_states: Número máximo de estados (State) somados de todas as sessões em memória.
+            path: Arquivo SQLite para serializar as sessões. Se None, as sessões removidas são perdidas.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_states = max_states
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._states = 0
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self.restored = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (user TEXT PRIMARY KEY, tracker BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @contextmanager
+    def session(self, user: str) -> Iterator[BeliefTracker]:
+        """
+        Abre um turno da sessão do usuário (criando ou restaurando a sessão, se necessário) e retorna o seu
+        BeliefTracker. O lock da sessão fica com a thread até o fim do bloco.
+        """
+        with self._lock:
+            session = self._get_or_create(user)
+            session.active += 1
+        session.lock.acquire()
+        try:
+            yield session.tracker
+        finally:
+            session.lock.release()
+            with self._lock:
+                session.active -= 1
+                session.last_access = time.monotonic()
+                self._states += len(session.tracker) - session.states
+                session.states = len(session.tracker)
+                self._evict()
+
+    def get(self, user: str) -> BeliefTracker:
+        """
+        BeliefTracker da sessão do usuário, sem adquirir o lock da sessão. Deve ser usado dentro de session(user)
+        (por exemplo, pela Policy durante o turno).
+        """
+        with self._lock:
+            return self._get_or_create(user).tracker
+
+    def discard(self, user: str) -> None:
+        """Remove a sessão do usuário, da memória e do banco."""
+        with self._lock:
+            session = self._sessions.pop(user, None)
+            if session:
+                self._states -= session.states
+            self._delete(user)
+
+    def sweep(self) -> None:
+        """Remove as sessões expiradas (da memória e do banco) e aplica os limites de memória."""
+        with self._lock:
+            self._evict()
+            if self._db is not None:
+                self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "states": self._states,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "restored": self.restored,
+            }
+
+    def close(self) -> None:
+        """Serializa as sessões abertas (se houver banco) e fecha o banco."""
+        with self._lock:
+            if self._db is None:
+                return
+            for session in self._sessions.values():
+                self._persist(session)
+            self._db.close()
+            self._db = None
+
+    def _get_or_create(self, user: str) -> Session:
+        session = self._sessions.get(user)
+        if session is not None and session.active == 0 and self._is_expired(session):
+            self._remove(user, expired=True)
+            session = None
+
+        if session is None:
+            tracker = self._load(user) or BeliefTracker(user)
+            session = Session(user, tracker, states=len(tracker))
+            self._sessions[user] = session
+            self._states += session.states
+        self._sessions.move_to_end(user)
+        return session
+
+    def _is_expired(self, session: Session) -> bool:
+        return time.monotonic() - session.last_access > self.ttl_seconds
+
+    def _evict(self) -> None:
+        # Sessões expiradas, a partir da usada há mais tempo (as seguintes, em ordem LRU, foram usadas depois)
+        for user, session in list(self._sessions.items()):
+            if not self._is_expired(session):
+                break
+            if session.active == 0:
+                self._remove(user, expired=True)
+
+        # Limite de memória: remove as sessões ociosas usadas há mais tempo
+        for user, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and self._states <= self.max_states:
+                break
+            if session.active == 0:
+                self._remove(user, expired=False)
+
+    def _remove(self, user: str, expired: bool) -> None:
+        session = self._sessions.pop(user)
+        self._states -= session.states
+        if expired:
+            self.expired += 1
+            self._delete(user)
+            log.debug(f"Sessao expirada: {user}")
+        else:
+            self.evicted += 1
+            self._persist(session)
+            log.debug(f"Sessao removida pelo limite de memoria: {user}")
+
+    def _persist(self, session: Session) -> None:
+        if self._db is None:
+            return
+        try:
+            # O tempo de inatividade já decorrido é preservado, para que a sessão restaurada expire no mesmo momento
+            updated_at = time.time() - (time.monotonic() - session.last_access)
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (user, tracker, updated_at) VALUES (?, ?, ?)",
+                (session.user, pickle.dumps(session.tracker), updated_at),
+            )
+            self._db.commit()
+        except Exception as e:
+            log.error(f"Erro ao serializar a sessao {session.user}: {e}")
+
+    def _load(self, user: str) -> BeliefTracker | None:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT tracker, updated_at FROM sessions WHERE user = ?", (user,)).fetchone()
+        if row is None:
+            return None
+        self._delete(user)
+        tracker, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            return None
+        try:
+            tracker = pickle.loads(tracker)
+        except Exception as e:
+            log.error(f"Erro ao restaurar a sessao {user}: {e}")
+            return None
+        self.restored += 1
+        log.debug(f"Sessao restaurada: {user}")
+        return tracker
+
+    def _delete(self, user: str) -> None:
+        if self._db is None:
+            return
+        self._db.execute("DELETE FROM sessions WHERE user = ?", (user,))
+        self._db.commit()
@@ -0,0 +1,400 @@
+"""
+Modo de produção do agente: aplicação ASGI com pool limitado de workers, controle de admissão com fila, timeout
+por requisição e métricas no formato do Prometheus.
+
+Uso (a partir de agent/):
+    python server.py
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Configuração por variáveis de ambiente:
+    AGENT_WORKERS: turnos executados em paralelo (threads do pool). Padrão: 64.
+    AGENT_MAX_QUEUE: requisições aguardando um worker; acima disso a resposta é 503. Padrão: 256.
+    AGENT_QUEUE_TIMEOUT: segundos máximos de espera na fila (503 ao expirar). Padrão: 10.
+    AGENT_REQUEST_TIMEOUT: segundos máximos de um turno (504, ou evento "error" em streaming). Padrão: 60.
+    AGENT_HOST, AGENT_PORT: endereço do servidor em `python server.py`. Padrão: 0.0.0.0:8000.
+    Além das variáveis de app.py (AGENT_FUSED_FRONTEND, AGENT_NLU_CACHE e as das sessões) e de AGENT_DOMAIN_MAPPING
+    (mapeamento dos domínios do NLU para os domínios do RAG, lido pelo KnowledgeManagement).
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from jinja2 import Environment, FileSystemLoader
+
+from main import Agent
+from module.nlu_cache import NLUCache
+from module.session_store import SessionStore
+
+# Adiciona a raiz do projeto ao sys.path (histogramas de latência do RAG em rag/src/utils/latency.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from rag.src.utils.latency import LatencyTracker
+
+log = logging.getLogger('server')
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(AGENT_DIR, 'static')
+MAX_BODY_BYTES = 64 * 1024
+CONTENT_TYPES = {
+    '.js': 'application/javascript', '.css': 'text/css', '.png': 'image/png', '.jpg': 'image/jpeg',
+    '.svg': 'image/svg+xml', '.ico': 'image/x-icon', '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+}
+
+# Fim do streaming de um turno, enviado pelo worker à fila de eventos
+_END = object()
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class AgentServer:
+    """
+    Aplicação ASGI do agente.
+
+    Um único Agent (seguro para threads: cada usuário tem a sua sessão, com lock próprio) atende todas as
+    requisições. Os turnos, que fazem chamadas bloqueantes ao LLM e ao RAG, rodam em um pool de `workers` threads;
+    o event loop só recebe as requisições e envia as respostas, de modo que centenas de conexões (inclusive
+    streams SSE) ficam abertas sem ocupar uma thread cada.
+
+    Controle de admissão: com todos os workers ocupados, até `max_queue` requisições aguardam na fila, por no
+    máximo `queue_timeout_seconds`; as demais recebem 503 com Retry-After. Cada turno tem até
+    `request_timeout_seconds`: depois disso a resposta é 504 (em streaming, um evento "error"). O worker de um
+    turno expirado só é devolvido ao pool quando o turno termina (em streaming, o turno é interrompido no
+    próximo evento), para que o número de turnos em execução nunca passe de `workers`.
+    """
+
+    def __init__(self, agent_factory: Callable[[], Agent], workers: int = 64, max_queue: int = 256,
+                 queue_timeout_seconds: float = 10.0, request_timeout_seconds: float = 60.0):
+        self.agent_factory = agent_factory
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.request_timeout_seconds = request_timeout_seconds
+        self.agent: Agent | None = None
+        self.latency = LatencyTracker()
+        self.requests: dict[tuple[str, int], int] = {}
+        self.rejected: dict[str, int] = {}
+        self.timeouts = 0
+        self.in_flight = 0
+        self.queued = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-worker")
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._index = Environment(loader=FileSystemLoader(AGENT_DIR)).get_template('index.html').render(
+            url_for=lambda endpoint, filename: f"/static/{filename}"
+        ).encode('utf-8')
+
+    @classmethod
+    def from_env(cls) -> "AgentServer":
+        """Servidor configurado pelas variáveis de ambiente (ver o docstring do módulo)."""
+        workers = int(os.getenv("AGENT_WORKERS", "64"))
+
+        def agent_factory() -> Agent:
+            sessions = SessionStore(
+                ttl_seconds=float(os.getenv("AGENT_SESSION_TTL", "1800")),
+                max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "1000")),
+                path=os.getenv("AGENT_SESSION_DB"),
+            )
+            # O executor interno do Agent (NLU em paralelo ao filtro, filtros de saída) acompanha o pool de workers
+            return Agent(llm=True, fused_frontend=os.getenv("AGENT_FUSED_FRONTEND") == "1", sessions=sessions,
+                         executor_workers=2 * workers, nlu_cache=NLUCache(path=os.getenv("AGENT_NLU_CACHE")))
+
+        return cls(
+            agent_factory,
+            workers=workers,
+            max_queue=int(os.getenv("AGENT_MAX_QUEUE", "256")),
+            queue_timeout_seconds=float(os.getenv("AGENT_QUEUE_TIMEOUT", "10")),
+            request_timeout_seconds=float(os.getenv("AGENT_REQUEST_TIMEOUT", "60")),
+        )
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if method == "OPTIONS":
+            status = await self._respond(send, 204, b"", headers=[
+                (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                (b"access-control-allow-headers", b"Content-Type, Accept, X-Session-Id"),
+            ])
+        elif path == "/chat" and method == "POST":
+            status = await self._chat(scope, receive, send)
+        elif path == "/metrics" and method == "GET":
+            status = await self._respond(send, 200, self.metrics().encode('utf-8'), "text/plain; version=0.0.4")
+        elif path == "/health" and method == "GET":
+            status = await self._json(send, 200 if self.agent else 503, {
+                "status": "ok" if self.agent else "starting", "in_flight": self.in_flight, "queued": self.queued,
+            })
+        elif path == "/" and method == "GET":
+            status = await self._respond(send, 200, self._index, CONTENT_TYPES['.html'])
+        elif path.startswith("/static/") and method == "GET":
+            status = await self._static(path[len("/static/"):], send)
+        else:
+            status = await self._json(send, 404, {"error": "Rota nao encontrada"})
+        key = (path if path in ("/chat", "/metrics", "/health", "/") else "other", status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    log.error(f"Erro ao iniciar o agente: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        """Cria o Agent (carrega modelos e índices) fora do event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.workers)
+        self.agent = await self._loop.run_in_executor(None, self.agent_factory)
+        log.info(f"Agente pronto: {self.workers} workers, fila de {self.max_queue} requisicoes")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.agent:
+            self.agent.sessions.close()
+            self.agent.nlu_cache.close()
+
+    async def _admit(self) -> str | None:
+        """Reserva um worker, esperando na fila se necessário. Retorna o motivo da recusa, ou None se admitido."""
+        if self.agent is None:
+            return "starting"
+        if self.in_flight + self.queued >= self.workers + self.max_queue:
+            return "queue_full"
+
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.queued -= 1
+        self.latency.record("queue_wait", time.perf_counter() - start)
+        self.in_flight += 1
+        return None
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """Executa fn no pool; o worker é liberado (no event loop) quando fn termina, mesmo após um timeout."""
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Event loop já encerrado (shutdown)
+            pass
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def _chat(self, scope: dict, receive: Callable, send: Callable) -> int:
+        try:
+            data = json.loads(await self._read_body(receive) or b"{}")
+        except _BodyTooLarge:
+            return await self._json(send, 413, {'error': 'Mensagem muito grande'})
+        except ValueError:
+            return await self._json(send, 400, {'error': 'Requisicao invalida'})
+        message = data.get('message') if isinstance(data, dict) else None
+        if not message:
+            return await self._json(send, 400, {'error': 'Mensagem vazia'})
+
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get("headers", [])}
+        client = scope.get("client")
+        user = str(data.get('session_id') or headers.get('x-session-id') or (client[0] if client else None) or 'local')
+
+        rejection = await self._admit()
+        if rejection:
+            self.rejected[rejection] = self.rejected.get(rejection, 0) + 1
+            log.warning(f"Requisicao recusada ({rejection}): {self.in_flight} em execucao, {self.queued} na fila")
+            return await self._json(send, 503, {'error': 'Servidor ocupado, tente novamente'},
+                                    headers=[(b"retry-after", b"1")])
+
+        if data.get('stream') or 'text/event-stream' in headers.get('accept', ''):
+            return await self._chat_stream(user, message, receive, send)
+
+        start = time.perf_counter()
+        future = self._submit(self.agent.chat, user, message)
+        try:
+            responses = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.request_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning(f"Turno acima de {self.request_timeout_seconds}s para a sessao {user}")
+            return await self._json(send, 504, {'error': 'Tempo limite excedido'})
+        except Exception as e:
+            log.error(f"Erro ao processar a mensagem: {e}")
+            return await self._json(send, 500, {'error': 'Erro ao gerar a resposta'})
+        finally:
+            self.latency.record("chat", time.perf_counter() - start)
+        return await self._json(send, 200, {'responses': responses})
+
+    async def _chat_stream(self, user: str, message: str, receive: Callable, send: Callable) -> int:
+        """Turno em streaming (Server-Sent Events), nos mesmos eventos de app.py."""
+        events: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        start = time.perf_counter()
+        self._submit(self._produce, user, message, cancelled,
+                     lambda item: self._loop.call_soon_threadsafe(events.put_nowait, item))
+        disconnect = asyncio.ensure_future(self._wait_disconnect(receive, cancelled, events))
+
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no"),
+            (b"access-control-allow-origin", b"*"),
+        ]})
+        deadline = time.perf_counter() + self.request_timeout_seconds
+        first_event = True
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), max(0.0, deadline - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    log.warning(f"Turno em streaming acima de {self.request_timeout_seconds}s para a sessao {user}")
+                    await self._send_event(send, "error", {'type': 'error', 'error': 'Tempo limite excedido'})
+                    break
+                if item is _END or cancelled.is_set():
+                    break
+                if isinstance(item, Exception):
+                    await self._send_event(send, "error", {'type': 'error', 'error': 'Erro ao gerar a resposta'})
+                    break
+                if first_event:
+                    self.latency.record("first_event", time.perf_counter() - start)
+                    first_event = False
+                await self._send_event(send, item['type'], item)
+            await self._send_event(send, "done", {}, more_body=False)
+        finally:
+            # Interrompe o turno no próximo evento (timeout ou desconexão do cliente)
+            cancelled.set()
+            disconnect.cancel()
+            self.latency.record("chat_stream", time.perf_counter() - start)
+        return 200
+
+    def _produce(self, user: str, message: str, cancelled: threading.Event, put: Callable) -> None:
+        """Consome Agent.chat_stream no worker, repassando os eventos ao event loop."""
+        stream = self.agent.chat_stream(user=user, text=message)
+        try:
+            for event in stream:
+                if cancelled.is_set():
+                    break
+                put(event)
+        except Exception as e:
+            log.error(f"Erro durante o streaming da resposta: {e}")
+            put(e)
+        finally:
+            stream.close()
+            put(_END)
+
+    @staticmethod
+    async def _wait_disconnect(receive: Callable, cancelled: threading.Event, events: asyncio.Queue) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        cancelled.set()
+        events.put_nowait(_END)
+
+    @staticmethod
+    async def _send_event(send: Callable, event: str, data: dict, more_body: bool = True) -> None:
+        payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+        await send({"type": "http.response.body", "body": payload, "more_body": more_body})
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise _BodyTooLarge()
+            if not message.get("more_body"):
+                return body
+
+    async def _static(self, filename: str, send: Callable) -> int:
+        path = os.path.realpath(os.path.join(STATIC_DIR, filename))
+        if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path):
+            return await self._json(send, 404, {"error": "Arquivo nao encontrado"})
+        with open(path, 'rb') as f:
+            body = f.read()
+        content_type = CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+        return await self._respond(send, 200, body, content_type)
+
+    async def _json(self, send: Callable, status: int, data: dict, headers: list = ()) -> int:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return await self._respond(send, status, body, "application/json", headers)
+
+    @staticmethod
+    async def _respond(send: Callable, status: int, body: bytes, content_type: str = None, headers: list = ()) -> int:
+        response_headers = [(b"access-control-allow-origin", b"*"), (b"content-length", str(len(body)).encode())]
+        if content_type:
+            response_headers.append((b"content-type", content_type.encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers + list(headers)})
+        await send({"type": "http.response.body", "body": body})
+        return status
+
+    def metrics(self) -> str:
+        """Métricas do servidor, das sessões, do NLU local e das etapas do RAG, no formato texto do Prometheus."""
+        lines = [
+            "# HELP agent_requests_total Requisicoes HTTP atendidas, por rota e status.",
+            "# TYPE agent_requests_total counter",
+        ]
+        for (route, status), count in sorted(self.requests.items()):
+            lines.append(f'agent_requests_total{{route="{route}",status="{status}"}} {count}')
+        lines += ["# HELP agent_rejected_total Requisicoes recusadas pelo controle de admissao, por motivo.",
+                  "# TYPE agent_rejected_total counter"]
+        for reason, count in sorted(self.rejected.items()):
+            lines.append(f'agent_rejected_total{{reason="{reason}"}} {count}')
+        gauges = {
+            "agent_timeouts_total": ("counter", "Turnos interrompidos pelo tempo limite.", self.timeouts),
+            "agent_in_flight": ("gauge", "Turnos em execucao.", self.in_flight),
+            "agent_queued": ("gauge", "Requisicoes aguardando um worker.", self.queued),
+            "agent_workers": ("gauge", "Tamanho do pool de workers.", self.workers),
+        }
+        if self.agent:
+            for name, value in self.agent.sessions.stats().items():
+                gauges[f"agent_sessions_{name}"] = ("gauge", f"Sessoes: {name}.", value)
+            if self.agent.fast_nlu:
+                stats = self.agent.fast_nlu.stats()
+                gauges["agent_fast_nlu_hits_total"] = ("counter", "Acertos do NLU local.", stats["hits"])
+                gauges["agent_fast_nlu_misses_total"] = ("counter", "Mensagens enviadas ao NLU com LLM.", stats["misses"])
+            stats = self.agent.nlu_cache.stats()
+            gauges["agent_nlu_cache_hits_total"] = ("counter", "Analises do NLU servidas pelo cache.", stats["hits"])
+            gauges["agent_nlu_cache_misses_total"] = ("counter", "Analises do NLU fora do cache.", stats["misses"])
+            gauges["agent_nlu_cache_entries"] = ("gauge", "Analises em cache.", stats["entries"])
+        for name, (kind, description, value) in gauges.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+        text = "\n".join(lines) + "\n"
+        text += self.latency.to_prometheus("agent_latency_seconds", "Latencia dos turnos do agente, por etapa.")
+        if self.agent:
+            text += self.agent.km.rag_interface.latency_metrics_prometheus()
+        return text
+
+
+app = AgentServer.from_env()
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("O modo de producao requer o pacote uvicorn (pip install uvicorn)")
+    uvicorn.run(app, host=os.getenv("AGENT_HOST", "0.0.0.0"), port=int(os.getenv("AGENT_PORT", "8000")),
+                log_level="info")
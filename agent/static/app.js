@@ -31,13 +31,15 @@ if (elements.headerToggle) {
 }
 
 // QUICK REPLIES
-const suggestions = [
-  'Segunda via do boleto',
-  'Acompanhar minha matrícula',
-  'Problemas com login',
-  'Mais informações sobre cursos',
-];
-renderQuickReplies(suggestions);
+// A lista fica em static/quick_replies.json, também usada pelo classificador local do agente (module/fast_nlu.py)
+let quickReplies = { initial: [], follow_up: [], default: [] };
+fetch('/static/quick_replies.json')
+  .then(response => response.json())
+  .then(data => {
+    quickReplies = data;
+    renderQuickReplies(quickReplies.initial);
+  })
+  .catch(error => console.error('Erro ao carregar as respostas rápidas', error));
 function renderQuickReplies(items) {
   elements.quickReplies.innerHTML = '';
   items.forEach(text => {
@@ -168,24 +170,73 @@ function hideTyping() {
 }
 
 // BACKEND INTEGRATION
+// ID da sessão enviado ao backend, que mantém o contexto do diálogo de cada sessão
+const SESSION_KEY = 'chat-session-id';
+function sessionId() {
+  let id = localStorage.getItem(SESSION_KEY);
+  if (!id) {
+    id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`);
+    localStorage.setItem(SESSION_KEY, id);
+  }
+  return id;
+}
+
+// A resposta chega em streaming (Server-Sent Events): eventos "delta" trazem trechos de cada resposta,
+// "response" o texto final (já filtrado) que substitui os trechos, e "done" encerra o stream.
 async function callBackend(userText) {
   showTyping();
   try {
     const response = await fetch('/chat', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ message: userText })
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+      body: JSON.stringify({ message: userText, stream: true, session_id: sessionId() })
     });
-    const data = await response.json();
+    if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+    const bubbles = [];
+    const bubbleFor = (index) => {
+      if (!bubbles[index]) {
+        hideTyping();
+        appendMessage('bot', { type: 'text', text: '' });
+        bubbles[index] = elements.messages.lastElementChild.querySelector('.bubble');
+      }
+      return bubbles[index];
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let finished = false;
+    let errorShown = false;
+    while (!finished) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let separator;
+      while ((separator = buffer.indexOf('\n\n')) !== -1) {
+        const event = parseSseEvent(buffer.slice(0, separator));
+        buffer = buffer.slice(separator + 2);
+        if (!event) continue;
+
+        if (event.type === 'delta') {
+          bubbleFor(event.index).textContent += event.text;
+        } else if (event.type === 'response') {
+          bubbleFor(event.index).textContent = event.text;
+        } else if (event.type === 'error') {
+          hideTyping();
+          appendMessage('bot', { type: 'text', text: 'Erro ao se comunicar com o servidor.' });
+          errorShown = true;
+        } else if (event.type === 'done') {
+          finished = true;
+        }
+        scrollToBottom();
+      }
+    }
     hideTyping();
 
-    const botResponses = data.responses || [];
-    if (botResponses.length === 0) {
+    if (bubbles.length === 0 && !errorShown) {
       appendMessage('bot', { type: 'text', text: 'Desculpe, não entendi. Pode repetir?' });
-    } else {
-      botResponses.forEach(reply => {
-        appendMessage('bot', { type: 'text', text: reply });
-      });
     }
 
     // Atualiza quick replies baseado na última mensagem, se desejar
@@ -199,13 +250,23 @@ async function callBackend(userText) {
   }
 }
 
+function parseSseEvent(block) {
+  let type = 'message';
+  const data = [];
+  block.split('\n').forEach(line => {
+    if (line.startsWith('event:')) type = line.slice(6).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+  });
+  if (!data.length) return null;
+  const payload = JSON.parse(data.join('\n'));
+  return { ...payload, type };
+}
+
 // SUGESTÕES dinâmicas simples (pode evoluir)
 function suggestNext(text) {
   const t = text.toLowerCase();
-  if (t.includes('boleto')) return ['Ver boleto', 'Gerar nova via'];
-  if (t.includes('curso')) return ['Lista de cursos', 'Modalidades'];
-  if (t.includes('matrícula')) return ['Ver status', 'Atualizar dados'];
-  return ['Falar com atendente', 'Ajuda com login', 'Mais informações'];
+  const rule = quickReplies.follow_up.find(r => t.includes(r.keyword));
+  return rule ? rule.replies : quickReplies.default;
 }
 
 // Mensagem de boas-vindas
@@ -15,13 +15,14 @@ Usage:
 import sys
 import os
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from datetime import datetime
 
 from rag.src.config import AppConfig
 from rag.src.config.config_manager import ConfigManager
 from rag.src.models import Domain, Chunk
 from rag.src.query_processing.query_orchestrator import QueryOrchestrator
+from rag.src.query_processing.query_context import QueryContext
 from rag.src.utils.domain_manager import DomainManager
 from rag.src.utils.sqlite_manager import SQLiteManager
 from rag.src.utils.logger import get_logger
@@ -29,6 +30,7 @@ from rag.src.utils.logger import get_logger
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from agent.generator import Generator
+from agent.llm_client import LLMClientFactory
 
 class RAGInterfaceError(Exception):
     """Base exception for RAG Interface errors."""
@@ -43,7 +45,8 @@ class RAGInterface:
     and generating answers using the LLM.
     """
     
-    def __init__(self, config_path: Optional[str] = None, config: Optional[AppConfig] = None, llm_generator: Optional[Generator] = None):
+    def __init__(self, config_path: Optional[str] = None, config: Optional[AppConfig] = None, llm_generator: Optional[Generator] = None,
+                 client_factory: Optional[LLMClientFactory] = None):
         """
         Initialize the RAG Interface.
         
@@ -51,6 +54,7 @@ class RAGInterface:
             config_path: Path to config.toml file. If None, uses default path.
             config: Pre-configured AppConfig instance. If provided, config_path is ignored.
             llm_generator: Pre-configured LLM generator instance. If provided, config_path and config are ignored.
+            client_factory: Shared LLM client factory (connection pool) used by the default Gemini generator.
         Raises:
             RAGInterfaceError: If initialization fails.
         """
@@ -85,7 +89,7 @@ class RAGInterface:
                 log_domain="RAG Interface"
             )
             # Initialize query orchestrator
-            self.query_orchestrator = QueryOrchestrator(self.config, self.sqlite_manager, llm_generator)
+            self.query_orchestrator = QueryOrchestrator(self.config, self.sqlite_manager, llm_generator, client_factory)
             
             self.logger.info("RAG Interface initialized successfully")
             
@@ -95,13 +99,18 @@ class RAGInterface:
 
     
 
-    def query_llm(self, question: str, domains: Optional[List[str]] = None) -> Dict[str, Any]:
+    def query_llm(self, question: str, domains: Optional[List[str]] = None, session_id: Optional[str] = None,
+                  follow_up: bool = False) -> Dict[str, Any]:
         """
         Query the RAG system and generate an answer using the LLM.
         
         Args:
             question: The question to ask.
             domains: Optional list of domain names to search. If None, auto-selects domains.
+            session_id: Optional conversation id. The turn's retrieval (domains, query embedding and
+                top chunks) is kept for the next turn of the same session.
+            follow_up: Whether the question depends on the previous turn of the session. Follow-ups reuse
+                the previous domains and chunks, completed by a cheap incremental search.
             
         Returns:
             Dictionary containing:
@@ -111,7 +120,8 @@ class RAGInterface:
                 - embedding_model: Model used for embeddings
                 - faiss_index_type: Type of FAISS index used
                 - success: Boolean indicating success
-                - processing_duration: Time taken for processing
+                - processing_duration: Time taken for processing, in seconds
+                - stage_durations: Seconds spent in each pipeline stage
                 - selected_domains: List of domain names used (if auto-selected)
                 
         Raises:
@@ -124,7 +134,8 @@ class RAGInterface:
             raise ValueError("Question cannot be empty")
         
         try:
-            result = self.query_orchestrator.query_llm(question, domains)
+            with self.query_orchestrator.latency.span("interface_query_llm"):
+                result = self.query_orchestrator.query_llm(question, domains, session_id, follow_up)
             
             # Add selected domains info if auto-selected
             if domains is None and "selected_domains" not in result:
@@ -141,6 +152,56 @@ class RAGInterface:
             self.logger.error(f"LLM query failed: {e}", exc_info=True)
             raise RAGInterfaceError(f"Query failed: {e}") from e
 
+    def query_llm_stream(self, question: str, domains: Optional[List[str]] = None,
+                         result: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None,
+                         follow_up: bool = False) -> Iterator[str]:
+        """
+        Streaming variant of query_llm: yields the answer text as the LLM generates it.
+        
+        Domain selection and retrieval run before the first piece is yielded.
+        
+        Args:
+            question: The question to ask.
+            domains: Optional list of domain names to search. If None, auto-selects domains.
+            result: Optional dictionary filled, once the iterator is exhausted, with the same
+                data returned by query_llm. Each call should pass its own dictionary.
+            session_id: Optional conversation id, as in query_llm.
+            follow_up: Whether the question depends on the previous turn of the session.
+            
+        Yields:
+            Pieces of the generated answer.
+                
+        Raises:
+            RAGInterfaceError: If query fails.
+            ValueError: If question is empty or invalid.
+        """
+        self.logger.info("Processing streaming LLM query", question=question, domains=domains)
+        
+        if not question or not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        return self._stream_answer(question, domains, result, session_id, follow_up)
+
+    def _stream_answer(self, question: str, domains: Optional[List[str]], result: Optional[Dict[str, Any]],
+                       session_id: Optional[str] = None, follow_up: bool = False) -> Iterator[str]:
+        context = QueryContext()
+        try:
+            yield from self.query_orchestrator.query_llm_stream(question, domains, context, session_id, follow_up)
+            
+            metrics = context.metrics
+            if domains is None and "selected_domains" not in metrics:
+                metrics["selected_domains"] = domains or []
+            if result is not None:
+                result.update(metrics)
+            
+            self.logger.info("Streaming LLM query completed successfully", 
+                           success=metrics.get("success", False),
+                           duration=metrics.get("processing_duration"))
+            
+        except Exception as e:
+            self.logger.error(f"Streaming LLM query failed: {e}", exc_info=True)
+            raise RAGInterfaceError(f"Query failed: {e}") from e
+
     def retrieve_chunks(self, question: str, domains: Optional[List[str]] = None, k: Optional[int] = None) -> List[Chunk]:
         """
         Retrieve relevant chunks without generating an LLM answer.
@@ -163,26 +224,128 @@ class RAGInterface:
             raise ValueError("Question cannot be empty")
         
         try:
-            # Use the orchestrator's internal methods for retrieval
-            selected_domains = self.query_orchestrator._select_domains(question, domains)
+            with self.query_orchestrator.latency.span("interface_retrieve_chunks"):
+                all_chunks = self.query_orchestrator.retrieve_chunks(question, domains, k)
             
-            all_chunks = []
-            for domain in selected_domains:
-                query_embedding = self.query_orchestrator._process_query(question, domain)
-                domain_chunks = self.query_orchestrator._retrieve_documents(query_embedding, domain)
-                all_chunks.extend(domain_chunks)
+            self.logger.info(f"Retrieved {len(all_chunks)} chunks successfully")
+            return all_chunks
+            
+        except Exception as e:
+            self.logger.error(f"Chunk retrieval failed: {e}", exc_info=True)
+            raise RAGInterfaceError(f"Retrieval failed: {e}") from e
+
+    async def aquery_llm(self, question: str, domains: Optional[List[str]] = None, session_id: Optional[str] = None,
+                         follow_up: bool = False) -> Dict[str, Any]:
+        """
+        Async variant of query_llm for callers running on an event loop.
+        
+        Retrieval (embeddings, FAISS, SQLite) runs on the orchestrator's bounded executor and the answer
+        is generated with the async LLM client, so the loop is never blocked.
+        
+        Args:
+            question: The question to ask.
+            domains: Optional list of domain names to search. If None, auto-selects domains.
+            session_id: Optional conversation id, as in query_llm.
+            follow_up: Whether the question depends on the previous turn of the session.
             
-            # Limit to k if specified
-            if k is not None and len(all_chunks) > k:
-                all_chunks = all_chunks[:k]
+        Returns:
+            The same dictionary returned by query_llm.
+                
+        Raises:
+            RAGInterfaceError: If query fails.
+            ValueError: If question is empty or invalid.
+        """
+        self.logger.info("Processing async LLM query", question=question, domains=domains)
+        
+        if not question or not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        try:
+            with self.query_orchestrator.latency.span("interface_aquery_llm"):
+                result = await self.query_orchestrator.aquery_llm(question, domains, session_id, follow_up)
+            
+            if domains is None and "selected_domains" not in result:
+                result["selected_domains"] = domains or []
+            
+            self.logger.info("Async LLM query completed successfully", 
+                           success=result.get("success", False),
+                           duration=result.get("processing_duration"))
+            
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Async LLM query failed: {e}", exc_info=True)
+            raise RAGInterfaceError(f"Query failed: {e}") from e
+
+    async def aretrieve_chunks(self, question: str, domains: Optional[List[str]] = None, k: Optional[int] = None) -> List[Chunk]:
+        """
+        Async variant of retrieve_chunks, run on the orchestrator's bounded executor.
+        
+        Args:
+            question: The question to search for.
+            domains: Optional list of domain names to search. If None, auto-selects domains.
+            k: Number of chunks to retrieve. If None, uses default from config.
+            
+        Returns:
+            List of Chunk objects containing relevant content.
+            
+        Raises:
+            RAGInterfaceError: If retrieval fails.
+            ValueError: If question is empty or invalid.
+        """
+        self.logger.info("Retrieving chunks (async)", question=question, domains=domains, k=k)
+        
+        if not question or not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        try:
+            with self.query_orchestrator.latency.span("interface_aretrieve_chunks"):
+                all_chunks = await self.query_orchestrator.aretrieve_chunks(question, domains, k)
             
             self.logger.info(f"Retrieved {len(all_chunks)} chunks successfully")
             return all_chunks
             
         except Exception as e:
-            self.logger.error(f"Chunk retrieval failed: {e}", exc_info=True)
+            self.logger.error(f"Async chunk retrieval failed: {e}", exc_info=True)
             raise RAGInterfaceError(f"Retrieval failed: {e}") from e
 
+    def list_domains(self, populated_only: bool = False) -> List[Domain]:
+        """
+        List the knowledge domains.
+        
+        Args:
+            populated_only: If True, only domains that already received documents.
+            
+        Returns:
+            List of Domain objects (served from the in-memory domain catalog).
+        """
+        catalog = self.query_orchestrator.domain_catalog
+        return catalog.get_populated_domains() if populated_only else catalog.get_domains()
+
+    def latency_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Latency of each query stage since startup (or the last reset_latency_metrics).
+        
+        Returns:
+            Dictionary keyed by stage (e.g. "query", "embedding", "faiss_search", "generation",
+            "first_token", "interface_query_llm") with count, sum, min, max and p50/p90/p95/p99, in seconds.
+        """
+        return self.query_orchestrator.latency.snapshot()
+
+    def latency_metrics_prometheus(self) -> str:
+        """
+        Latency of each query stage in the Prometheus text exposition format, ready to be served on /metrics.
+        """
+        return self.query_orchestrator.latency.to_prometheus()
+
+    def forget_session(self, session_id: str) -> None:
+        """Drop the retrieval kept for a session (e.g. when the conversation ends)."""
+        self.query_orchestrator.retrieval_memory.discard(session_id)
+
+    def reset_latency_metrics(self) -> None:
+        """Clear the latency histograms."""
+        self.query_orchestrator.latency.reset()
+
     def get_config(self) -> AppConfig:
         """
         Get the current configuration.
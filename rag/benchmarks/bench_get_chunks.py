@@ -0,0 +1,95 @@
+"""
+Benchmark da recuperação ordenada de chunks por ids (SQLiteManager.get_chunks).
+
+Compara a consulta antiga (ORDER BY CASE id WHEN ... END montado a cada chamada, com validação
+pydantic e json.loads do metadata por linha) com o caminho atual (statements de aridade fixa,
+reordenação em Python e metadata decodificado sob demanda).
+
+Uso (a partir da raiz do repositório):
+    python -m rag.benchmarks.bench_get_chunks [--chunks 20000] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import List
+
+from rag.src.config.models import SystemConfig
+from rag.src.models import Chunk, DocumentFile
+from rag.src.utils.sqlite_manager import SQLiteManager
+
+K_VALUES = (5, 10, 50, 100, 250, 500, 1000)
+
+
+def legacy_get_chunks(conn: sqlite3.Connection, chunk_ids: List[int]) -> List[Chunk]:
+    """Implementação anterior de get_chunks para chunk_ids, mantida aqui como referência."""
+    order_cases = " ".join([f"WHEN {index} THEN {i}" for i, index in enumerate(chunk_ids)])
+    placeholders = ", ".join(['?'] * len(chunk_ids))
+    query = f"""
+        SELECT id, document_id, content, metadata, created_at
+        FROM chunks
+        WHERE id IN ({placeholders})
+        ORDER BY CASE id
+            {order_cases}
+        END
+    """
+    cursor = conn.execute(query, chunk_ids)
+    return [
+        Chunk(id=row[0], document_id=row[1], content=row[2], metadata=json.loads(row[3]), created_at=row[4])
+        for row in cursor.fetchall()
+    ]
+
+
+def populate(manager: SQLiteManager, db_path: str, total_chunks: int) -> List[int]:
+    with manager.get_connection(db_path=db_path) as conn:
+        manager.begin(conn)
+        document = DocumentFile(id=None, hash="bench", name="bench.pdf", path="/bench.pdf", total_pages=1)
+        doc_id = manager.insert_document_file(document, conn)
+        chunks = [
+            Chunk(
+                document_id=doc_id,
+                content=f"chunk {i} " + "lorem ipsum dolor sit amet " * 30,
+                metadata={"page_number": i // 10, "index_in_doc": i, "keywords": ["lorem", "ipsum", str(i)]},
+            )
+            for i in range(total_chunks)
+        ]
+        ids = manager.insert_chunks(chunks, doc_id, conn)
+        conn.commit()
+    return ids
+
+
+def time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="Número de chunks no banco de teste")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetições por valor de k")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = SQLiteManager(SystemConfig(storage_base_path=tmp_dir), log_domain="benchmark")
+        db_path = os.path.join(tmp_dir, "bench.db")
+        ids = populate(manager, db_path, args.chunks)
+        rng = random.Random(42)
+
+        print(f"{'k':>6} | {'legacy (ms)':>12} | {'atual (ms)':>11} | {'speedup':>8}")
+        print("-" * 47)
+        with sqlite3.connect(db_path) as conn:
+            for k in K_VALUES:
+                request_ids = rng.sample(ids, k)
+                legacy_ms = time_call(lambda: legacy_get_chunks(conn, request_ids), args.repeat)
+                current_ms = time_call(lambda: manager.get_chunks(conn, chunk_ids=request_ids), args.repeat)
+                assert [c.id for c in manager.get_chunks(conn, chunk_ids=request_ids)] == request_ids
+                print(f"{k:>6} | {legacy_ms:>12.3f} | {current_ms:>11.3f} | {legacy_ms / current_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,12 @@ from rag.src.utils.logger import get_logger, setup_logging
 from rag.src.config.config_manager import ConfigurationError, ConfigManager
 from pathlib import Path
 from rag.src.config.models import AppConfig
-from rag.src.utils import DomainManager, SQLiteManager 
+from rag.src.utils import DomainManager, SQLiteManager, FaissManager
 from rag.src.data_ingestion import DataIngestionOrchestrator
 from rag.src.query_processing import QueryOrchestrator
 from rag.src.query_processing.hf_llm_adapter import HuggingFaceLLMAdapter
 from agent.generator import Generator
+from agent.llm_policy import LLMCallPolicy
 
 logger = get_logger(__name__, log_domain="streamlit_utils")
 
@@ -144,7 +145,8 @@ def get_query_orchestrator(_config: AppConfig) -> Optional[QueryOrchestrator]:
         if provider == "gemini" and os.getenv("GEMINI_API_KEY"):
             logger.info("Selecionando provedor Gemini para GUI", model=gem_model)
             try:
-                llm_impl = Generator(model_name=gem_model, max_tokens=max_tokens, temperature=temperature)
+                llm_impl = Generator(model_name=gem_model, max_tokens=max_tokens, temperature=temperature,
+                                     policy=LLMCallPolicy.from_config(_config.llm))
             except Exception as e:
                 logger.warning("Falha ao inicializar Generator(Gemini); alternando para Hugging Face", error=str(e))
 
@@ -256,6 +258,12 @@ def delete_document_from_domain(domain_manager, domain_name: str, document_file:
         logger.info(f"Tentando deletar documento ID {document_file.id} ({document_file.name}) do domínio '{domain_name}' no DB: {domain.db_path}")
         with domain_manager.sqlite_manager.get_connection(db_path=domain.db_path) as domain_conn:
             domain_manager.sqlite_manager.begin(domain_conn)
+            # Desconta os embeddings dos chunks do documento do centroide usado no roteamento de domínios
+            chunk_ids = [chunk.id for chunk in domain_manager.sqlite_manager.get_chunks(domain_conn, file_id=document_file.id)]
+            embedding_sum, count = FaissManager(domain_manager.config).get_embeddings_sum(
+                domain.vector_store_path, domain.embeddings_dimension, ids=chunk_ids
+            )
+            domain_manager.sqlite_manager.remove_from_domain_centroid(domain_conn, embedding_sum, count)
             domain_manager.sqlite_manager.delete_document_file(document_file, domain_conn)
             domain_conn.commit()
             logger.info(f"Documento ID {document_file.id} deletado com sucesso do DB do domínio.")
@@ -4,7 +4,8 @@ from time import time
 from typing import Dict
 from src.data_ingestion import DataIngestionOrchestrator
 from src.query_processing import QueryOrchestrator
-from src.utils import DomainManager
+from src.utils import DomainManager, SQLiteManager
+from src.config.config_manager import ConfigManager
 from src.utils.logger import setup_logging, get_logger
 
 print("Iniciando a aplicação")
@@ -99,6 +100,54 @@ def answer_question(question: str) -> Dict[str, any]:
         logger.error("Erro durante a geracao de resposta", question=question, error=str(e))
         raise e
 
+def _get_domain_manager() -> DomainManager:
+    config = ConfigManager().get_config()
+    return DomainManager(config, SQLiteManager(config.system, log_domain="cli"), log_domain="cli")
+
+def set_domain_compression(domain_name: str, mode: str) -> None:
+    """
+    Define o modo de compressão dos chunks de um domínio de conhecimento.
+
+    Args:
+        domain_name (str): Nome do domínio de conhecimento.
+        mode (str): "none", "zlib" ou "zstd".
+    """
+    logger.info("Definindo compressao do dominio de conhecimento", domain_name=domain_name, mode=mode)
+    try:
+        _get_domain_manager().set_domain_compression(domain_name, mode)
+        print(f"Compressão '{mode}' definida para o domínio {domain_name}. Afeta apenas os chunks inseridos a partir de agora.")
+    except Exception as e:
+        logger.error("Erro ao definir a compressao do dominio", error=str(e))
+        raise e
+
+def storage_stats(domain_name: str) -> Dict[str, any]:
+    """
+    Exibe estatísticas de armazenamento dos chunks de um domínio de conhecimento.
+
+    Args:
+        domain_name (str): Nome do domínio de conhecimento.
+    """
+    logger.info("Calculando estatisticas de armazenamento", domain_name=domain_name)
+    try:
+        stats = _get_domain_manager().get_domain_storage_stats(domain_name)
+    except Exception as e:
+        logger.error("Erro ao calcular estatisticas de armazenamento", error=str(e))
+        raise e
+
+    if not stats:
+        print(f"O domínio {domain_name} ainda não possui banco de dados.")
+        return stats
+
+    print(f"\nDomínio: {domain_name}")
+    print(f"Compressão: {stats['mode']}")
+    print(f"Chunks: {stats['total_chunks']} ({stats['compressed_chunks']} comprimidos)")
+    print(f"Conteúdo + metadata: {stats['raw_bytes']} bytes -> {stats['stored_bytes']} bytes armazenados")
+    print(f"Taxa de compressão: {stats['compression_ratio']:.2f}x")
+    print(f"Tamanho do banco: {stats['database_bytes']} bytes")
+    print(f"Decodificação: {stats['decode_us_per_chunk']:.1f} us/chunk "
+          f"({stats['decode_overhead_pct']:.0f}% sobre a leitura, amostra de {stats['decode_sample_size']} chunks)\n")
+    return stats
+
 def main():
     start_time = time()
     global logger
@@ -112,6 +161,10 @@ def main():
               python main.py -i caminho/para/diretorio "nome do domínio" [--debug]
     Para fazer uma pergunta ao modelo, use o comando:
               python main.py -q "sua pergunta" [--debug]
+    Para definir a compressão dos chunks de um domínio (none, zlib ou zstd), use o comando:
+              python main.py -c "nome do domínio" zstd
+    Para exibir as estatísticas de armazenamento de um domínio, use o comando:
+              python main.py -s "nome do domínio"
     ** O argumento --debug é opcional. Exibe mais informações no console e gera logs mais detalhados.
     """
 
@@ -139,6 +192,12 @@ def main():
             metrics_data = answer_question(question)
             log_metrics(metrics_data, debug, process="query_processing")
 
+        # Estatisticas de armazenamento
+        case 3 if sys.argv[1] == "-s":
+            domain_name = sys.argv[2]
+            logger.info("Iniciando a aplicacao - Estatisticas de armazenamento", args=sys.argv[2:])
+            storage_stats(domain_name)
+
         case 4:
             # Ingestao de dados
             if sys.argv[1] == "-i":
@@ -155,6 +214,13 @@ def main():
                 metrics_data = answer_question(question)
                 log_metrics(metrics_data, debug, process="query_processing")
 
+            # Compressao dos chunks do dominio
+            elif sys.argv[1] == "-c":
+                domain_name = sys.argv[2]
+                mode = sys.argv[3]
+                logger.info("Iniciando a aplicacao - Compressao do dominio", args=sys.argv[2:])
+                set_domain_compression(domain_name, mode)
+
         case 5:
             # Ingestao de dados com debug
             if sys.argv[1] == "-i" and sys.argv[4] == "--debug":
@@ -17,7 +17,7 @@ from rag.gui.streamlit_utils import (
     get_config_manager
 )
 from rag.src.config.config_manager import ConfigurationError
-from rag.src.config.models import LLMConfig, QueryConfig
+from rag.src.config.models import LLMConfig
 
 st.set_page_config(
     page_title="Query Interface",
@@ -130,6 +130,10 @@ with st.sidebar:
     
     st.header("Parâmetros da recuperação")
     query_retrieval_k = st.number_input("K Documentos", min_value=1, step=1, value=config.query.retrieval_k, key="sidebar_query_retrieval_k", help="Número de documentos a serem recuperados para a query.")
+    retrieval_strategy_options = ["vector", "hybrid"]
+    query_retrieval_strategy = st.selectbox("Estratégia de recuperação", options=retrieval_strategy_options, index=retrieval_strategy_options.index(config.query.retrieval_strategy), key="sidebar_query_retrieval_strategy", help="'hybrid' combina busca lexical (BM25) e vetorial (FAISS); 'vector' usa apenas FAISS.")
+    rerank_strategy_options = ["none", "cross-encoder"]
+    query_rerank_strategy = st.selectbox("Reordenação (rerank)", options=rerank_strategy_options, index=rerank_strategy_options.index(config.query.rerank_strategy), key="sidebar_query_rerank_strategy", help="'cross-encoder' busca mais candidatos e passa ao LLM apenas os K melhores segundo um cross-encoder; 'none' usa a ordem da recuperação.")
     
     st.header("Parâmetros do LLM")
     current_provider = getattr(config.llm, 'provider', 'gemini')
@@ -251,7 +255,7 @@ if prompt := st.chat_input("Pergunte aqui..."):
 
     # --- Salva automaticamente a configuração do LLM se tiver sido alterada --- 
     try:
-        current_query_config = QueryConfig(retrieval_k=query_retrieval_k)
+        current_query_config = config.query.model_copy(update={"retrieval_k": query_retrieval_k, "retrieval_strategy": query_retrieval_strategy, "rerank_strategy": query_rerank_strategy})
         # Provider-aware LLM config assembly
         use_gemini_now = st.session_state.get("toggle_use_gemini", getattr(config.llm, 'provider', 'gemini') == 'gemini')
         gem_name_val = st.session_state.get("sidebar_gemini_model_name", getattr(config.llm, 'gemini_model_name', None))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, PositiveInt, conint, confloat, ConfigDict
+from pydantic import BaseModel, Field, PositiveInt, PositiveFloat, conint, confloat, ConfigDict
 from typing import Literal, Optional, Dict, Any
 
 class SystemConfig(BaseModel):
@@ -49,7 +49,31 @@ class VectorStoreConfig(BaseModel):
         
 class QueryConfig(BaseModel):
     retrieval_k: PositiveInt = 5
-    # rerank_strategy: Literal["none"] = "none" # Adicionar depois
+    retrieval_strategy: Literal["vector", "hybrid"] = "vector"
+    hybrid_candidates: PositiveInt = 20
+    rrf_k: PositiveInt = 60
+    domain_routing: Literal["embedding", "llm"] = "embedding"
+    routing_min_score: confloat(ge=-1.0, le=1.0) = 0.3 # type: ignore
+    routing_margin: confloat(ge=0.0, le=2.0) = 0.05 # type: ignore
+    answer_cache_enabled: bool = False
+    answer_cache_threshold: confloat(ge=0.0, le=1.0) = 0.95 # type: ignore
+    answer_cache_ttl_seconds: PositiveInt = 3600
+    answer_cache_max_entries: PositiveInt = 1000
+    async_max_workers: PositiveInt = 8
+    context_max_tokens: PositiveInt = 4000
+    context_dedup_threshold: confloat(gt=0.0, le=1.0) = 0.95 # type: ignore
+    context_mmr_lambda: Optional[confloat(ge=0.0, le=1.0)] = None # type: ignore
+    rerank_strategy: Literal["none", "cross-encoder"] = "none"
+    rerank_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    rerank_backend: Literal["torch", "onnx"] = "torch"
+    rerank_candidates: PositiveInt = 20
+    rerank_batch_size: PositiveInt = 16
+    rerank_cache_max_entries: PositiveInt = 10000
+    follow_up_reuse_enabled: bool = True
+    follow_up_search_k: PositiveInt = 5
+    follow_up_query_weight: confloat(ge=0.0, le=1.0) = 0.5 # type: ignore
+    follow_up_ttl_seconds: PositiveInt = 1800
+    follow_up_max_sessions: PositiveInt = 1000
 
 class LLMConfig(BaseModel):
     provider: Literal["huggingface", "gemini"] = "gemini"
@@ -62,6 +86,19 @@ class LLMConfig(BaseModel):
     repetition_penalty: Optional[confloat(ge=1.0)] = 1.0 # type: ignore
     max_retries: conint(ge=0) = 3 # type: ignore
     retry_delay_seconds: PositiveInt = 2
+    retry_max_delay_seconds: PositiveFloat = 30.0
+    connect_timeout_seconds: PositiveFloat = 5.0
+    read_timeout_seconds: PositiveFloat = 60.0
+    hedge_enabled: bool = False
+    hedge_percentile: confloat(gt=0.0, lt=100.0) = 95.0 # type: ignore
+    hedge_min_samples: PositiveInt = 20
+    hedge_max_in_flight: PositiveInt = 32
+    http_max_connections: PositiveInt = 20
+    http_max_keepalive_connections: PositiveInt = 10
+    http_keepalive_expiry_seconds: PositiveFloat = 30.0
+    http2: bool = True
+    nlu_model_name: Optional[str] = None
+    filter_model_name: Optional[str] = None
     prompt_template: str = Field(default="""Use o seguinte contexto para responder a pergunta no final.
 Se você não sabe a resposta, apenas diga que não sabe, não tente inventar uma resposta.
 Mantenha a resposta concisa e diretamente ao ponto da pergunta.
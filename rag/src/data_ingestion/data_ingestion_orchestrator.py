@@ -1,5 +1,6 @@
 import os
 import sqlite3
+import numpy as np
 from datetime import datetime
 from typing import Dict, List, Any
 
@@ -142,6 +143,49 @@ class DataIngestionOrchestrator:
             self.logger.error(f"Erro ao verificar se o documento e duplicado: {e}")
             raise e
         
+    def _discard_duplicate_chunks(self, chunks: List[Chunk], conn: sqlite3.Connection) -> List[Chunk]:
+        """
+        Remove os chunks cujo conteúdo já está no banco do domínio ou se repete na própria lista.
+        A verificação é uma busca pelo content_hash, sem gerar embeddings.
+
+        Args:
+            chunks (List[Chunk]): Chunks gerados para o documento
+            conn (sqlite3.Connection): Conexão com o banco de dados do domínio
+
+        Returns:
+            List[Chunk]: Chunks inéditos, na ordem original
+        """
+        content_hashes = [Chunk.hash_content(chunk.content) for chunk in chunks]
+        seen_hashes = self.sqlite_manager.get_existing_content_hashes(conn, content_hashes)
+
+        unique_chunks: List[Chunk] = []
+        for chunk, content_hash in zip(chunks, content_hashes):
+            if content_hash in seen_hashes:
+                continue
+            seen_hashes.add(content_hash)
+            unique_chunks.append(chunk)
+
+        if len(unique_chunks) < len(chunks):
+            self.logger.info(f"{len(chunks) - len(unique_chunks)} chunks duplicados descartados")
+        return unique_chunks
+
+    def _update_domain_centroid(self, domain, embedding_vectors: np.ndarray, conn: sqlite3.Connection) -> None:
+        """
+        Acumula os embeddings do arquivo no centroide do domínio, usado pelo roteamento de domínios na consulta.
+        Deve ser chamado antes de adicionar os embeddings ao índice FAISS: domínios ingeridos antes de o centroide
+        existir têm o acumulado inicializado com os vetores já presentes no índice.
+        """
+        model_name = self.embedding_generator.config.model_name
+        if self.sqlite_manager.get_domain_centroid(conn) is None:
+            indexed_sum, indexed_count = self.faiss_manager.get_embeddings_sum(domain.vector_store_path, domain.embeddings_dimension)
+            if indexed_count:
+                self.logger.info(f"Inicializando o centroide do dominio com {indexed_count} vetores do indice FAISS", domain_name=domain.name)
+                self.sqlite_manager.add_to_domain_centroid(conn, model_name, indexed_sum, indexed_count)
+
+        self.sqlite_manager.add_to_domain_centroid(
+            conn, model_name, embedding_vectors.sum(axis=0, dtype=np.float64), embedding_vectors.shape[0]
+        )
+
     def _set_metrics_data(self) -> None:
         """
         Obtém os dados de métricas para o processo de ingestão de dados.
@@ -165,6 +209,7 @@ class DataIngestionOrchestrator:
         self.metrics_data["processed_chunks"] = 0
         self.metrics_data["processed_embeddings"] = 0
         self.metrics_data["duplicate_files"] = 0
+        self.metrics_data["duplicate_chunks"] = 0
         self.metrics_data["invalid_files"] = 0        
     
     def _list_pdf_files(self, directory_path: str) -> List[DocumentFile]:
@@ -344,6 +389,21 @@ class DataIngestionOrchestrator:
                         conn.rollback()
                         continue
 
+                    # Descarta chunks cujo conteúdo já existe no domínio antes de gerar os embeddings
+                    total_generated_chunks = len(document_chunks)
+                    document_chunks = self._discard_duplicate_chunks(document_chunks, conn)
+                    file_metrics["duplicate_chunks"] = total_generated_chunks - len(document_chunks)
+                    self.metrics_data["duplicate_chunks"] += file_metrics["duplicate_chunks"]
+                    if not document_chunks:
+                        self.logger.warning(f"Todos os chunks do arquivo ja existem no dominio", file_path=file.path)
+                        self.logger.info(f"Descartando alteracoes da transacao", file_path=file.path)
+                        file_metrics["is_duplicate"] = True
+                        file_metrics["file_processing_duration"] = str(datetime.now() - file_start_time)
+                        self.metrics_data[file.name] = file_metrics
+                        self.metrics_data["duplicate_files"] += 1
+                        conn.rollback()
+                        continue
+
                     self.logger.info(f"{file.name} - Total de chunks: {len(document_chunks)}", file_path=file.path)
                     file_metrics["total_chunks"] = len(document_chunks)
                     total_chunk_size += sum(len(chunk.content) for chunk in document_chunks)
@@ -369,6 +429,7 @@ class DataIngestionOrchestrator:
                         continue
 
                     file_metrics["total_embeddings"] = len(embedding_vectors)
+                    self._update_domain_centroid(domain, embedding_vectors, conn)
                     #Adiciona os embeddings ao índice FAISS, recebendo os índices dos embeddings em ordem
                     self.faiss_manager.add_embeddings(embedding_vectors, chunk_ids, domain.vector_store_path, domain.embeddings_dimension)
                     file_metrics["embeddings_added"] = True
@@ -1,5 +1,7 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, ConfigDict
+import hashlib
+import json
+from typing import Optional, Dict, Any, Sequence
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 from datetime import datetime
 
 class Chunk(BaseModel):
@@ -14,5 +16,69 @@ class Chunk(BaseModel):
     content: str
     metadata: Dict[str, Any]  # Armazena page_list, index_list, keywords
     created_at: Optional[datetime] = None
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
\ No newline at end of file
+
+    # JSON bruto do metadata, decodificado apenas no primeiro acesso (ver from_row)
+    _raw_metadata: Optional[str] = PrivateAttr(default=None)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @staticmethod
+    def hash_content(content: str) -> bytes:
+        """Hash blake2b de 16 bytes do conteúdo, usado como chave de unicidade dos chunks de um domínio."""
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "Chunk":
+        """
+        Cria um Chunk a partir de uma linha (id, document_id, content, metadata, created_at) da tabela chunks.
+        Os valores vêm do próprio banco, então a validação do pydantic é dispensada e o json.loads
+        do metadata só é executado se o campo for acessado.
+        """
+        created_at = row[4]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        # Equivalente a model_construct, sem a introspecção dos campos a cada linha
+        chunk = cls.__new__(cls)
+        object.__setattr__(chunk, "__dict__", {"id": row[0], "document_id": row[1], "content": row[2], "created_at": created_at})
+        object.__setattr__(chunk, "__pydantic_fields_set__", {"id", "document_id", "content", "created_at"})
+        object.__setattr__(chunk, "__pydantic_extra__", None)
+        object.__setattr__(chunk, "__pydantic_private__", {"_raw_metadata": row[3]})
+        return chunk
+
+    def _load_metadata(self) -> None:
+        private = self.__pydantic_private__
+        if private and private.get("_raw_metadata") is not None:
+            self.__dict__["metadata"] = json.loads(private["_raw_metadata"])
+            self.__pydantic_fields_set__.add("metadata")
+            private["_raw_metadata"] = None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Uma atribuição a metadata descarta o JSON ainda não decodificado, que deixaria de refletir o campo
+        if name == "metadata" and self.__pydantic_private__:
+            self.__pydantic_private__["_raw_metadata"] = None
+        super().__setattr__(name, value)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Chunk):
+            self._load_metadata()
+            other._load_metadata()
+        return super().__eq__(other)
+
+    def __getattr__(self, item: str) -> Any:
+        if item == "metadata" and self.__pydantic_private__ and self.__pydantic_private__.get("_raw_metadata") is not None:
+            self._load_metadata()
+            return self.__dict__["metadata"]
+        return super().__getattr__(item)
+
+    def __repr_args__(self):
+        # repr/str mostram o metadata, como __eq__ e model_dump, mesmo que ainda não tenha sido acessado
+        self._load_metadata()
+        return super().__repr_args__()
+
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        self._load_metadata()
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        self._load_metadata()
+        return super().model_dump_json(**kwargs)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from rag.src.utils import unit_vector
+from rag.src.utils.logger import get_logger
+
+
+class SemanticAnswerCache:
+    """
+    Cache semântico de respostas do QueryOrchestrator.
+
+    Cada entrada guarda o embedding (normalizado) da pergunta, o escopo da consulta (chave que deve ser igual para
+    que a resposta seja reaproveitada, ver QueryOrchestrator._answer_cache_scope), a geração de cada domínio usado
+    na resposta e a resposta. Uma consulta é atendida pelo cache quando uma entrada do mesmo escopo tem similaridade
+    de cosseno >= threshold, não expirou (ttl_seconds) e todos os seus domínios continuam na mesma geração, isto é,
+    não foram reingeridos nem tiveram documentos removidos desde então.
+    A busca usa um índice FAISS IndexIDMap2(IndexFlatIP) em memória. Acima de max_entries, as entradas menos
+    usadas recentemente são descartadas.
+    """
+
+    # Número de vizinhos avaliados por consulta (entradas de outros escopos ou inválidas são ignoradas)
+    SEARCH_K = 8
+
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int, log_domain: str = "utils"):
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+
+    def configure(self, threshold: float, ttl_seconds: int, max_entries: int) -> None:
+        """Atualiza os limites do cache, descartando o excedente se max_entries diminuir."""
+        with self._lock:
+            self.threshold = threshold
+            self.ttl_seconds = ttl_seconds
+            self.max_entries = max_entries
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        return unit_vector(embedding).reshape(1, -1)
+
+    def lookup(self, embedding: np.ndarray, scope: Hashable,
+               current_generations: Dict[int, Tuple]) -> Optional[Dict[str, Any]]:
+        """
+        Procura uma resposta em cache para a pergunta.
+
+        Args:
+            embedding: Embedding da pergunta.
+            scope: Escopo da consulta.
+            current_generations: Geração atual de cada domínio (id -> geração), ver QueryOrchestrator._domain_generations.
+
+        Returns:
+            Optional[Dict[str, Any]]: O payload da entrada, acrescido de "similarity", ou None.
+        """
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+
+            query = self._normalize(embedding)
+            if query.shape[1] != self._index.d:
+                return None
+
+            similarities, ids = self._index.search(query, min(self.SEARCH_K, self._index.ntotal))
+            now = time.monotonic()
+            stale_ids = []
+            hit = None
+
+            for similarity, entry_id in zip(similarities[0].tolist(), ids[0].tolist()):
+                if entry_id == -1 or similarity < self.threshold:
+                    break
+                entry = self._entries[entry_id]
+                expired = now - entry["created_at"] > self.ttl_seconds
+                outdated = any(current_generations.get(domain_id) != generation
+                               for domain_id, generation in entry["generations"].items())
+                if expired or outdated:
+                    stale_ids.append(entry_id)
+                    continue
+                if entry["scope"] == scope:
+                    self._entries.move_to_end(entry_id)
+                    hit = dict(entry["payload"], similarity=similarity)
+                    break
+
+            self._remove(stale_ids)
+            return hit
+
+    def store(self, embedding: np.ndarray, scope: Hashable, generations: Dict[int, Tuple],
+              payload: Dict[str, Any]) -> None:
+        """
+        Adiciona uma resposta ao cache.
+
+        Args:
+            embedding: Embedding da pergunta.
+            scope: Escopo da consulta (ver lookup).
+            generations: Geração, no momento da resposta, de cada domínio usado.
+            payload: Dados devolvidos em um acerto (resposta, chunks de contexto, domínios).
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._index is None or self._index.d != vector.shape[1]:
+                # Primeiro uso ou troca do modelo de embeddings: recomeça o índice
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                self._entries.clear()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "scope": scope,
+                "generations": dict(generations),
+                "payload": payload,
+                "created_at": time.monotonic(),
+            }
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            self._remove(list(self._entries)[:excess])
+
+    def _remove(self, entry_ids) -> None:
+        if not entry_ids:
+            return
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array(entry_ids, dtype=np.int64))
+        self.logger.debug(f"{len(entry_ids)} entradas removidas do cache de respostas")
@@ -0,0 +1,115 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.src.models import Chunk
+from rag.src.utils import unit_vector
+from rag.src.utils.logger import get_logger
+
+
+@dataclass
+class ContextCandidate:
+    """Chunk recuperado candidato ao contexto do prompt."""
+    chunk: Chunk
+    # Relevância para a query: similaridade de cosseno com o embedding da query ou, sem vetores, pela posição
+    score: float
+    # Vetor do chunk (normalizado pelo ContextPacker) e o espaço de embeddings (modelo) a que pertence. Vetores de
+    # modelos diferentes não são comparados entre si
+    embedding: Optional[np.ndarray] = None
+    space: Optional[str] = None
+
+
+class ContextPacker:
+    """
+    Monta o contexto do prompt a partir dos chunks recuperados em todos os domínios selecionados.
+
+    Remove chunks de conteúdo idêntico e, entre chunks do mesmo espaço de embeddings, os quase duplicados
+    (similaridade de cosseno >= dedup_threshold). Os restantes são ordenados por score ou, com mmr_lambda, por
+    maximal marginal relevance (relevância menos a redundância com os já escolhidos) e incluídos nessa ordem
+    enquanto couberem em max_tokens. O número de tokens é estimado pelo número de caracteres (CHARS_PER_TOKEN),
+    sem depender do tokenizador do LLM.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, log_domain: str = "utils"):
+        self.logger = get_logger(__name__, log_domain=log_domain)
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return math.ceil(len(text) / cls.CHARS_PER_TOKEN)
+
+    @staticmethod
+    def _redundancy(candidate: ContextCandidate, selected: List[ContextCandidate]) -> float:
+        """Maior similaridade do candidato com os chunks já escolhidos do mesmo espaço de embeddings (0 se nenhum)."""
+        if candidate.embedding is None:
+            return 0.0
+        similarities = [float(candidate.embedding @ other.embedding) for other in selected
+                        if other.embedding is not None and other.space == candidate.space]
+        return max(similarities, default=0.0)
+
+    def pack(self, candidates: List[ContextCandidate], max_tokens: int, dedup_threshold: float = 1.0,
+             mmr_lambda: Optional[float] = None) -> Tuple[List[Chunk], Dict[str, Any]]:
+        """
+        Seleciona os chunks do contexto.
+
+        Args:
+            candidates (List[ContextCandidate]): Os chunks recuperados.
+            max_tokens (int): Orçamento de tokens do contexto.
+            dedup_threshold (float): Similaridade a partir da qual um chunk é considerado duplicado de outro já
+                escolhido. 1.0 remove apenas conteúdos idênticos.
+            mmr_lambda (Optional[float]): Peso da relevância no MMR (1.0 equivale à ordem por score); None desativa.
+
+        Returns:
+            Tuple[List[Chunk], Dict[str, Any]]: Os chunks escolhidos, em ordem, e as estatísticas do empacotamento
+            (tokens estimados antes e depois, tokens economizados, chunks descartados por duplicidade e por orçamento).
+        """
+        for candidate in candidates:
+            if candidate.embedding is not None:
+                candidate.embedding = unit_vector(candidate.embedding)
+
+        # Conteúdos idênticos (o mesmo trecho ingerido em mais de um domínio): mantém o de maior score
+        unique: Dict[bytes, ContextCandidate] = {}
+        for candidate in sorted(candidates, key=lambda c: c.score, reverse=True):
+            unique.setdefault(Chunk.hash_content(candidate.chunk.content), candidate)
+        remaining = list(unique.values())
+        duplicates = len(candidates) - len(remaining)
+
+        selected: List[ContextCandidate] = []
+        over_budget = 0
+        used_tokens = 0
+        while remaining:
+            if mmr_lambda is None:
+                best = remaining[0]
+            else:
+                best = max(remaining, key=lambda c: mmr_lambda * c.score - (1 - mmr_lambda) * self._redundancy(c, selected))
+            remaining.remove(best)
+
+            if selected and self._redundancy(best, selected) >= dedup_threshold:
+                duplicates += 1
+                continue
+
+            tokens = self.estimate_tokens(best.chunk.content)
+            if used_tokens + tokens > max_tokens:
+                if selected:
+                    over_budget += 1
+                    continue
+                # Nem o chunk mais relevante cabe no orçamento: entra truncado
+                best = ContextCandidate(best.chunk.model_copy(update={"content": best.chunk.content[:max_tokens * self.CHARS_PER_TOKEN]}),
+                                        best.score, best.embedding, best.space)
+                tokens = self.estimate_tokens(best.chunk.content)
+            selected.append(best)
+            used_tokens += tokens
+
+        input_tokens = sum(self.estimate_tokens(candidate.chunk.content) for candidate in candidates)
+        stats = {
+            "context_tokens": used_tokens,
+            "context_tokens_input": input_tokens,
+            "context_tokens_saved": input_tokens - used_tokens,
+            "context_duplicates_dropped": duplicates,
+            "context_over_budget_dropped": over_budget,
+        }
+        self.logger.debug("Contexto empacotado", selected_chunks=len(selected), **stats)
+        return [candidate.chunk for candidate in selected], stats
@@ -0,0 +1,125 @@
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.src.models import Domain
+from rag.src.utils import SQLiteManager, unit_vector
+from rag.src.utils.logger import get_logger
+
+# (modelo de embeddings, textos) -> embeddings (N, D)
+EmbedFunction = Callable[[str, List[str]], np.ndarray]
+
+
+class DomainRouter:
+    """
+    Roteamento local de queries para domínios de conhecimento, sem chamada ao LLM.
+
+    Cada domínio tem um perfil com o centroide dos embeddings dos seus chunks (acumulado na ingestão, ver
+    SQLiteManager.add_to_domain_centroid), o embedding de nome + descrição + palavras-chave e as palavras-chave
+    normalizadas. O score de um domínio combina a similaridade de cosseno da query com o centroide e com o
+    embedding da descrição, mais um bônus se alguma palavra-chave aparecer na query. O roteamento só decide
+    quando o melhor score é alto o bastante e se destaca do segundo; caso contrário retorna None, e a seleção
+    fica a cargo do LLM.
+    """
+
+    CENTROID_WEIGHT = 0.6
+    KEYWORD_BONUS = 0.1
+
+    def __init__(self, sqlite_manager: SQLiteManager, log_domain: str = "utils"):
+        self.sqlite_manager = sqlite_manager
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        # domain.id -> (chave de versão do domínio, perfil)
+        self._profiles: Dict[int, Tuple[tuple, Dict]] = {}
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        return " ".join(re.findall(r"\w+", text))
+
+    def _get_profile(self, domain: Domain, model_name: str, embed: EmbedFunction) -> Dict:
+        # O catálogo de domínios devolve novos objetos quando o banco de controle muda; a chave cobre edições
+        # de descrição/palavras-chave e novas ingestões (total_documents)
+        key = (model_name, domain.updated_at, domain.total_documents, domain.name, domain.description, domain.keywords)
+        cached = self._profiles.get(domain.id)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        centroid = None
+        with self.sqlite_manager.get_connection(db_path=domain.db_path) as conn:
+            stored = self.sqlite_manager.get_domain_centroid(conn)
+        if stored and stored[0] == model_name and stored[2] > 0:
+            centroid = unit_vector(stored[1] / stored[2])
+        else:
+            self.logger.debug("Dominio sem centroide para o modelo de embeddings", domain_name=domain.name, model=model_name)
+
+        summary = f"{domain.name}. {domain.description}. {domain.keywords}"
+        keywords = [self._normalize_text(keyword) for keyword in domain.keywords.split(",")]
+        profile = {
+            "centroid": centroid,
+            "summary": unit_vector(embed(model_name, [summary])[0]),
+            "keywords": [keyword for keyword in keywords if keyword],
+        }
+        self._profiles[domain.id] = (key, profile)
+        return profile
+
+    def score(self, query: str, domains: List[Domain], embed: EmbedFunction) -> Dict[str, float]:
+        """
+        Calcula o score de cada domínio para a query. A query é embedada uma vez por modelo de embeddings.
+
+        Returns:
+            Dict[str, float]: nome do domínio -> score.
+        """
+        normalized_query = f" {self._normalize_text(query)} "
+        profiles = [self._get_profile(domain, domain.config.embeddings_model, embed) for domain in domains]
+        query_embeddings: Dict[str, np.ndarray] = {}
+        scores: Dict[str, float] = {}
+
+        for domain, profile in zip(domains, profiles):
+            model_name = domain.config.embeddings_model
+            if model_name not in query_embeddings:
+                query_embeddings[model_name] = unit_vector(embed(model_name, [query])[0])
+            query_embedding = query_embeddings[model_name]
+
+            score = float(query_embedding @ profile["summary"])
+            if profile["centroid"] is not None:
+                score = self.CENTROID_WEIGHT * float(query_embedding @ profile["centroid"]) + (1 - self.CENTROID_WEIGHT) * score
+            if any(f" {keyword} " in normalized_query for keyword in profile["keywords"]):
+                score += self.KEYWORD_BONUS
+            scores[domain.name] = score
+
+        return scores
+
+    def route(self, query: str, domains: List[Domain], embed: EmbedFunction,
+              min_score: float, margin: float) -> Tuple[Optional[List[Domain]], Dict[str, float]]:
+        """
+        Seleciona o domínio da query entre os domínios fornecidos (domínios populados).
+
+        Args:
+            query (str): A query original.
+            domains (List[Domain]): Domínios candidatos, com config carregada.
+            embed (EmbedFunction): Gera embeddings normalizados pelo TextNormalizer para um modelo.
+            min_score (float): Score mínimo do melhor domínio.
+            margin (float): Diferença mínima entre o melhor e o segundo melhor score.
+
+        Returns:
+            Tuple[Optional[List[Domain]], Dict[str, float]]: O domínio selecionado (ou None se a confiança for
+            baixa) e os scores de cada domínio.
+        """
+        if len(domains) == 1:
+            return list(domains), {domains[0].name: 1.0}
+        if not domains or any(domain.config is None for domain in domains):
+            return None, {}
+
+        scores = self.score(query, domains, embed)
+        ranked = sorted(domains, key=lambda domain: scores[domain.name], reverse=True)
+        best, second = scores[ranked[0].name], scores[ranked[1].name]
+
+        if best < min_score or best - second < margin:
+            self.logger.info("Roteamento por embeddings com baixa confianca", scores=scores, min_score=min_score, margin=margin)
+            return None, scores
+
+        self.logger.info("Dominio selecionado pelo roteamento por embeddings", domain_name=ranked[0].name, scores=scores)
+        return [ranked[0]], scores
@@ -1,23 +1,31 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import os
 
 from .llm_interface import LLMInterface
 
 
 class GeminiLLMAdapter(LLMInterface):
-    def __init__(self, model_name: str, max_tokens: int, temperature: float):
+    def __init__(self, model_name: str, max_tokens: int, temperature: float, llm_config=None):
         # Import locally to avoid hard dependency if agent package is absent
         from agent.generator import Generator
+        from agent.llm_policy import LLMCallPolicy
 
         # Ensure GEMINI_API_KEY presence is validated by Generator itself
         self._generator = Generator(
             model_name=model_name,
             max_tokens=max_tokens,
             temperature=temperature,
+            policy=LLMCallPolicy.from_config(llm_config) if llm_config else None,
         )
 
     def generate_answer(self, messages: List[Dict[str, str]]) -> str:
         return self._generator.generate_answer(messages)
 
+    async def agenerate_answer(self, messages: List[Dict[str, str]]) -> str:
+        return await self._generator.agenerate_answer(messages)
+
+    def generate_answer_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        return self._generator.generate_answer_stream(messages)
+
 
 
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
 
 from .llm_interface import LLMInterface
 from .hugging_face_manager import HuggingFaceManager
@@ -31,5 +31,6 @@ class HuggingFaceLLMAdapter(LLMInterface):
         last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user" and m.get("content")), prompt)
         return self._manager.generate_answer(question=last_user, context_prompt=prompt)
 
-
-
+    def generate_answer_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # text_generation é chamado sem streaming pelo HuggingFaceManager: a resposta é entregue de uma vez
+        yield self.generate_answer(messages)
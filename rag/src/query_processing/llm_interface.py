@@ -1,7 +1,9 @@
-from typing import List, Dict, Protocol
+from typing import List, Dict, Iterator, Protocol
 
 
 class LLMInterface(Protocol):
     def generate_answer(self, messages: List[Dict[str, str]]) -> str: ...
 
+    def generate_answer_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]: ...
+
 
@@ -0,0 +1,29 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+
+@dataclass
+class QueryContext:
+    """
+    Estado de uma única consulta do QueryOrchestrator.
+
+    Cada consulta (query_llm, query_llm_stream, aquery_llm, retrieve_chunks) cria o seu contexto e o repassa às
+    etapas do pipeline; a instância do QueryOrchestrator guarda apenas componentes compartilhados (modelos,
+    índices, caches). Assim uma única instância atende consultas concorrentes de várias threads ou de um event loop.
+    """
+
+    # Métricas e resultado da consulta: o dicionário retornado por query_llm
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    # Embeddings gerados durante a consulta, por (modelo, textos normalizados). O embedding da query calculado no
+    # cache de respostas ou no roteamento de domínios é reaproveitado na recuperação dos chunks
+    embeddings: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = field(default_factory=dict)
+    # Início da consulta (time.perf_counter) e duração acumulada, em segundos, de cada etapa medida
+    started_at: float = field(default_factory=time.perf_counter)
+    stage_durations: Dict[str, float] = field(default_factory=dict)
+
+    def elapsed(self) -> float:
+        """Segundos desde o início da consulta, em tempo monotônico."""
+        return time.perf_counter() - self.started_at
@@ -1,37 +1,101 @@
+import asyncio
+import inspect
 import os
+import re
 import sys
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, ContextManager, Iterator, Optional, Tuple
 from datetime import datetime
 
 from rag.src.config import AppConfig, check_config_changes
 from rag.src.models import Domain, Chunk
-from rag.src.utils import TextNormalizer, EmbeddingGenerator, FaissManager, SQLiteManager
+from rag.src.utils import TextNormalizer, EmbeddingGenerator, FaissManager, SQLiteManager, DomainCatalog, LatencyTracker, unit_vector
 from rag.src.utils.logger import get_logger
+from rag.src.query_processing.domain_router import DomainRouter
+from rag.src.query_processing.answer_cache import SemanticAnswerCache
+from rag.src.query_processing.retrieval_memory import RetrievalMemory, RetrievalTurn
+from rag.src.query_processing.query_context import QueryContext
+from rag.src.query_processing.context_packer import ContextCandidate, ContextPacker
+from rag.src.query_processing.reranker import CrossEncoderReranker
 from agent.generator import Generator 
+from agent.llm_client import LLMClientFactory
+from agent.llm_policy import LLMCallPolicy
+
+
+def _reciprocal_rank_fusion(rankings: List[List[int]], k: int) -> List[int]:
+    """
+    Combina rankings de ids pela reciprocal rank fusion: score(id) = soma de 1 / (k + posição), posição a partir de 1.
+    Empates mantêm a ordem da primeira ocorrência.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for position, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + position)
+    return sorted(scores, key=scores.get, reverse=True)
 
 
 class QueryOrchestrator:
     """
     Orquestrador de queries para o sistema de busca.
+
+    O estado de cada consulta fica em um QueryContext criado pela própria consulta e repassado às etapas do
+    pipeline; a instância pode ser compartilhada entre threads e consultas assíncronas concorrentes.
+
+    A duração de cada etapa (cache de respostas, seleção de domínios, embeddings, FAISS, BM25, SQLite, rerank,
+    empacotamento do contexto, geração e primeiro trecho do streaming) é medida em tempo monotônico e acumulada nos
+    histogramas de self.latency; as etapas podem se sobrepor (os embeddings do roteamento ficam dentro da seleção
+    de domínios). As durações da consulta ficam em metrics["stage_durations"] e o tempo total, em segundos, em
+    metrics["processing_duration"].
+
+    Consultas com session_id guardam a recuperação do turno na memória da sessão (RetrievalMemory); a consulta
+    seguinte da sessão marcada como continuação (follow_up=True) reaproveita os domínios e os chunks guardados.
     """
     DEFAULT_LOG_DOMAIN = "Processamento de queries"
-    def __init__(self, config: AppConfig, sqlite_manager: Optional[SQLiteManager] = None, llm_generator = None):
+    def __init__(self, config: AppConfig, sqlite_manager: Optional[SQLiteManager] = None, llm_generator = None,
+                 client_factory: Optional[LLMClientFactory] = None):
         self.logger = get_logger(__name__, log_domain=self.DEFAULT_LOG_DOMAIN)
         self.logger.info("Inicializando o QueryOrchestrator")
 
-        self.metrics_data = {}
         self.config = config.model_copy(deep=True)
         self.text_normalizer = TextNormalizer(config.text_normalizer, log_domain=self.DEFAULT_LOG_DOMAIN)
         self.embedding_generator = EmbeddingGenerator(config.embedding, log_domain=self.DEFAULT_LOG_DOMAIN)
         self.faiss_manager = FaissManager(config, log_domain=self.DEFAULT_LOG_DOMAIN)
         self.sqlite_manager = sqlite_manager if sqlite_manager else SQLiteManager(config.system, log_domain=self.DEFAULT_LOG_DOMAIN)
+        self.domain_catalog = DomainCatalog(self.sqlite_manager, log_domain=self.DEFAULT_LOG_DOMAIN)
+        self.domain_router = DomainRouter(self.sqlite_manager, log_domain=self.DEFAULT_LOG_DOMAIN)
+        self.context_packer = ContextPacker(log_domain=self.DEFAULT_LOG_DOMAIN)
+        self.reranker = CrossEncoderReranker(config.query, log_domain=self.DEFAULT_LOG_DOMAIN)
+        self.latency = LatencyTracker()
+        # Geradores de embeddings já carregados, por modelo, para atender domínios de modelos diferentes sem
+        # recarregar o modelo. O gerador da configuração (self.embedding_generator) nunca é substituído
+        self._embedding_generators: Dict[str, EmbeddingGenerator] = {self.embedding_generator.config.model_name: self.embedding_generator}
+        self._embedding_generators_lock = threading.Lock()
+        self.answer_cache = SemanticAnswerCache(
+            threshold=config.query.answer_cache_threshold,
+            ttl_seconds=config.query.answer_cache_ttl_seconds,
+            max_entries=config.query.answer_cache_max_entries,
+            log_domain=self.DEFAULT_LOG_DOMAIN,
+        )
+        self.retrieval_memory = RetrievalMemory(
+            ttl_seconds=config.query.follow_up_ttl_seconds,
+            max_sessions=config.query.follow_up_max_sessions,
+            log_domain=self.DEFAULT_LOG_DOMAIN,
+        )
+        # Executa a busca lexical (BM25) em paralelo à busca no FAISS na recuperação híbrida
+        self._retrieval_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retrieval")
+        # Executa as etapas bloqueantes das consultas assíncronas fora do event loop
+        self._blocking_executor = ThreadPoolExecutor(max_workers=config.query.async_max_workers, thread_name_prefix="query")
         
         # INSTANCIAÇÃO DA SUA CLASSE GENERATOR COM AS CONFIGURAÇÕES
         self.llm_generator = llm_generator if llm_generator else Generator(
             model_name=config.llm.gemini_model_name,
             max_tokens=config.llm.max_new_tokens,
-            temperature=config.llm.temperature
+            temperature=config.llm.temperature,
+            policy=LLMCallPolicy.from_config(config.llm),
+            client_factory=client_factory
         ) if config.llm.provider == "gemini" else HuggingFaceLLMAdapter(
             config=config.llm,
             log_domain=self.DEFAULT_LOG_DOMAIN
@@ -62,21 +126,44 @@ class QueryOrchestrator:
                     pass
                 case "embedding":
                     self.embedding_generator.update_config(new_config.embedding)
+                    with self._embedding_generators_lock:
+                        self._embedding_generators = {self.embedding_generator.config.model_name: self.embedding_generator}
                 case "vector_store" | "query":
                     self.faiss_manager.update_config(new_config)
+                    self.reranker.update_config(new_config.query)
+                    if new_config.query.async_max_workers != self.config.query.async_max_workers:
+                        # As consultas em andamento terminam no executor antigo
+                        old_executor = self._blocking_executor
+                        self._blocking_executor = ThreadPoolExecutor(max_workers=new_config.query.async_max_workers, thread_name_prefix="query")
+                        old_executor.shutdown(wait=False)
                 case "text_normalizer":
                     self.text_normalizer.update_config(new_config.text_normalizer)
                 case "system":
                     self.sqlite_manager.update_config(new_config.system)
 
+        # Respostas em cache podem não valer mais com outro modelo, prompt, normalização ou parâmetros de busca
+        self.answer_cache.configure(
+            threshold=new_config.query.answer_cache_threshold,
+            ttl_seconds=new_config.query.answer_cache_ttl_seconds,
+            max_entries=new_config.query.answer_cache_max_entries,
+        )
+        self.retrieval_memory.configure(
+            ttl_seconds=new_config.query.follow_up_ttl_seconds,
+            max_sessions=new_config.query.follow_up_max_sessions,
+        )
+        if set(update_fields) - {"ingestion"}:
+            self.answer_cache.clear()
+            self.retrieval_memory.clear()
+
         self.config = new_config.model_copy(deep=True)
         self.logger.info("Configuracoes do QueryOrchestrator atualizadas com sucesso")
 
-    def _process_query(self, query: str, domain: Domain) -> np.ndarray:
+    def _process_query(self, context: QueryContext, query: str, domain: Domain) -> np.ndarray:
         """
         Processa a query e retorna o embedding gerado.
 
         Args:
+            context (QueryContext): O estado da consulta.
             query (str): A query original.
 
         Returns:
@@ -84,11 +171,6 @@ class QueryOrchestrator:
         """
         self.logger.info("Iniciando o tratamento da query")
 
-        if not self.embedding_generator.config.model_name == domain.config.embeddings_model:
-            self.embedding_generator.config.model_name = domain.config.embeddings_model
-            self.logger.info("Reconfigurando o gerador de embeddings")
-            self.embedding_generator = EmbeddingGenerator(config=self.embedding_generator.config, log_domain=self.DEFAULT_LOG_DOMAIN)
-
         if not query:
             self.logger.error("Query vazia ou invalida")
             raise ValueError("Query vazia ou inválida")
@@ -97,9 +179,9 @@ class QueryOrchestrator:
             self.logger.info("Normalizando a query")
             normalized_query = self.text_normalizer.normalize(query)
             self.logger.info("Gerando o embedding da query")
-            query_embedding = self.embedding_generator.generate_embeddings(normalized_query)
-            self.metrics_data["query_embedding"] = query_embedding
-            self.metrics_data["query_embedding_size"] = query_embedding.size
+            query_embedding = self._generate_embeddings(context, domain.config.embeddings_model, normalized_query)
+            context.metrics["query_embedding"] = query_embedding
+            context.metrics["query_embedding_size"] = query_embedding.size
             if query_embedding.size == 0:
                 self.logger.error("Erro ao gerar o embedding da query")
                 raise ValueError("Erro ao gerar o embedding da query")
@@ -110,11 +192,110 @@ class QueryOrchestrator:
             self.logger.error(f"Erro ao processar a query: {str(e)}")
             raise e
     
-    def _select_domains(self, query: str, selected_domains: Optional[List[str]] = None) -> List[Domain]:
+    def _generate_embeddings(self, context: QueryContext, model_name: str, normalized_texts: List[str]) -> np.ndarray:
+        """
+        Gera os embeddings dos textos (já normalizados) com o modelo informado, reaproveitando os já gerados na consulta.
+        """
+        key = (model_name, tuple(normalized_texts))
+        embeddings = context.embeddings.get(key)
+        if embeddings is None:
+            generator = self._get_embedding_generator(model_name)
+            with self._span(context, "embedding"):
+                embeddings = generator.generate_embeddings(normalized_texts)
+            context.embeddings[key] = embeddings
+        return embeddings
+
+    def _get_embedding_generator(self, model_name: str) -> EmbeddingGenerator:
+        with self._embedding_generators_lock:
+            generator = self._embedding_generators.get(model_name)
+            if generator is None:
+                self.logger.info("Carregando o gerador de embeddings do modelo", model=model_name)
+                generator = EmbeddingGenerator(
+                    config=self.embedding_generator.config.model_copy(update={"model_name": model_name}),
+                    log_domain=self.DEFAULT_LOG_DOMAIN,
+                )
+                self._embedding_generators[model_name] = generator
+            return generator
+
+    def _embed_for_routing(self, context: QueryContext, model_name: str, texts: List[str]) -> np.ndarray:
+        return self._generate_embeddings(context, model_name, self.text_normalizer.normalize(texts))
+
+    def _domain_generations(self) -> Dict[int, Tuple]:
+        """
+        Geração atual de cada domínio, usada para invalidar o cache de respostas. Uma nova ingestão atualiza
+        total_documents e updated_at do domínio no banco de controle, e o catálogo é recarregado em seguida.
+        """
+        return {domain.id: (domain.total_documents, domain.updated_at) for domain in self.domain_catalog.get_domains()}
+
+    @staticmethod
+    def _answer_cache_scope(query: str, domain_names: Optional[List[str]]) -> Tuple:
+        """
+        Escopo do cache de respostas: os domínios informados (ordenados; vazio na seleção automática) e os termos
+        da query com dígitos (números, artigos, códigos como AB-1234). Perguntas que só diferem nesses termos
+        ("artigo 5" e "artigo 6") têm embeddings quase iguais, mas não podem compartilhar a resposta.
+        """
+        exact_terms = sorted({term.lower() for term in re.findall(r"[\w-]*\d[\w-]*", query)})
+        return tuple(sorted(domain_names)) if domain_names else (), tuple(exact_terms)
+
+    def _lookup_answer_cache(self, context: QueryContext, query: str, scope: Tuple) -> Tuple[Optional[np.ndarray], Dict[int, Tuple], Optional[Dict[str, Any]]]:
+        """
+        Procura a resposta da query no cache semântico.
+
+        Returns:
+            Tuple: O embedding da query (modelo de embeddings da configuração) e as gerações dos domínios no
+            início da consulta, usados depois para armazenar a resposta, e a entrada encontrada, se houver.
+        """
+        if not self.config.query.answer_cache_enabled:
+            return None, {}, None
+
+        try:
+            generations = self._domain_generations()
+            cache_embedding = self._generate_embeddings(context, self.config.embedding.model_name, self.text_normalizer.normalize(query))
+            return cache_embedding, generations, self.answer_cache.lookup(cache_embedding, scope, generations)
+        except Exception as e:
+            self.logger.warning(f"Cache de respostas indisponivel: {e}")
+            return None, {}, None
+
+    def _lookup_retrieval_memory(self, session_id: Optional[str], follow_up: bool,
+                                 generations: Dict[int, Tuple]) -> Tuple[Dict[int, Tuple], Optional[RetrievalTurn]]:
+        """
+        Prepara a memória de recuperação da consulta.
+
+        Returns:
+            Tuple: As gerações dos domínios no início da consulta (as do cache de respostas, se já calculadas), usadas
+            para guardar o turno, e, em uma pergunta de continuação, o turno anterior da sessão, se ainda válido.
+        """
+        if session_id is None or not self.config.query.follow_up_reuse_enabled:
+            return generations, None
+
+        try:
+            generations = generations or self._domain_generations()
+        except Exception as e:
+            self.logger.warning(f"Memoria de recuperacao indisponivel: {e}")
+            return generations, None
+        return generations, self.retrieval_memory.get(session_id, generations) if follow_up else None
+
+    def _follow_up_domains(self, context: QueryContext, previous: Optional[RetrievalTurn],
+                           selected_domains: Optional[List[str]] = None) -> Optional[List[Domain]]:
+        """
+        Domínios do turno anterior, para uma pergunta de continuação sem domínios informados. Retorna None (seleção
+        normal) se não houver turno anterior ou se algum dos seus domínios não existir mais.
+        """
+        if previous is None or selected_domains:
+            return None
+        domains = {domain.name: domain for domain in self.domain_catalog.get_domains()}
+        if not all(name in domains for name in previous.domain_names):
+            return None
+        context.metrics["domain_routing"] = "follow_up"
+        self.logger.info(f"Dominios do turno anterior reaproveitados: {previous.domain_names}")
+        return [domains[name] for name in previous.domain_names]
+
+    def _select_domains(self, context: QueryContext, query: str, selected_domains: Optional[List[str]] = None) -> List[Domain]:
         """
         Seleciona os domínios relevantes para a query.
 
         Args:
+            context (QueryContext): O estado da consulta.
             query (str): A query original.
         """
         self.logger.info("Selecionando os dominios relevantes para a query")
@@ -141,70 +322,99 @@ class QueryOrchestrator:
         """
 
         try:
-            with self.sqlite_manager.get_connection(control=True) as conn:
-                domains = self.sqlite_manager.get_domain(conn)
-                fetched_domain_names = [d.name for d in domains] if domains else []
-                self.logger.debug("Dominios recuperados do banco de controle", fetched_domain_count=len(fetched_domain_names), fetched_domain_names=fetched_domain_names)
+            domains = self.domain_catalog.get_domains()
+            fetched_domain_names = [d.name for d in domains] if domains else []
+            self.logger.debug("Dominios recuperados do banco de controle", fetched_domain_count=len(fetched_domain_names), fetched_domain_names=fetched_domain_names)
+            
+            # Se não houver domínios selecionados pelo usuário, seleciona automaticamente entre todos domínios populados
+            if not selected_domains:
+                if not domains:
+                    self.logger.error("Banco de controle nao retornou nenhum dominio. Nao e possivel selecionar automaticamente.")
+                    raise ValueError("Nenhum domínio encontrado no banco de controle.")
+
+                valid_domains = self.domain_catalog.get_populated_domains()
+
+                # Tenta o roteamento local por embeddings; o LLM só é consultado se a confiança for baixa
+                if self.config.query.domain_routing == "embedding" and valid_domains:
+                    routed_domains, routing_scores = self.domain_router.route(
+                        query,
+                        valid_domains,
+                        lambda model_name, texts: self._embed_for_routing(context, model_name, texts),
+                        min_score=self.config.query.routing_min_score,
+                        margin=self.config.query.routing_margin,
+                    )
+                    context.metrics["domain_routing_scores"] = routing_scores
+                    if routed_domains:
+                        context.metrics["domain_routing"] = "embedding"
+                        self.logger.info(f"Dominios selecionados: {[domain.name for domain in routed_domains]}")
+                        return routed_domains
+
+                context.metrics["domain_routing"] = "llm"
+
+                # Adiciona todos os domínios populados ao prompt
+                for i, domain in enumerate(valid_domains):
+                    prepared_prompt += f"\n\nDomínio {i+1}:\nNome: {domain.name}\nDescrição: {domain.description}\nPalavras-chave: {domain.keywords}\nid: {domain.id}"
                 
-                # Se não houver domínios selecionados pelo usuário, seleciona automaticamente entre todos domínios populados
-                if not selected_domains:
-                    if not domains:
-                        self.logger.error("Banco de controle nao retornou nenhum dominio. Nao e possivel selecionar automaticamente.")
-                        raise ValueError("Nenhum domínio encontrado no banco de controle.")
-
-                    i = 0
-                    valid_domains = []
-                    for domain in domains:
-                        # Adiciona todos os domínios populados ao prompt
-                        if domain.db_path and os.path.exists(domain.db_path):
-                            prepared_prompt += f"\n\nDomínio {i+1}:\nNome: {domain.name}\nDescrição: {domain.description}\nPalavras-chave: {domain.keywords}\nid: {domain.id}"
-                            i += 1
-                            valid_domains.append(domain)
-                    
-                    self.logger.info(f"Dominios disponiveis para selecao: {[domain.name for domain in valid_domains] if valid_domains else 'Nenhum'}")
-                    prepared_prompt += f"\n\nPergunta: {query}"
-
-                    self.logger.debug(f"Prompt preparado: {prepared_prompt}")
-                    self.logger.info("Enviando prompt para o LLM para selecao de dominio", domain_selection_prompt=prepared_prompt)
-                    messages = [
-                        {"role": "system", "content": prepared_prompt},
-                        {"role": "user", "content": query}
-                    ]
-                    try:
-                        llm_response: str = self.llm_generator.generate_answer(messages)
-                        self.logger.debug("chamada ao LLM para selecao de dominio realizada com sucesso.")
-                    except Exception as llm_error:
-                        self.logger.error("Erro durante a chamada ao LLM para selecao de dominio", exc_info=True)
-                        raise llm_error
-
-                    self.logger.debug("Resposta bruta do LLM para selecao de dominio:", raw_response=llm_response)
-                    
-                    response_domain_names = llm_response.split("|")
-                    response_domain_names = [name.strip() for name in response_domain_names]
-                    self.logger.debug(f"Dominios selecionados: {response_domain_names}")
-                    self.logger.info(f"Dominios selecionados: {response_domain_names}")
-                    selected_domains = [domain for domain in domains if domain.name in response_domain_names]
-
-                # Se o usuario selecionou domínios específicos, simplesmente retorna os objetos Domain correspondentes
-                else:
-                    selected_domains = [domain for domain in domains if domain.name in selected_domains]
-                if selected_domains:
-                    self.logger.debug(f"Valor do retorno: Lista final de dominios selecionados: {[domain.name for domain in selected_domains]}")
-                    return selected_domains
-                else:
-                    self.logger.error("Nenhum domínio selecionado")
-                    raise ValueError("Nenhum dominio selecionado")
-        
+                self.logger.info(f"Dominios disponiveis para selecao: {[domain.name for domain in valid_domains] if valid_domains else 'Nenhum'}")
+                prepared_prompt += f"\n\nPergunta: {query}"
+
+                self.logger.debug(f"Prompt preparado: {prepared_prompt}")
+                self.logger.info("Enviando prompt para o LLM para selecao de dominio", domain_selection_prompt=prepared_prompt)
+                messages = [
+                    {"role": "system", "content": prepared_prompt},
+                    {"role": "user", "content": query}
+                ]
+                try:
+                    llm_response: str = self.llm_generator.generate_answer(messages)
+                    self.logger.debug("chamada ao LLM para selecao de dominio realizada com sucesso.")
+                except Exception as llm_error:
+                    self.logger.error("Erro durante a chamada ao LLM para selecao de dominio", exc_info=True)
+                    raise llm_error
+
+                self.logger.debug("Resposta bruta do LLM para selecao de dominio:", raw_response=llm_response)
+                
+                response_domain_names = llm_response.split("|")
+                response_domain_names = [name.strip() for name in response_domain_names]
+                self.logger.debug(f"Dominios selecionados: {response_domain_names}")
+                self.logger.info(f"Dominios selecionados: {response_domain_names}")
+                selected_domains = [domain for domain in domains if domain.name in response_domain_names]
+
+            # Se o usuario selecionou domínios específicos, simplesmente retorna os objetos Domain correspondentes
+            else:
+                context.metrics["domain_routing"] = "user"
+                selected_domains = [domain for domain in domains if domain.name in selected_domains]
+            if selected_domains:
+                self.logger.debug(f"Valor do retorno: Lista final de dominios selecionados: {[domain.name for domain in selected_domains]}")
+                return selected_domains
+            else:
+                self.logger.error("Nenhum domínio selecionado")
+                raise ValueError("Nenhum dominio selecionado")
+    
         except Exception as e:
             self.logger.error(f"Erro durante a selecao automatica do dominio: {str(e)}", exc_info=True) 
             raise ValueError(f"Falha ao selecionar dominio automaticamente: {str(e)}") from e
         
-    def _retrieve_documents(self, query_embedding: np.ndarray, domain: Domain) -> List[Chunk]:
+    def _search_lexical(self, context: QueryContext, query: str, domain: Domain, k: int) -> List[int]:
+        """
+        Busca BM25 no índice FTS5 do domínio. Roda em uma thread do _retrieval_executor, com conexão própria.
+        """
+        with self._span(context, "lexical_search"), self.sqlite_manager.get_connection(db_path=domain.db_path) as conn:
+            return self.sqlite_manager.search_chunks_fts(conn, query, k)
+
+    def _retrieve_documents(self, context: QueryContext, query_embedding: np.ndarray, domain: Domain, query: Optional[str] = None) -> List[Chunk]:
         """
         Recupera os chunks de conteúdo relevantes para a query usando o FaissManager.
 
+        São retornados até retrieval_k chunks ou, com o rerank ativo, até max(retrieval_k, rerank_candidates) (ver
+        _first_stage_k). Com QueryConfig.retrieval_strategy = "hybrid" e a query fornecida, a busca BM25 (FTS5) roda
+        em paralelo à busca no FAISS; os dois rankings, de até max(k, hybrid_candidates) chunks cada, são
+        combinados por reciprocal rank fusion e os k primeiros são retornados.
+
         Args:
+            context (QueryContext): O estado da consulta.
             query_embedding (np.ndarray): O embedding da query.
+            domain (Domain): O domínio a ser consultado.
+            query (Optional[str]): O texto da query, usado na busca lexical.
 
         Returns:
             List[str]: Uma lista de chunks de conteúdo relevantes.
@@ -224,22 +434,51 @@ class QueryOrchestrator:
             
             self.logger.debug(f"Procurando o indice FAISS em: {domain.vector_store_path}")
 
-            _, ids = self.faiss_manager.search_faiss_index(
-                query_embedding=query_embedding, 
-                index_path=domain.vector_store_path,
-                dimension=domain.embeddings_dimension,
-                )
-            flat_ids = ids.flatten().tolist()
-            self.logger.debug(f"Valor de retorno da busca no indice FAISS", flat_ids=flat_ids)
-            self.metrics_data["knn_chunk_ids"] = len(flat_ids)
+            query_config = self.config.query
+            k = self._first_stage_k()
+            if query_config.retrieval_strategy == "hybrid" and query:
+                # Ao menos k candidatos, para não retornar menos chunks que a busca só no FAISS
+                candidates = max(k, query_config.hybrid_candidates)
+                lexical_future = self._retrieval_executor.submit(self._search_lexical, context, query, domain, candidates)
+
+                with self._span(context, "faiss_search"):
+                    _, ids = self.faiss_manager.search_faiss_index(
+                        query_embedding=query_embedding,
+                        index_path=domain.vector_store_path,
+                        dimension=domain.embeddings_dimension,
+                        k=candidates,
+                        )
+                vector_ids = [chunk_id for chunk_id in ids.flatten().tolist() if chunk_id != -1]
+
+                try:
+                    lexical_ids = lexical_future.result()
+                except Exception as e:
+                    self.logger.warning(f"Busca lexical indisponivel para o dominio {domain.name}. Usando apenas o FAISS: {e}")
+                    lexical_ids = []
+
+                flat_ids = _reciprocal_rank_fusion([vector_ids, lexical_ids], query_config.rrf_k)[:k]
+                self.logger.debug(f"Valor de retorno da busca hibrida", vector_ids=vector_ids, lexical_ids=lexical_ids, flat_ids=flat_ids)
+                context.metrics["knn_chunk_ids"] = context.metrics.get("knn_chunk_ids", 0) + len(vector_ids)
+                context.metrics["bm25_chunk_ids"] = context.metrics.get("bm25_chunk_ids", 0) + len(lexical_ids)
+            else:
+                with self._span(context, "faiss_search"):
+                    _, ids = self.faiss_manager.search_faiss_index(
+                        query_embedding=query_embedding, 
+                        index_path=domain.vector_store_path,
+                        dimension=domain.embeddings_dimension,
+                        k=k,
+                        )
+                flat_ids = ids.flatten().tolist()
+                self.logger.debug(f"Valor de retorno da busca no indice FAISS", flat_ids=flat_ids)
+                context.metrics["knn_chunk_ids"] = context.metrics.get("knn_chunk_ids", 0) + len(flat_ids)
             
             self.logger.debug(f"Procurando chunks no banco de dados: {domain.db_path} para os ids: {flat_ids}")
-            with self.sqlite_manager.get_connection(db_path=domain.db_path) as conn:
+            with self._span(context, "sqlite_fetch"), self.sqlite_manager.get_connection(db_path=domain.db_path) as conn:
                 chunks = self.sqlite_manager.get_chunks(conn, flat_ids)
             
             self.logger.debug(f"Valor de retorno da busca no banco de dados: {len(chunks)} chunks.", chunks_content=[chunk.content for chunk in chunks])
             
-            self.metrics_data["retrieved_chunks"] += len(chunks)
+            context.metrics["retrieved_chunks"] += len(chunks)
 
             self.logger.info("Chunks de conteudo recuperados com sucesso")
             
@@ -249,6 +488,112 @@ class QueryOrchestrator:
             self.logger.error(f"Erro ao recuperar chunks de conteudo: para o dominio {domain.name}: {str(e)}")
             raise e
     
+    def _follow_up_embedding(self, query_embedding: np.ndarray, previous_embedding: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Embedding da busca de uma pergunta de continuação: a média, com peso follow_up_query_weight para a query
+        anterior, dos embeddings normalizados das duas queries. Perguntas curtas como "e o prazo?" mantêm o assunto
+        do turno anterior.
+        """
+        weight = self.config.query.follow_up_query_weight
+        if previous_embedding is None or weight == 0 or previous_embedding.size != query_embedding.size:
+            return query_embedding
+        combined = (1.0 - weight) * unit_vector(query_embedding) + weight * unit_vector(previous_embedding)
+        return unit_vector(combined).reshape(query_embedding.shape)
+
+    def _retrieve_follow_up(self, context: QueryContext, query_embedding: np.ndarray, domain: Domain,
+                            cached_chunks: List[Chunk]) -> List[Chunk]:
+        """
+        Recuperação incremental de uma pergunta de continuação: busca apenas no FAISS (sem BM25) os
+        follow_up_search_k chunks mais próximos, lê do SQLite só os que não estão entre os chunks do turno anterior
+        e combina a busca e os chunks do turno anterior por reciprocal rank fusion. São retornados até
+        _first_stage_k chunks, como em _retrieve_documents.
+        """
+        query_config = self.config.query
+        with self._span(context, "faiss_search"):
+            _, ids = self.faiss_manager.search_faiss_index(
+                query_embedding=query_embedding,
+                index_path=domain.vector_store_path,
+                dimension=domain.embeddings_dimension,
+                k=query_config.follow_up_search_k,
+                )
+        vector_ids = [chunk_id for chunk_id in ids.flatten().tolist() if chunk_id != -1]
+
+        chunks_by_id = {chunk.id: chunk for chunk in cached_chunks}
+        new_ids = [chunk_id for chunk_id in vector_ids if chunk_id not in chunks_by_id]
+        if new_ids:
+            with self._span(context, "sqlite_fetch"), self.sqlite_manager.get_connection(db_path=domain.db_path) as conn:
+                chunks_by_id.update((chunk.id, chunk) for chunk in self.sqlite_manager.get_chunks(conn, new_ids))
+
+        flat_ids = _reciprocal_rank_fusion([vector_ids, [chunk.id for chunk in cached_chunks]], query_config.rrf_k)
+        chunks = [chunks_by_id[chunk_id] for chunk_id in flat_ids if chunk_id in chunks_by_id][:self._first_stage_k()]
+        self.logger.debug("Valor de retorno da busca incremental", vector_ids=vector_ids, new_ids=new_ids,
+                          flat_ids=[chunk.id for chunk in chunks])
+
+        context.metrics["knn_chunk_ids"] = context.metrics.get("knn_chunk_ids", 0) + len(vector_ids)
+        context.metrics["retrieved_chunks"] += len(chunks)
+        context.metrics["follow_up_reused_chunks"] += sum(1 for chunk in chunks if chunk.id not in new_ids)
+        return chunks
+
+    def _first_stage_k(self) -> int:
+        """Número de chunks buscados por domínio: com o rerank ativo, ao menos rerank_candidates."""
+        query_config = self.config.query
+        if query_config.rerank_strategy == "cross-encoder":
+            return max(query_config.retrieval_k, query_config.rerank_candidates)
+        return query_config.retrieval_k
+
+    def _rerank(self, context: QueryContext, query: str, domain: Domain, chunks: List[Chunk]) -> Tuple[List[Chunk], Optional[List[float]]]:
+        """
+        Etapa opcional após _retrieve_documents: reordena os chunks do domínio com o cross-encoder e mantém os
+        retrieval_k melhores.
+
+        Returns:
+            Tuple[List[Chunk], Optional[List[float]]]: Os chunks e os scores do cross-encoder (None sem rerank).
+        """
+        query_config = self.config.query
+        if query_config.rerank_strategy == "none" or not chunks:
+            return chunks, None
+
+        try:
+            with self._span(context, "rerank"):
+                chunks, scores, stats = self.reranker.rerank(query, domain.id, chunks, query_config.retrieval_k)
+        except Exception as e:
+            self.logger.warning(f"Rerank indisponivel para o dominio {domain.name}. Usando a ordem da recuperacao: {e}")
+            return chunks[:query_config.retrieval_k], None
+
+        for key, value in stats.items():
+            context.metrics[key] = context.metrics.get(key, 0) + value
+        return chunks, scores
+
+    def _context_candidates(self, query_embedding: np.ndarray, domain: Domain, chunks: List[Chunk],
+                            scores: Optional[List[float]] = None) -> List[ContextCandidate]:
+        """
+        Prepara os chunks recuperados de um domínio para o ContextPacker. O score é o do cross-encoder, se houver
+        rerank; senão, com deduplicação por similaridade ou MMR ativos, a similaridade de cosseno dos vetores dos
+        chunks (reconstruídos do índice FAISS) com a query; nos demais casos, a posição no ranking do domínio,
+        intercalando os domínios.
+        """
+        query_config = self.config.query
+        rank_scores = scores or [1.0 / (query_config.rrf_k + position) for position in range(1, len(chunks) + 1)]
+        if not chunks or (query_config.context_dedup_threshold >= 1.0 and query_config.context_mmr_lambda is None):
+            return [ContextCandidate(chunk, score) for chunk, score in zip(chunks, rank_scores)]
+
+        try:
+            vectors = self.faiss_manager.get_embeddings(domain.vector_store_path, domain.embeddings_dimension, [chunk.id for chunk in chunks])
+        except Exception as e:
+            self.logger.warning(f"Vetores dos chunks indisponiveis para o dominio {domain.name}. Empacotando pela posicao: {e}")
+            return [ContextCandidate(chunk, score) for chunk, score in zip(chunks, rank_scores)]
+
+        query_vector = unit_vector(query_embedding)
+        candidates = []
+        for chunk, vector, rank_score in zip(chunks, vectors, rank_scores):
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                candidates.append(ContextCandidate(chunk, rank_score if scores else 0.0))
+            else:
+                score = rank_score if scores else float(query_vector @ (vector / norm))
+                candidates.append(ContextCandidate(chunk, score, vector, domain.config.embeddings_model))
+        return candidates
+
     def _prepare_context_prompt(self, chunks_content: List[Chunk], query: str) -> List[Dict[str, str]]:
         """
         Prepara a lista de mensagens para o LLM.
@@ -301,84 +646,337 @@ class QueryOrchestrator:
             )
             raise ValueError(f"Erro inesperado ao formatar o prompt: {e}") from e
     
-    def _setup_metrics_data(self) -> None:
+    def _setup_metrics_data(self, context: QueryContext) -> None:
         """
-        Obtém os dados de métricas para o processo de processamento de queries.
-        
+        Inicializa os dados de métricas da consulta em context.metrics.
+        """
+        context.metrics["process"] = "Processamento de queries"
+        # Horário de início, para exibição; as durações usam o relógio monotônico do QueryContext
+        context.metrics["start_time"] = datetime.now()
+        context.metrics["embedding_model"] = self.embedding_generator.config.model_name
+        context.metrics["embedding_dimension"] = self.embedding_generator.embedding_dimension
+        context.metrics["faiss_index_type"] = self.faiss_manager.config.vector_store.index_type
+        context.metrics["retrieval_strategy"] = self.config.query.retrieval_strategy
+        # Dados do roteamento de domínios: "user" (domínios informados), "embedding", "llm" ou "follow_up" (domínios
+        # do turno anterior da sessão)
+        context.metrics["domain_routing"] = None
+        context.metrics["domain_routing_scores"] = {}
+        context.metrics["knn_chunk_ids"] = 0
+        context.metrics["bm25_chunk_ids"] = 0
+        context.metrics["retrieved_chunks"] = 0
+        context.metrics["context_prompt"] = None
+        context.metrics["context_chunks"] = []
+        context.metrics["answer_cache_hit"] = False
+        context.metrics["answer_cache_similarity"] = None
+        context.metrics["context_tokens"] = 0
+        context.metrics["context_tokens_saved"] = 0
+        context.metrics["rerank_cache_hits"] = 0
+        context.metrics["rerank_scored"] = 0
+        # Pergunta de continuação atendida com a memória de recuperação da sessão e chunks do turno anterior mantidos
+        context.metrics["follow_up_reuse"] = False
+        context.metrics["follow_up_reused_chunks"] = 0
+        context.metrics["stage_durations"] = context.stage_durations
+
+    def _span(self, context: QueryContext, stage: str) -> ContextManager[None]:
+        """Mede uma etapa da consulta: a duração vai para os histogramas e para context.stage_durations."""
+        return self.latency.span(stage, context.stage_durations)
+
+    def _complete_query(self, context: QueryContext, success: bool) -> None:
+        """Registra o fim da consulta: o resultado, o tempo total (segundos) e a latência no histograma "query" ou "query_failed"."""
+        elapsed = context.elapsed()
+        context.metrics["success"] = success
+        context.metrics["processing_duration"] = elapsed
+        self.latency.record("query" if success else "query_failed", elapsed)
+
+    def _prepare_generation(self, context: QueryContext, query: str, domain_names: Optional[List[str]] = None,
+                            session_id: Optional[str] = None, follow_up: bool = False) -> Dict[str, Any]:
+        """
+        Executa as etapas anteriores à geração da resposta: cache semântico, seleção de domínios, recuperação dos
+        chunks e montagem das mensagens para o LLM. Com session_id, a recuperação é guardada na memória da sessão;
+        com follow_up, a do turno anterior é reaproveitada (ver _follow_up_domains e _retrieve_follow_up).
+
         Returns:
-            Dict[str, Any]: Dicionário contendo os dados de métricas
+            Dict[str, Any]: "messages" (None se a resposta veio do cache, já registrada em context.metrics) e os
+            dados usados por _finish_generation para armazenar a resposta no cache.
+        """
+        context.metrics["question"] = query
+
+        cache_scope = self._answer_cache_scope(query, domain_names)
+        with self._span(context, "answer_cache"):
+            cache_embedding, generations, cached = self._lookup_answer_cache(context, query, cache_scope)
+        if cached:
+            self.logger.info("Resposta recuperada do cache semantico", similarity=cached["similarity"], domains=cached["domains"])
+            context.metrics["answer_cache_hit"] = True
+            context.metrics["answer_cache_similarity"] = cached["similarity"]
+            context.metrics["context_chunks"] = list(cached["context_chunks"])
+            context.metrics["answer"] = cached["answer"]
+            # A resposta em cache não passou pela recuperação; o turno guardado da sessão seria de outra pergunta
+            if session_id is not None:
+                self.retrieval_memory.discard(session_id)
+            self._complete_query(context, True)
+            return {"messages": None}
+
+        generations, previous = self._lookup_retrieval_memory(session_id, follow_up, generations)
+        with self._span(context, "domain_selection"):
+            selected_domains = self._follow_up_domains(context, previous, domain_names) or self._select_domains(context, query, domain_names)
+
+        selected_domain_names_log = [d.name for d in selected_domains] if selected_domains else []
+        self.logger.debug(f"Dominios selecionados para recuperacao: {selected_domain_names_log}")
+
+        turn = RetrievalTurn(selected_domain_names_log, {domain.id: generations.get(domain.id) for domain in selected_domains})
+        candidates = []
+        for domain in selected_domains:
+            query_embedding = self._process_query(context, query, domain)
+            cached_chunks = previous.chunks.get(domain.id) if previous else None
+            if cached_chunks is not None:
+                context.metrics["follow_up_reuse"] = True
+                query_embedding = self._follow_up_embedding(query_embedding, previous.query_embeddings.get(domain.config.embeddings_model))
+                domain_chunks = self._retrieve_follow_up(context, query_embedding, domain, cached_chunks)
+            else:
+                domain_chunks = self._retrieve_documents(context, query_embedding, domain, query)
+            domain_chunks, rerank_scores = self._rerank(context, query, domain, domain_chunks)
+            turn.query_embeddings[domain.config.embeddings_model] = query_embedding
+            turn.chunks[domain.id] = domain_chunks
+            candidates.extend(self._context_candidates(query_embedding, domain, domain_chunks, rerank_scores))
+
+        if session_id is not None and self.config.query.follow_up_reuse_enabled:
+            self.retrieval_memory.store(session_id, turn)
+
+        query_config = self.config.query
+        with self._span(context, "context_packing"):
+            chunks, packing_stats = self.context_packer.pack(
+                candidates,
+                max_tokens=query_config.context_max_tokens,
+                dedup_threshold=query_config.context_dedup_threshold,
+                mmr_lambda=query_config.context_mmr_lambda,
+            )
+        context.metrics.update(packing_stats)
+
+        if not chunks:
+            self.logger.warning("Nenhum chunk de conteudo recuperado. Enviando a pergunta sem contexto.")
+            # Se não houver chunks, cria uma mensagem de usuário simples
+            messages = [
+                {"role": "user", "content": query}
+            ]
+        else:
+            self.logger.debug(f"Chunks recuperados para contexto ({len(chunks)} total)")
+            # Expor os conteúdos dos chunks para debug/GUI
+            try:
+                context.metrics["context_chunks"] = [chunk.content for chunk in chunks]
+            except Exception:
+                # Garante que sempre seja uma lista mesmo se algo falhar
+                context.metrics["context_chunks"] = []
+            messages = self._prepare_context_prompt(chunks, query)
+            self.logger.debug("Mensagens de contexto e pergunta sendo enviadas ao LLM:", final_messages=messages)
+
+        return {
+            "messages": messages,
+            "selected_domains": selected_domains,
+            "has_context": bool(chunks),
+            "cache_scope": cache_scope,
+            "cache_embedding": cache_embedding,
+            "generations": generations,
+        }
+
+    def _finish_generation(self, context: QueryContext, answer: str, generation: Dict[str, Any]) -> None:
         """
-        start_time = datetime.now()
-        self.metrics_data["process"] = "Processamento de queries"
-        self.metrics_data["start_time"] = start_time
-        self.metrics_data["embedding_model"] = self.embedding_generator.config.model_name
-        self.metrics_data["embedding_dimension"] = self.embedding_generator.embedding_dimension
-        self.metrics_data["faiss_index_type"] = self.faiss_manager.config.vector_store.index_type
-        self.metrics_data["retrieved_chunks"] = 0
-        self.metrics_data["context_prompt"] = None
-        self.metrics_data["context_chunks"] = []
+        Registra a resposta gerada em context.metrics e no cache semântico.
+        """
+        self.logger.debug("Resposta do LLM:", answer=answer)
+
+        context.metrics["answer"] = answer
+        self._complete_query(context, True)
+
+        # Apenas respostas com contexto vão para o cache. As gerações são as do início da consulta: se um
+        # domínio for reingerido durante a consulta, a entrada já nasce invalidada
+        if generation["cache_embedding"] is not None and generation["has_context"]:
+            selected_domains = generation["selected_domains"]
+            self.answer_cache.store(
+                generation["cache_embedding"],
+                generation["cache_scope"],
+                {domain.id: generation["generations"].get(domain.id) for domain in selected_domains},
+                {
+                    "answer": answer,
+                    "context_chunks": list(context.metrics["context_chunks"]),
+                    "domains": [domain.name for domain in selected_domains],
+                },
+            )
 
-    def query_llm(self, query: str, domain_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    def _start_query(self, query: str, context: Optional[QueryContext] = None) -> QueryContext:
+        context = context if context is not None else QueryContext()
+        self._setup_metrics_data(context)
+
+        self.logger.info("Iniciando o processamento da pergunta")
+        if not query:
+            self._complete_query(context, False)
+            self.logger.error("Erro ao processar a query: Query vazia ou invalida")
+            raise ValueError("Query vazia ou inválida")
+
+        return context
+
+    def _fail_query(self, context: QueryContext, error: Exception) -> None:
+        self.logger.error(f"Erro ao processar a query: {str(error)}")
+
+        self._complete_query(context, False)
+
+    def query_llm(self, query: str, domain_names: Optional[List[str]] = None, session_id: Optional[str] = None,
+                  follow_up: bool = False) -> Dict[str, Any]:
         """
         Processa a query e retorna a resposta gerada pelo modelo LLM.
 
         Args:
             query (str): A query original.
+            domain_names (Optional[List[str]]): Domínios a consultar; se None, a seleção é automática.
+            session_id (Optional[str]): Sessão (conversa) da consulta; a recuperação fica guardada para o turno seguinte.
+            follow_up (bool): Se a query é uma pergunta de continuação do turno anterior da sessão.
 
         Returns:
             str: A resposta gerada pelo modelo de linguagem.
         """
-        self._setup_metrics_data()
+        context = self._start_query(query)
 
-        self.logger.info("Iniciando o processamento da pergunta")
-        if not query:
-            self.metrics_data["processing_duration"] = str(datetime.now() - self.metrics_data["start_time"])
-            self.metrics_data["success"] = False
-            self.logger.error("Erro ao processar a query: Query vazia ou invalida")
-            raise ValueError("Query vazia ou inválida")
+        try:
+            generation = self._prepare_generation(context, query, domain_names, session_id, follow_up)
+            if generation["messages"] is not None:
+                with self._span(context, "generation"):
+                    answer = self.llm_generator.generate_answer(generation["messages"])
+                self._finish_generation(context, answer, generation)
+
+            return context.metrics
+        
+        except Exception as e:
+            self._fail_query(context, e)
+            raise e
+
+    def query_llm_stream(self, query: str, domain_names: Optional[List[str]] = None,
+                         context: Optional[QueryContext] = None, session_id: Optional[str] = None,
+                         follow_up: bool = False) -> Iterator[str]:
+        """
+        Versão em streaming de query_llm: a seleção de domínios e a recuperação acontecem antes do primeiro
+        trecho, e os trechos da resposta são repassados à medida que o LLM os gera.
+
+        Args:
+            query (str): A query original.
+            domain_names (Optional[List[str]]): Domínios a consultar; se None, a seleção é automática.
+            context (Optional[QueryContext]): Contexto da consulta. Ao fim da iteração, context.metrics contém os
+                mesmos dados retornados por query_llm.
+            session_id (Optional[str]): Sessão (conversa) da consulta, como em query_llm.
+            follow_up (bool): Se a query é uma pergunta de continuação do turno anterior da sessão.
+
+        Yields:
+            str: Trechos da resposta.
+        """
+        context = self._start_query(query, context)
 
         try:
-            self.metrics_data["question"] = query
-            selected_domains = self._select_domains(query, domain_names)
+            generation = self._prepare_generation(context, query, domain_names, session_id, follow_up)
+            if generation["messages"] is None:
+                yield context.metrics["answer"]
+                return
+
+            # Geradores sem suporte a streaming entregam a resposta de uma vez
+            stream = getattr(self.llm_generator, "generate_answer_stream", None)
+            parts = []
+            # "generation" mede só a produção dos trechos: o tempo do consumidor entre trechos não é contado
+            generation_start = time.perf_counter()
+            generation_time = 0.0
+            for part in (stream(generation["messages"]) if stream else [self.llm_generator.generate_answer(generation["messages"])]):
+                generation_time += time.perf_counter() - generation_start
+                if not parts:
+                    # Tempo até o primeiro trecho, desde o início da consulta
+                    first_token = context.elapsed()
+                    self.latency.record("first_token", first_token)
+                    context.stage_durations["first_token"] = first_token
+                parts.append(part)
+                yield part
+                generation_start = time.perf_counter()
+            generation_time += time.perf_counter() - generation_start
+            self.latency.record("generation", generation_time)
+            context.stage_durations["generation"] = generation_time
+
+            self._finish_generation(context, "".join(parts).strip(), generation)
+
+        except Exception as e:
+            self._fail_query(context, e)
+            raise e
+
+    async def aquery_llm(self, query: str, domain_names: Optional[List[str]] = None, session_id: Optional[str] = None,
+                         follow_up: bool = False) -> Dict[str, Any]:
+        """
+        Versão assíncrona de query_llm. O cache semântico, a seleção de domínios, os embeddings, a busca no FAISS
+        e as leituras do SQLite rodam no executor de QueryConfig.async_max_workers threads, e a resposta é gerada
+        com o cliente assíncrono do LLM (agenerate_answer), quando disponível. Nenhuma etapa bloqueia o event loop.
+
+        Args:
+            query (str): A query original.
+            domain_names (Optional[List[str]]): Domínios a consultar; se None, a seleção é automática.
+            session_id (Optional[str]): Sessão (conversa) da consulta, como em query_llm.
+            follow_up (bool): Se a query é uma pergunta de continuação do turno anterior da sessão.
+
+        Returns:
+            Dict[str, Any]: Os mesmos dados retornados por query_llm.
+        """
+        context = self._start_query(query)
+
+        try:
+            generation = await self._run_blocking(self._prepare_generation, context, query, domain_names, session_id, follow_up)
+            if generation["messages"] is not None:
+                with self._span(context, "generation"):
+                    answer = await self._agenerate_answer(generation["messages"])
+                self._finish_generation(context, answer, generation)
+
+            return context.metrics
+
+        except Exception as e:
+            self._fail_query(context, e)
+            raise e
+
+    def retrieve_chunks(self, query: str, domain_names: Optional[List[str]] = None, k: Optional[int] = None) -> List[Chunk]:
+        """
+        Recupera os chunks relevantes para a query, sem gerar resposta.
+
+        Args:
+            query (str): A query original.
+            domain_names (Optional[List[str]]): Domínios a consultar; se None, a seleção é automática.
+            k (Optional[int]): Número máximo de chunks retornados; se None, todos os recuperados em cada domínio.
 
-            selected_domain_names_log = [d.name for d in selected_domains] if selected_domains else []
-            self.logger.debug(f"Dominios selecionados para recuperacao: {selected_domain_names_log}")
+        Returns:
+            List[Chunk]: Os chunks recuperados, na ordem dos domínios selecionados.
+        """
+        context = self._start_query(query)
 
+        try:
             chunks = []
+            with self._span(context, "domain_selection"):
+                selected_domains = self._select_domains(context, query, domain_names)
             for domain in selected_domains:
-                query_embedding = self._process_query(query, domain)
-                domain_chunks = self._retrieve_documents(query_embedding, domain)
-                chunks.extend(domain_chunks)
+                query_embedding = self._process_query(context, query, domain)
+                domain_chunks = self._retrieve_documents(context, query_embedding, domain, query)
+                chunks.extend(self._rerank(context, query, domain, domain_chunks)[0])
 
-            if not chunks:
-                self.logger.warning("Nenhum chunk de conteudo recuperado. Enviando a pergunta sem contexto.")
-                # Se não houver chunks, cria uma mensagem de usuário simples
-                messages = [
-                    {"role": "user", "content": query}
-                ]
-            else:
-                self.logger.debug(f"Chunks recuperados para contexto ({len(chunks)} total)")
-                # Expor os conteúdos dos chunks para debug/GUI
-                try:
-                    self.metrics_data["context_chunks"] = [chunk.content for chunk in chunks]
-                except Exception:
-                    # Garante que sempre seja uma lista mesmo se algo falhar
-                    self.metrics_data["context_chunks"] = []
-                messages = self._prepare_context_prompt(chunks, query)
-                self.logger.debug("Mensagens de contexto e pergunta sendo enviadas ao LLM:", final_messages=messages)
-            
-            answer = self.llm_generator.generate_answer(messages)
-            self.logger.debug("Resposta do LLM:", answer=answer)
+            if k is not None:
+                chunks = chunks[:k]
 
-            self.metrics_data["answer"] = answer
-            self.metrics_data["success"] = True
-            self.metrics_data["processing_duration"] = str(datetime.now() - self.metrics_data["start_time"])
+            self._complete_query(context, True)
+            return chunks
 
-            return self.metrics_data
-        
         except Exception as e:
-            self.logger.error(f"Erro ao processar a query: {str(e)}")
-            
-            self.metrics_data["success"] = False
-            self.metrics_data["processing_duration"] = str(datetime.now() - self.metrics_data["start_time"])
-            raise e
\ No newline at end of file
+            self._fail_query(context, e)
+            raise e
+
+    async def aretrieve_chunks(self, query: str, domain_names: Optional[List[str]] = None, k: Optional[int] = None) -> List[Chunk]:
+        """
+        Versão assíncrona de retrieve_chunks, executada no executor das consultas assíncronas.
+        """
+        return await self._run_blocking(self.retrieve_chunks, query, domain_names, k)
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._blocking_executor, func, *args)
+
+    async def _agenerate_answer(self, messages: List[Dict[str, str]]) -> str:
+        # Geradores sem cliente assíncrono rodam a chamada síncrona no executor
+        agenerate = getattr(self.llm_generator, "agenerate_answer", None)
+        if inspect.iscoroutinefunction(agenerate):
+            return await agenerate(messages)
+        return await self._run_blocking(self.llm_generator.generate_answer, messages)
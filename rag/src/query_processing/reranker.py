@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from rag.src.config.models import QueryConfig
+from rag.src.models import Chunk
+from rag.src.utils.logger import get_logger
+
+
+class CrossEncoderReranker:
+    """
+    Reordenação dos chunks recuperados com um cross-encoder (QueryConfig.rerank_model), que avalia cada par
+    (query, chunk) em conjunto e é mais preciso que a similaridade entre embeddings da primeira etapa.
+
+    O modelo é carregado no primeiro uso, em CPU, com o backend configurado ("onnx" exige o pacote optimum com
+    onnxruntime; se não puder ser carregado, o backend torch é usado). Os pares sem score em cache são avaliados
+    em lotes de rerank_batch_size. Os scores ficam em um cache LRU por (hash da query, domínio, chunk), que
+    também guarda o hash do conteúdo: um id reaproveitado por outro chunk após uma reingestão não é servido.
+    """
+
+    def __init__(self, config: QueryConfig, log_domain: str = "utils"):
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        self.config = config.model_copy(deep=True)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        # (hash da query, id do domínio, id do chunk) -> (hash do conteúdo, score)
+        self._scores: "OrderedDict[Tuple[bytes, int, int], Tuple[bytes, float]]" = OrderedDict()
+
+    def update_config(self, new_config: QueryConfig) -> None:
+        """Atualiza a configuração; a troca de modelo ou backend descarta o modelo carregado e os scores em cache."""
+        if (new_config.rerank_model, new_config.rerank_backend) != (self.config.rerank_model, self.config.rerank_backend):
+            with self._model_lock:
+                self._model = None
+            self.clear()
+        self.config = new_config.model_copy(deep=True)
+        with self._cache_lock:
+            self._evict()
+
+    def clear(self) -> None:
+        with self._cache_lock:
+            self._scores.clear()
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                backend = self.config.rerank_backend
+                try:
+                    self._model = CrossEncoder(self.config.rerank_model, device="cpu", backend=backend)
+                except Exception as e:
+                    if backend == "torch":
+                        raise
+                    self.logger.warning(f"Backend {backend} indisponivel para o cross-encoder. Usando torch: {e}")
+                    self._model = CrossEncoder(self.config.rerank_model, device="cpu")
+                self.logger.info("Cross-encoder carregado", model=self.config.rerank_model, backend=backend)
+            return self._model
+
+    def _query_hash(self, query: str) -> bytes:
+        return hashlib.blake2b(f"{self.config.rerank_model}\x00{query}".encode("utf-8"), digest_size=16).digest()
+
+    def rerank(self, query: str, domain_id: int, chunks: List[Chunk], top_k: int) -> Tuple[List[Chunk], List[float], Dict[str, int]]:
+        """
+        Reordena os chunks de um domínio pelo score do cross-encoder e retorna os top_k.
+
+        Returns:
+            Tuple[List[Chunk], List[float], Dict[str, int]]: Os chunks escolhidos, os seus scores e o número de scores
+            vindos do cache e calculados.
+        """
+        if not chunks:
+            return [], [], {"rerank_cache_hits": 0, "rerank_scored": 0}
+
+        query_hash = self._query_hash(query)
+        content_hashes = [Chunk.hash_content(chunk.content) for chunk in chunks]
+        scores: List[Optional[float]] = []
+        with self._cache_lock:
+            for chunk, content_hash in zip(chunks, content_hashes):
+                key = (query_hash, domain_id, chunk.id)
+                cached = self._scores.get(key)
+                if cached and cached[0] == content_hash:
+                    self._scores.move_to_end(key)
+                    scores.append(cached[1])
+                else:
+                    scores.append(None)
+
+        missing = [position for position, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self._get_model().predict(
+                [(query, chunks[position].content) for position in missing],
+                batch_size=self.config.rerank_batch_size,
+                show_progress_bar=False,
+            )
+            with self._cache_lock:
+                for position, score in zip(missing, predicted):
+                    scores[position] = float(score)
+                    self._scores[(query_hash, domain_id, chunks[position].id)] = (content_hashes[position], float(score))
+                self._evict()
+
+        order = sorted(range(len(chunks)), key=lambda position: scores[position], reverse=True)
+        stats = {"rerank_cache_hits": len(chunks) - len(missing), "rerank_scored": len(missing)}
+        self.logger.debug("Chunks reordenados pelo cross-encoder", domain_id=domain_id, scores=[scores[p] for p in order], **stats)
+        order = order[:top_k]
+        return [chunks[position] for position in order], [scores[position] for position in order], stats
+
+    def _evict(self) -> None:
+        while len(self._scores) > self.config.rerank_cache_max_entries:
+            self._scores.popitem(last=False)
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from rag.src.models import Chunk
+from rag.src.utils.logger import get_logger
+
+
+@dataclass
+class RetrievalTurn:
+    """Recuperação do último turno de uma sessão, reaproveitada pelas perguntas de continuação."""
+
+    # Domínios selecionados, na ordem da seleção
+    domain_names: List[str]
+    # Geração de cada domínio (id -> geração) no início do turno, ver QueryOrchestrator._domain_generations
+    generations: Dict[int, Tuple]
+    # Embedding da query usado na busca, por modelo de embeddings
+    query_embeddings: Dict[str, np.ndarray] = field(default_factory=dict)
+    # Chunks passados ao empacotamento do contexto, por id do domínio, na ordem do ranking
+    chunks: Dict[int, List[Chunk]] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class RetrievalMemory:
+    """
+    Memória de recuperação por sessão do QueryOrchestrator.
+
+    Guarda, para cada sessão, os domínios, os embeddings da query e os chunks do último turno (RetrievalTurn). Uma
+    pergunta de continuação da mesma sessão ("e para pessoa jurídica?") reaproveita os domínios, sem nova seleção,
+    e combina os chunks guardados com uma busca incremental. O turno guardado expira após ttl_seconds e é
+    descartado quando algum dos seus domínios muda de geração (reingestão). Acima de max_sessions, as sessões
+    usadas há mais tempo são descartadas.
+    """
+
+    def __init__(self, ttl_seconds: int, max_sessions: int, log_domain: str = "utils"):
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._turns: "OrderedDict[Hashable, RetrievalTurn]" = OrderedDict()
+
+    def configure(self, ttl_seconds: int, max_sessions: int) -> None:
+        """Atualiza os limites da memória, descartando o excedente se max_sessions diminuir."""
+        with self._lock:
+            self.ttl_seconds = ttl_seconds
+            self.max_sessions = max_sessions
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def get(self, session_id: Hashable, current_generations: Dict[int, Tuple]) -> Optional[RetrievalTurn]:
+        """
+        Último turno da sessão, ou None se não houver, se tiver expirado ou se algum dos seus domínios tiver
+        mudado de geração.
+        """
+        with self._lock:
+            turn = self._turns.get(session_id)
+            if turn is None:
+                return None
+            expired = time.monotonic() - turn.created_at > self.ttl_seconds
+            outdated = any(current_generations.get(domain_id) != generation
+                           for domain_id, generation in turn.generations.items())
+            if expired or outdated:
+                del self._turns[session_id]
+                self.logger.debug("Memoria de recuperacao descartada", session_id=session_id, expired=expired)
+                return None
+            self._turns.move_to_end(session_id)
+            return turn
+
+    def store(self, session_id: Hashable, turn: RetrievalTurn) -> None:
+        """Substitui o turno guardado da sessão."""
+        with self._lock:
+            self._turns[session_id] = turn
+            self._turns.move_to_end(session_id)
+            self._evict()
+
+    def discard(self, session_id: Hashable) -> None:
+        with self._lock:
+            self._turns.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._turns.clear()
+
+    def _evict(self) -> None:
+        while len(self._turns) > self.max_sessions:
+            self._turns.popitem(last=False)
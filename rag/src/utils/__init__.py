@@ -5,10 +5,16 @@ from .embedding_generator import EmbeddingGenerator
 from .faiss_manager import FaissManager
 from .sqlite_manager import SQLiteManager
 from .domain_manager import DomainManager
+from .domain_catalog import DomainCatalog
+from .latency import LatencyTracker
+from .vectors import unit_vector
 __all__ = [
     'TextNormalizer',
     'EmbeddingGenerator',
     'FaissManager',
     'SQLiteManager',
-    'DomainManager'
+    'DomainManager',
+    'DomainCatalog',
+    'LatencyTracker',
+    'unit_vector'
 ] 
\ No newline at end of file
@@ -0,0 +1,195 @@
+import sqlite3
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Union
+
+from rag.src.utils.logger import get_logger
+
+try:
+    import zstandard as zstd
+except ImportError:  # zstandard é opcional; sem ele o modo "zstd" recai para zlib
+    zstd = None
+
+COMPRESSION_OPTIONS = ("none", "zlib", "zstd")
+
+# Prefixo de 1 byte dos valores comprimidos. Valores TEXT (str) são sempre texto puro.
+_ZLIB_TAG = 0x01
+_ZSTD_TAG = 0x02
+
+
+class ChunkCompressor:
+    """
+    Compressão opcional, por domínio, das colunas content e metadata da tabela chunks.
+
+    O modo de compressão e os dicionários zstd ficam no próprio banco do domínio (tabelas storage_settings e
+    compression_dictionaries). Valores comprimidos são gravados como BLOB com um byte de prefixo identificando
+    o codec; valores TEXT são lidos como estão. Assim, ativar ou trocar o modo de um domínio só afeta os chunks
+    inseridos a partir de então, sem reescrever os existentes.
+    """
+
+    ZLIB_LEVEL = 6
+    ZSTD_LEVEL = 3
+    ZSTD_DICTIONARY_SIZE = 16 * 1024
+    # Número mínimo de amostras (content + metadata) para treinar o dicionário zstd de um domínio
+    ZSTD_MIN_TRAINING_SAMPLES = 64
+
+    def __init__(self, log_domain: str = "utils"):
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        # Descompressores por dict_id. O dict_id do zstd é gravado no cabeçalho de cada frame, o que
+        # permite resolver o dicionário sem saber de qual banco de domínio o valor veio
+        self._zstd_decompressors: Dict[int, Any] = {}
+
+    @staticmethod
+    def zstd_available() -> bool:
+        return zstd is not None
+
+    def get_mode(self, conn: sqlite3.Connection) -> str:
+        """Retorna o modo de compressão configurado no banco do domínio ("none" se não houver)."""
+        row = conn.execute("SELECT value FROM storage_settings WHERE key = 'compression'").fetchone()
+        return row[0] if row else "none"
+
+    def set_mode(self, conn: sqlite3.Connection, mode: str) -> None:
+        """Grava o modo de compressão do domínio. Não faz commit."""
+        if mode not in COMPRESSION_OPTIONS:
+            self.logger.error("Modo de compressao invalido", mode=mode)
+            raise ValueError(f"Modo de compressão inválido: {mode}. Opções: {', '.join(COMPRESSION_OPTIONS)}")
+        if mode == "zstd" and not self.zstd_available():
+            self.logger.warning("Pacote zstandard nao instalado. Novos chunks serao comprimidos com zlib")
+        conn.execute("INSERT OR REPLACE INTO storage_settings (key, value) VALUES ('compression', ?)", (mode,))
+
+    def get_encoder(self, conn: sqlite3.Connection, samples: Iterable[str]) -> Callable[[str], Union[str, bytes]]:
+        """
+        Retorna a função de codificação para o modo atual do domínio.
+
+        No modo "zstd", se o domínio ainda não tiver dicionário e samples tiver amostras suficientes,
+        um dicionário é treinado com elas e gravado no banco (na transação corrente de conn).
+
+        Args:
+            conn: Conexão com o banco de dados do domínio.
+            samples: Textos (content e metadata) a serem inseridos, usados apenas para treinar o dicionário.
+        """
+        mode = self.get_mode(conn)
+
+        if mode == "zstd" and self.zstd_available():
+            compressor = self._get_zstd_compressor(conn, samples)
+            return lambda text: bytes((_ZSTD_TAG,)) + compressor.compress(text.encode("utf-8"))
+
+        if mode in ("zlib", "zstd"):
+            return lambda text: bytes((_ZLIB_TAG,)) + zlib.compress(text.encode("utf-8"), self.ZLIB_LEVEL)
+
+        return lambda text: text
+
+    def _get_zstd_compressor(self, conn: sqlite3.Connection, samples: Iterable[str]) -> Any:
+        row = conn.execute("SELECT data FROM compression_dictionaries ORDER BY id DESC LIMIT 1").fetchone()
+        if row:
+            return zstd.ZstdCompressor(level=self.ZSTD_LEVEL, dict_data=zstd.ZstdCompressionDict(row[0]))
+
+        samples = [sample.encode("utf-8") for sample in samples]
+        if len(samples) >= self.ZSTD_MIN_TRAINING_SAMPLES:
+            try:
+                dictionary = zstd.train_dictionary(self.ZSTD_DICTIONARY_SIZE, samples)
+                conn.execute(
+                    "INSERT INTO compression_dictionaries (id, data) VALUES (?, ?)",
+                    (dictionary.dict_id(), dictionary.as_bytes())
+                )
+                self.logger.info("Dicionario zstd treinado para o dominio", dict_id=dictionary.dict_id(), samples=len(samples))
+                return zstd.ZstdCompressor(level=self.ZSTD_LEVEL, dict_data=dictionary)
+            except zstd.ZstdError as e:
+                self.logger.warning(f"Nao foi possivel treinar o dicionario zstd: {e}")
+
+        # Sem dicionário (poucas amostras): os frames são gravados com dict_id 0
+        return zstd.ZstdCompressor(level=self.ZSTD_LEVEL)
+
+    def decode(self, conn: sqlite3.Connection, value: Union[str, bytes]) -> str:
+        """Decodifica um valor lido de content ou metadata."""
+        if isinstance(value, str):
+            return value
+
+        tag, payload = value[0], value[1:]
+        if tag == _ZLIB_TAG:
+            return zlib.decompress(payload).decode("utf-8")
+        if tag == _ZSTD_TAG:
+            if not self.zstd_available():
+                self.logger.error("Chunk comprimido com zstd, mas o pacote zstandard nao esta instalado")
+                raise RuntimeError("O pacote zstandard é necessário para ler chunks comprimidos com zstd")
+            dict_id = zstd.get_frame_parameters(payload).dict_id
+            return self._get_zstd_decompressor(conn, dict_id).decompress(payload).decode("utf-8")
+
+        self.logger.error("Codec de compressao desconhecido", tag=tag)
+        raise ValueError(f"Codec de compressão desconhecido: {tag}")
+
+    def _get_zstd_decompressor(self, conn: sqlite3.Connection, dict_id: int) -> Any:
+        decompressor = self._zstd_decompressors.get(dict_id)
+        if decompressor is not None:
+            return decompressor
+
+        if dict_id == 0:
+            decompressor = zstd.ZstdDecompressor()
+        else:
+            row = conn.execute("SELECT data FROM compression_dictionaries WHERE id = ?", (dict_id,)).fetchone()
+            if row is None:
+                self.logger.error("Dicionario zstd nao encontrado no banco do dominio", dict_id=dict_id)
+                raise ValueError(f"Dicionário zstd não encontrado: {dict_id}")
+            decompressor = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(row[0]))
+
+        self._zstd_decompressors[dict_id] = decompressor
+        return decompressor
+
+    def get_stats(self, conn: sqlite3.Connection, sample_size: int = 1000) -> Dict[str, Any]:
+        """
+        Calcula estatísticas de armazenamento dos chunks de um domínio.
+
+        Returns:
+            Dict[str, Any]: modo, total de chunks, chunks comprimidos, bytes armazenados e descomprimidos de
+            content + metadata, taxa de compressão, tamanho do arquivo do banco e o custo de decodificação
+            medido sobre uma amostra de até sample_size chunks (tempo médio por chunk e percentual sobre o
+            tempo da leitura no SQLite).
+        """
+        total_chunks, compressed_chunks, stored_bytes = conn.execute(
+            """
+            SELECT COUNT(*),
+                   COALESCE(SUM(typeof(content) = 'blob'), 0),
+                   COALESCE(SUM(length(CAST(content AS BLOB)) + length(CAST(metadata AS BLOB))), 0)
+            FROM chunks
+            """
+        ).fetchone()
+
+        # Tamanho descomprimido: decodifica todos os chunks em lotes
+        raw_bytes = 0
+        cursor = conn.execute("SELECT content, metadata FROM chunks")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for content, metadata in rows:
+                raw_bytes += len(self.decode(conn, content).encode("utf-8"))
+                raw_bytes += len(self.decode(conn, metadata).encode("utf-8"))
+
+        # Custo de decodificação sobre uma amostra, comparado ao tempo de leitura
+        start = time.perf_counter()
+        sample: List[tuple] = conn.execute(
+            "SELECT content, metadata FROM chunks ORDER BY id LIMIT ?", (sample_size,)
+        ).fetchall()
+        fetch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for content, metadata in sample:
+            self.decode(conn, content)
+            self.decode(conn, metadata)
+        decode_seconds = time.perf_counter() - start
+
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+        return {
+            "mode": self.get_mode(conn),
+            "total_chunks": total_chunks,
+            "compressed_chunks": compressed_chunks,
+            "stored_bytes": stored_bytes,
+            "raw_bytes": raw_bytes,
+            "compression_ratio": raw_bytes / stored_bytes if stored_bytes else 1.0,
+            "database_bytes": page_count * page_size,
+            "decode_sample_size": len(sample),
+            "decode_us_per_chunk": decode_seconds / len(sample) * 1e6 if sample else 0.0,
+            "decode_overhead_pct": decode_seconds / fetch_seconds * 100 if sample and fetch_seconds else 0.0,
+        }
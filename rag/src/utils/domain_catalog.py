@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Set
+
+from rag.src.models import Domain
+from rag.src.utils.sqlite_manager import SQLiteManager
+from rag.src.utils.logger import get_logger
+
+
+class DomainCatalog:
+    """
+    Cache em memória dos domínios de conhecimento do banco de controle.
+
+    Os domínios (com suas configurações) e a existência dos bancos de cada domínio são carregados uma vez e
+    recarregados apenas quando o banco de controle muda. A mudança é detectada por PRAGMA data_version em uma
+    conexão mantida aberta pelo catálogo, que muda sempre que outra conexão (deste ou de outro processo) faz
+    commit no banco. Os objetos Domain retornados são compartilhados entre chamadas e não devem ser alterados.
+    """
+
+    def __init__(self, sqlite_manager: SQLiteManager, log_domain: str = "utils"):
+        self.sqlite_manager = sqlite_manager
+        self.logger = get_logger(__name__, log_domain=log_domain)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[str] = None
+        self._data_version: Optional[int] = None
+        self._domains: List[Domain] = []
+        self._populated_ids: Set[int] = set()
+
+    def get_domains(self) -> List[Domain]:
+        """Retorna todos os domínios de conhecimento (lista vazia se não houver nenhum)."""
+        with self._lock:
+            self._refresh()
+            return list(self._domains)
+
+    def get_populated_domains(self) -> List[Domain]:
+        """Retorna os domínios cujo banco de dados já existe, isto é, que já receberam documentos."""
+        with self._lock:
+            self._refresh()
+            return [domain for domain in self._domains if domain.id in self._populated_ids]
+
+    def invalidate(self) -> None:
+        """Força o recarregamento do catálogo na próxima consulta."""
+        with self._lock:
+            self._data_version = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._conn_path = None
+            self._data_version = None
+
+    def _refresh(self) -> None:
+        # O caminho do banco de controle pode mudar via SQLiteManager.update_config
+        if self._conn is None or self._conn_path != self.sqlite_manager.control_db_path:
+            if self._conn is not None:
+                self._conn.close()
+            # get_connection cria o banco de controle, se necessário
+            self.sqlite_manager.get_connection(control=True).close()
+            self._conn_path = self.sqlite_manager.control_db_path
+            self._conn = sqlite3.connect(self._conn_path, check_same_thread=False)
+            self._data_version = None
+
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+
+        self.logger.info("Carregando o catalogo de dominios do banco de controle", control_db_path=self._conn_path)
+        domains = self.sqlite_manager.get_domain(self._conn) or []
+        self._domains = domains
+        self._populated_ids = {domain.id for domain in domains if domain.db_path and os.path.exists(domain.db_path)}
+        self._data_version = data_version
+        self.logger.debug("Catalogo de dominios carregado", domains=[domain.name for domain in domains])
@@ -46,6 +46,7 @@ class DomainManager:
                 - keywords: Palavras-chave do domínio de conhecimento, separadas por virgulas.
                 - embedding_model: Modelo de embedding a ser utilizado.
                 - faiss_index_type: Tipo de índice Faiss a ser utilizado.
+                - compression (opcional): Modo de compressão dos chunks ("none", "zlib" ou "zstd").
         """
         if not isinstance(new_domain_data["name"], str) or not isinstance(new_domain_data["description"], str) or not isinstance(new_domain_data["keywords"], str):
             self.logger.error("Nome, descrição e palavras-chave devem ser strings")
@@ -111,6 +112,9 @@ class DomainManager:
                 conn.commit()
                 self.logger.info("Dominio de conhecimento adicionado com sucesso", domain_name=domain_data["name"])
 
+            if new_domain_data.get("compression", "none") != "none":
+                self.set_domain_compression(domain_data["name"], new_domain_data["compression"])
+
         except Exception as e:
             if conn:
                 conn.rollback()
@@ -320,4 +324,55 @@ class DomainManager:
 
         except Exception as e:
             self.logger.error(f"Erro ao listar documentos do dominio de conhecimento: {e}", exc_info=True)
-            raise e
\ No newline at end of file
+            raise e
+
+    def _get_domain_db_path(self, domain_name: str) -> str:
+        with self.sqlite_manager.get_connection(control=True) as conn:
+            domain = self.sqlite_manager.get_domain(conn, domain_name)
+
+        if not domain:
+            self.logger.error("Dominio nao encontrado", domain_name=domain_name)
+            raise ValueError(f"Domínio não encontrado: {domain_name}")
+
+        [domain] = domain
+        return domain.db_path
+
+    def set_domain_compression(self, domain_name: str, mode: str) -> None:
+        """
+        Define o modo de compressão dos chunks de um domínio de conhecimento. Cria o banco do domínio, se necessário.
+
+        Args:
+            domain_name (str): Nome do domínio de conhecimento.
+            mode (str): "none", "zlib" ou "zstd". Afeta apenas os chunks inseridos a partir de agora.
+        """
+        self.logger.info("Definindo compressao do dominio de conhecimento", domain_name=domain_name, mode=mode)
+        try:
+            db_path = self._get_domain_db_path(domain_name)
+            with self.sqlite_manager.get_connection(db_path=db_path) as conn:
+                self.sqlite_manager.set_compression(conn, mode)
+            self.logger.info("Compressao do dominio definida com sucesso", domain_name=domain_name, mode=mode)
+
+        except Exception as e:
+            self.logger.error(f"Erro ao definir a compressao do dominio de conhecimento: {e}", exc_info=True)
+            raise e
+
+    def get_domain_storage_stats(self, domain_name: str) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de armazenamento dos chunks de um domínio de conhecimento
+        (taxa de compressão e custo de decodificação; ver SQLiteManager.get_storage_stats).
+        """
+        self.logger.info("Calculando estatisticas de armazenamento do dominio", domain_name=domain_name)
+        try:
+            db_path = self._get_domain_db_path(domain_name)
+            if not os.path.exists(db_path):
+                self.logger.warning("Banco de dados do dominio nao encontrado", domain_db_path=db_path)
+                return {}
+
+            with self.sqlite_manager.get_connection(db_path=db_path) as conn:
+                stats = self.sqlite_manager.get_storage_stats(conn)
+            self.logger.info("Estatisticas de armazenamento calculadas", domain_name=domain_name, **stats)
+            return stats
+
+        except Exception as e:
+            self.logger.error(f"Erro ao calcular estatisticas de armazenamento do dominio: {e}", exc_info=True)
+            raise e
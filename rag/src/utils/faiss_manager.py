@@ -157,6 +157,61 @@ class FaissManager:
             self.logger.error(f"Erro ao adicionar embeddings com IDs ao índice FAISS {index_path}: {e}", exc_info=True)
             raise e
 
+    def get_embeddings_sum(self, index_path: str, dimension: int, ids: Optional[List[int]] = None) -> tuple[np.ndarray, int]:
+        """
+        Soma os vetores armazenados em um índice FAISS (IDMap sobre índice flat), todos ou apenas os de ids.
+        Usado para calcular o centroide de domínios ingeridos antes de o centroide ser mantido na ingestão e
+        para descontar do centroide os chunks de documentos removidos.
+
+        Returns:
+            tuple[np.ndarray, int]: A soma (float64, (D,)) e o número de vetores. Zeros e 0 se o índice não existir.
+        """
+        if not os.path.exists(index_path):
+            return np.zeros(dimension, dtype=np.float64), 0
+
+        try:
+            index = self._initialize_index(index_path, dimension)
+            if index.ntotal == 0:
+                return np.zeros(dimension, dtype=np.float64), 0
+            base_index = faiss.downcast_index(index.index)
+            if ids is None:
+                vectors = base_index.reconstruct_n(0, index.ntotal)
+                return vectors.sum(axis=0, dtype=np.float64), index.ntotal
+
+            positions = np.flatnonzero(np.isin(faiss.vector_to_array(index.id_map), np.asarray(ids, dtype=np.int64)))
+            embedding_sum = np.zeros(dimension, dtype=np.float64)
+            for position in positions:
+                embedding_sum += base_index.reconstruct(int(position))
+            return embedding_sum, len(positions)
+        except Exception as e:
+            self.logger.error(f"Erro ao somar os vetores do indice FAISS {index_path}: {e}", exc_info=True)
+            raise e
+
+    def get_embeddings(self, index_path: str, dimension: int, ids: List[int]) -> np.ndarray:
+        """
+        Reconstrói os vetores armazenados para os ids informados (IDMap sobre índice flat), na ordem de ids.
+        Usado no empacotamento do contexto (deduplicação e MMR dos chunks recuperados).
+
+        Returns:
+            np.ndarray: Matriz float32 (len(ids), D). Ids ausentes do índice ficam com linhas de zeros.
+        """
+        vectors = np.zeros((len(ids), dimension), dtype=np.float32)
+        if not ids or not os.path.exists(index_path):
+            return vectors
+
+        try:
+            index = self._initialize_index(index_path, dimension)
+            base_index = faiss.downcast_index(index.index)
+            positions = {chunk_id: position for position, chunk_id in enumerate(faiss.vector_to_array(index.id_map).tolist())}
+            for row, chunk_id in enumerate(ids):
+                position = positions.get(chunk_id)
+                if position is not None:
+                    vectors[row] = base_index.reconstruct(position)
+            return vectors
+        except Exception as e:
+            self.logger.error(f"Erro ao reconstruir os vetores do indice FAISS {index_path}: {e}", exc_info=True)
+            raise e
+
     def search_faiss_index(self, query_embedding: np.ndarray, index_path: str, dimension: int, k: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
         """
         Realiza uma busca em um índice FAISS (IDMap) específico e retorna os IDs dos k vizinhos mais próximos.
@@ -0,0 +1,131 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências no estilo HDR: valores em microssegundos, em buckets lineares até 2^SUB_BUCKET_BITS e,
+    acima disso, 2^(SUB_BUCKET_BITS - 1) buckets por potência de 2. O erro relativo dos percentis fica abaixo de
+    1/2^(SUB_BUCKET_BITS - 1) (~1,6%) em qualquer ordem de grandeza, com memória proporcional ao número de buckets
+    usados e registro O(1).
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @classmethod
+    def _index(cls, micros: int) -> int:
+        if micros < (1 << cls.SUB_BUCKET_BITS):
+            return micros
+        shift = micros.bit_length() - cls.SUB_BUCKET_BITS
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + (micros >> shift)
+
+    @classmethod
+    def _bucket_bounds(cls, index: int) -> tuple:
+        """Limites [inferior, superior) do bucket, em microssegundos."""
+        half = 1 << (cls.SUB_BUCKET_BITS - 1)
+        if index < (1 << cls.SUB_BUCKET_BITS):
+            return index, index + 1
+        shift = index // half - 1
+        mantissa = index - shift * half
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def record(self, seconds: float) -> None:
+        micros = max(0, int(seconds * 1_000_000))
+        index = self._index(micros)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latência (segundos) no percentil informado (0 a 100): ponto médio do bucket, limitado a [min, max]."""
+        if not self.count:
+            return None
+        target = max(1, int(round(percent / 100 * self.count)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                lower, upper = self._bucket_bounds(index)
+                value = (lower + upper) / 2 / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class LatencyTracker:
+    """
+    Registro, por etapa, das latências do caminho de consulta. Cada etapa é medida com time.perf_counter (monotônico)
+    em um span e acumulada em um LatencyHistogram. Os dados podem ser exportados como JSON (snapshot) ou no
+    formato texto do Prometheus (to_prometheus), como summaries com os percentis de PERCENTILES.
+    """
+
+    PERCENTILES = (50, 90, 95, 99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def span(self, stage: str, durations: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """
+        Mede o bloco e registra a duração na etapa, também quando o bloco lança exceção.
+
+        Args:
+            stage (str): Nome da etapa.
+            durations (Optional[Dict[str, float]]): Se informado, a duração (segundos) é somada em durations[stage],
+                por exemplo as durações por etapa de uma consulta.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            if durations is not None:
+                durations[stage] = durations.get(stage, 0.0) + elapsed
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Retorna, por etapa, count, sum, min, max e os percentis (p50, p90, ...), em segundos."""
+        with self._lock:
+            snapshot = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                stats = {"count": histogram.count, "sum": histogram.total, "min": histogram.min, "max": histogram.max}
+                for percent in self.PERCENTILES:
+                    stats[f"p{percent}"] = histogram.percentile(percent)
+                snapshot[stage] = stats
+            return snapshot
+
+    def to_prometheus(self, metric_name: str = "rag_stage_latency_seconds",
+                      description: str = "Latencia das etapas do caminho de consulta do RAG.") -> str:
+        """Exporta as latências no formato texto do Prometheus: um summary com o label stage."""
+        lines: List[str] = [
+            f"# HELP {metric_name} {description}",
+            f"# TYPE {metric_name} summary",
+        ]
+        for stage, stats in self.snapshot().items():
+            for percent in self.PERCENTILES:
+                lines.append(f'{metric_name}{{stage="{stage}",quantile="{percent / 100}"}} {stats[f"p{percent}"]:.6f}')
+            lines.append(f'{metric_name}_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{metric_name}_count{{stage="{stage}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
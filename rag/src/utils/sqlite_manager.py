@@ -1,14 +1,47 @@
 import sqlite3
+import threading
 from pathlib import Path
 import os
+import re
 import json
+import unicodedata
+import numpy as np
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Set, Tuple
 
 from rag.src.models import DocumentFile, Chunk, Domain, DomainConfig
 from rag.src.utils.logger import get_logger
+from rag.src.utils.chunk_compressor import ChunkCompressor
 from rag.src.config.models import SystemConfig
 
+# Colunas na ordem esperada por Chunk.from_row
+_CHUNK_COLUMNS = "id, document_id, content, metadata, created_at"
+# Aridades fixas usadas na busca de chunks por ids; o maior valor fica abaixo do limite de variáveis do SQLite (999)
+_CHUNK_FETCH_BUCKETS = (8, 32, 128, 512)
+_CHUNKS_BY_IDS_SQL = {
+    size: f"SELECT {_CHUNK_COLUMNS} FROM chunks WHERE id IN ({', '.join(['?'] * size)})"
+    for size in _CHUNK_FETCH_BUCKETS
+}
+_CHUNK_HASHES_SQL = {
+    size: f"SELECT content_hash FROM chunks WHERE content_hash IN ({', '.join(['?'] * size)})"
+    for size in _CHUNK_FETCH_BUCKETS
+}
+# Palavras funcionais do português ignoradas na busca lexical (sem acentos, como no tokenizador do chunks_fts).
+# Com os termos combinados por OR, elas casariam com quase todos os chunks e diluiriam o BM25
+_FTS_STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em entre essa esse esta este eu
+foi ha isso isto ja lhe mais mas me meu minha muito na nao nas nem no nos num numa o os ou para pela pelas pelo
+pelos por qual quais quando que quem se sem ser seu sua sao so sobre ta tem tambem te um uma umas uns voce
+""".split())
+
+
+def _fixed_arity_batches(values: List[Any]) -> Iterator[Tuple[int, List[Any]]]:
+    """Divide values em lotes completados com NULL até a aridade fixa mais próxima de _CHUNK_FETCH_BUCKETS."""
+    max_bucket = _CHUNK_FETCH_BUCKETS[-1]
+    for start in range(0, len(values), max_bucket):
+        batch = values[start:start + max_bucket]
+        bucket = next(size for size in _CHUNK_FETCH_BUCKETS if size >= len(batch))
+        yield bucket, batch + [None] * (bucket - len(batch))
 
 class SQLiteManager:
     """Gerenciador de banco de dados SQLite."""
@@ -16,6 +49,7 @@ class SQLiteManager:
     _RAG_DIR = Path(__file__).resolve().parents[2]  # .../rag/src/utils -> .../rag
     CONTROL_SCHEMA_PATH: str = str(_RAG_DIR / "storage" / "schemas" / "control_schema.sql")
     DOMAIN_SCHEMA_PATH: str  = str(_RAG_DIR / "storage" / "schemas" / "schema.sql")
+    DOMAIN_MIGRATIONS_PATH: str = str(_RAG_DIR / "storage" / "schemas" / "migrations")
 
     def __init__(self, config: SystemConfig, log_domain: str = "utils"):
         self.config = config.model_copy(deep=True)
@@ -24,6 +58,11 @@ class SQLiteManager:
         self.control_db_path = os.path.join(config.storage_base_path, config.control_db_filename)
         self.db_path = None
         self.schema_path = self.DOMAIN_SCHEMA_PATH
+        # Bancos de domínio já verificados quanto a migrações pendentes nesta instância. A instância é compartilhada
+        # por consultas concorrentes: get_connection usa apenas o db_path recebido, e o conjunto é protegido pelo lock
+        self._migrated_db_paths: Set[str] = set()
+        self._migrations_lock = threading.Lock()
+        self.chunk_compressor = ChunkCompressor(log_domain=log_domain)
 
     def update_config(self, new_config: SystemConfig) -> None:
         """
@@ -102,14 +141,83 @@ class SQLiteManager:
             self.logger.error("db_path nao pode ser None quando control for False")
             raise ValueError("db_path nao pode ser None quando control for False")
         
-        self.db_path = db_path
-
-        if not os.path.exists(self.db_path):
-            self.logger.info(f"Banco de dados nao encontrado em {self.db_path}. Inicializando o banco de dados...")
-            self._create_database(db_path=self.db_path)
+        if not os.path.exists(db_path):
+            self.logger.info(f"Banco de dados nao encontrado em {db_path}. Inicializando o banco de dados...")
+            self._create_database(db_path=db_path)
         
-        self.logger.info(f"Conectando ao banco de dados em: {self.db_path}")
-        return sqlite3.connect(self.db_path)
+        self.logger.info(f"Conectando ao banco de dados em: {db_path}")
+        conn = sqlite3.connect(db_path)
+        self._register_domain_functions(conn)
+        with self._migrations_lock:
+            migrated = db_path in self._migrated_db_paths
+        if not migrated:
+            # Threads concorrentes podem verificar o mesmo banco; as migrações já aplicadas são ignoradas
+            self._apply_domain_migrations(conn, db_path)
+            with self._migrations_lock:
+                self._migrated_db_paths.add(db_path)
+        return conn
+
+    def _register_domain_functions(self, conn: sqlite3.Connection) -> None:
+        """
+        Registra as funções SQL usadas pelas migrações do banco de domínio:
+        chunk_content_hash (Chunk.hash_content) e chunk_text (texto puro de content, mesmo se comprimido).
+        """
+        conn.create_function("chunk_content_hash", 1, Chunk.hash_content, deterministic=True)
+        conn.create_function("chunk_text", 1, lambda value: self.chunk_compressor.decode(conn, value), deterministic=True)
+
+    def _apply_domain_migrations(self, conn: sqlite3.Connection, db_path: str) -> None:
+        """
+        Aplica, em ordem, os scripts de DOMAIN_MIGRATIONS_PATH (NNN_descricao.sql) com número maior que o
+        PRAGMA user_version do banco. Cada script roda em sua própria transação BEGIN IMMEDIATE, que também
+        atualiza o user_version. A versão é conferida de novo dentro da transação: se outro processo (ex.: a
+        interface Streamlit e o agente Flask sobre o mesmo storage) já aplicou o script, ele é ignorado.
+        """
+        current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        migrations = []
+        for filename in os.listdir(self.DOMAIN_MIGRATIONS_PATH):
+            match = re.match(r"^(\d+)_.*\.sql$", filename)
+            if match and int(match.group(1)) > current_version:
+                migrations.append((int(match.group(1)), filename))
+
+        if not migrations:
+            return
+
+        applied_version = None
+        for version, filename in sorted(migrations):
+            with open(os.path.join(self.DOMAIN_MIGRATIONS_PATH, filename), "r") as f:
+                migration = f.read()
+            try:
+                # O lock de escrita é obtido antes da leitura do user_version
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                self.logger.warning(f"Aplicando migracao {filename} ao banco de dados: {db_path}")
+                # executescript faria COMMIT antes de rodar o script; os comandos são executados um a um na transação
+                for statement in self._split_sql_statements(migration):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                applied_version = version
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.logger.error(f"Erro ao aplicar a migracao {filename}: {e}")
+                raise e
+        if applied_version is not None:
+            self.logger.info(f"Banco de dados migrado para a versao {applied_version}: {db_path}")
+
+    @staticmethod
+    def _split_sql_statements(script: str) -> List[str]:
+        """Divide um script SQL em comandos completos (inclusive CREATE TRIGGER ... BEGIN ...; END;)."""
+        statements, buffer = [], ""
+        for line in script.splitlines(keepends=True):
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ""
+        if any(line.strip() and not line.strip().startswith("--") for line in buffer.splitlines()):
+            statements.append(buffer.strip())
+        return statements
     
     def begin(self, conn: sqlite3.Connection) -> None:
         """
@@ -199,6 +307,13 @@ class SQLiteManager:
         self.logger.debug(f"Deletando arquivo de documento do banco de dados: {file.name}")
         try:
             cursor = conn.cursor()
+            if cursor.execute("PRAGMA foreign_keys").fetchone()[0]:
+                # Os chunks do documento são removidos em cascata; o índice lexical é mantido aqui (ver schema.sql)
+                rows = cursor.execute("SELECT id, content FROM chunks WHERE document_id = ?", (file.id,)).fetchall()
+                cursor.executemany(
+                    "INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', ?, ?)",
+                    [(chunk_id, self.chunk_compressor.decode(conn, content)) for chunk_id, content in rows],
+                )
             cursor.execute("DELETE FROM document_files WHERE id = ?", (file.id,))
             conn.commit()
 
@@ -216,13 +331,20 @@ class SQLiteManager:
         """
         self.logger.debug(f"Inserindo objetos Chunk no banco de dados: {self.db_path}")
         inserted_ids: List[int] = []
-        for chunk in chunks:
+        metadata_json = [json.dumps(chunk.metadata) for chunk in chunks]
+        try:
+            encode = self.chunk_compressor.get_encoder(conn, [chunk.content for chunk in chunks] + metadata_json)
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao carregar a configuracao de compressao: {e}")
+            raise e
+
+        for chunk, metadata in zip(chunks, metadata_json):
 
             try:
                     cursor = conn.cursor()
                     cursor.execute(
-                        "INSERT INTO chunks (document_id, content, metadata) VALUES (?, ?, ?)", 
-                        (file_id, chunk.content, json.dumps(chunk.metadata))
+                        "INSERT INTO chunks (document_id, content, content_hash, metadata) VALUES (?, ?, ?, ?)", 
+                        (file_id, encode(chunk.content), Chunk.hash_content(chunk.content), encode(metadata))
                     )
                     chunk.id = cursor.lastrowid
                     inserted_ids.append(chunk.id)
@@ -230,6 +352,16 @@ class SQLiteManager:
             except sqlite3.Error as e:
                 self.logger.error(f"Erro ao inserir chunks: {e}")
                 raise e
+
+        try:
+            # Índice lexical, com o texto puro (o content pode estar comprimido); ver schema.sql
+            conn.executemany(
+                "INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)",
+                [(chunk.id, chunk.content) for chunk in chunks],
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao indexar chunks na busca lexical: {e}")
+            raise e
             
         self.logger.info(f"{len(inserted_ids)} Chunks inseridos com sucesso") 
         return inserted_ids
@@ -252,35 +384,14 @@ class SQLiteManager:
             # Se um file_id for fornecido, recupera todos os chunks associados ao documento
             if file_id:
                 self.logger.info(f"Recuperando chunks do documento: {file_id} no banco de dados: {self.db_path}")
-                cursor.execute("SELECT * FROM chunks WHERE document_id = ?", (file_id,))
-            elif chunk_ids: 
+                cursor.execute(f"SELECT {_CHUNK_COLUMNS} FROM chunks WHERE document_id = ?", (file_id,))
+                chunks = [self._chunk_from_row(conn, row) for row in cursor.fetchall()]
+            elif chunk_ids:
                 # Se ids forem fornecidos, recupera os chunks associados a eles
                 self.logger.info(f"Recuperando chunks do banco de dados: {self.db_path}")
-                order_cases = " ".join([f"WHEN {index} THEN {i}" for i, index in enumerate(chunk_ids)])
-                placeholders = ", ".join(['?'] * len(chunk_ids))
-                query = f"""
-                    SELECT * 
-                    FROM chunks 
-                    WHERE id IN ({placeholders})
-                    ORDER BY CASE id
-                        {order_cases}
-                    END
-                """
-                cursor.execute(query, chunk_ids)
-
-            # Cria objetos Chunk
-            chunks : List[Chunk] = []
-            chunk_data = cursor.fetchall()
-            if chunk_data:
-                for row in chunk_data:
-                    chunk = Chunk(
-                        id=row[0],
-                        document_id=row[1],
-                        content=row[2],
-                        metadata=json.loads(row[3]), 
-                        created_at=row[4]
-                    )
-                    chunks.append(chunk)
+                chunks = self._get_chunks_by_ids(conn, cursor, chunk_ids)
+            else:
+                chunks = []
 
             self.logger.info(f"Chunks recuperados com sucesso")
             return chunks
@@ -289,6 +400,185 @@ class SQLiteManager:
             self.logger.error(f"Erro ao recuperar os chunks: {e}")
             raise e
 
+    def _get_chunks_by_ids(self, conn: sqlite3.Connection, cursor: sqlite3.Cursor, chunk_ids: List[int]) -> List[Chunk]:
+        """
+        Recupera os chunks pelos ids, preservando a ordem (da primeira ocorrência) de chunk_ids.
+
+        Os ids são consultados em lotes de aridade fixa (_CHUNK_FETCH_BUCKETS), completados com NULL,
+        de forma que o texto SQL se repita entre chamadas e o cache de statements do sqlite3 seja reaproveitado.
+        A reordenação é feita em Python, pelo id.
+        """
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        rows_by_id: Dict[int, tuple] = {}
+
+        for bucket, params in _fixed_arity_batches(unique_ids):
+            cursor.execute(_CHUNKS_BY_IDS_SQL[bucket], params)
+            for row in cursor.fetchall():
+                rows_by_id[row[0]] = row
+
+        return [self._chunk_from_row(conn, rows_by_id[chunk_id]) for chunk_id in unique_ids if chunk_id in rows_by_id]
+
+    def _chunk_from_row(self, conn: sqlite3.Connection, row: tuple) -> Chunk:
+        """Cria o Chunk a partir da linha, descomprimindo content e metadata quando armazenados como BLOB."""
+        if isinstance(row[2], bytes) or isinstance(row[3], bytes):
+            decode = self.chunk_compressor.decode
+            row = (row[0], row[1], decode(conn, row[2]), decode(conn, row[3]), row[4])
+        return Chunk.from_row(row)
+
+    def set_compression(self, conn: sqlite3.Connection, mode: str) -> None:
+        """
+        Define o modo de compressão ("none", "zlib" ou "zstd") dos chunks inseridos a partir de agora no banco do domínio.
+        Chunks já armazenados continuam legíveis, independentemente do modo com que foram gravados.
+        """
+        self.logger.info(f"Definindo compressao '{mode}' para o banco de dados: {self.db_path}")
+        try:
+            self.chunk_compressor.set_mode(conn, mode)
+            conn.commit()
+
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao definir a compressao do banco de dados: {e}")
+            raise e
+
+    def get_storage_stats(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de armazenamento dos chunks do banco do domínio (ver ChunkCompressor.get_stats).
+        """
+        self.logger.debug(f"Calculando estatisticas de armazenamento do banco de dados: {self.db_path}")
+        try:
+            return self.chunk_compressor.get_stats(conn)
+
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao calcular estatisticas de armazenamento: {e}")
+            raise e
+
+    @staticmethod
+    def _fts_term_key(term: str) -> str:
+        """Termo em minúsculas, sem acentos e sem pontuação nas bordas, para comparação com _FTS_STOPWORDS."""
+        term = unicodedata.normalize("NFKD", term.lower())
+        return "".join(char for char in term if not unicodedata.combining(char)).strip(".,;:!?()[]{}\"'")
+
+    def search_chunks_fts(self, conn: sqlite3.Connection, query: str, k: int) -> List[int]:
+        """
+        Busca lexical (BM25) nos chunks do banco do domínio, via tabela FTS5 chunks_fts.
+
+        Cada termo da query é buscado como frase (ex.: "AB-1234" casa os tokens AB e 1234 em sequência) e os termos
+        são combinados com OR, de forma que códigos, siglas e números exatos sejam encontrados mesmo em perguntas longas.
+        Palavras funcionais (_FTS_STOPWORDS) são descartadas.
+
+        Args:
+            conn: Conexão com o banco de dados SQLite.
+            query: Texto da query.
+            k: Número máximo de chunks a retornar.
+
+        Returns:
+            List[int]: Ids dos chunks, do mais para o menos relevante.
+        """
+        terms = [
+            '"' + term.replace('"', '""') + '"' for term in query.split()
+            if re.search(r"\w", term) and self._fts_term_key(term) not in _FTS_STOPWORDS
+        ]
+        if not terms:
+            return []
+
+        self.logger.debug(f"Buscando chunks por BM25 no banco de dados: {self.db_path}", terms=len(terms), top_k=k)
+        try:
+            cursor = conn.execute(
+                "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+                (" OR ".join(terms), k)
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro na busca lexical de chunks: {e}")
+            raise e
+
+    def get_existing_content_hashes(self, conn: sqlite3.Connection, content_hashes: Iterable[bytes]) -> Set[bytes]:
+        """
+        Retorna quais dos hashes fornecidos (ver Chunk.hash_content) já pertencem a chunks do banco de dados.
+        A busca usa o índice UNIQUE de content_hash, permitindo descartar chunks duplicados antes de gerar embeddings.
+
+        Args:
+            conn: Conexão com o banco de dados SQLite.
+            content_hashes: Hashes a serem verificados.
+
+        Returns:
+            Set[bytes]: Subconjunto de content_hashes já presente no banco.
+        """
+        unique_hashes = list(dict.fromkeys(content_hashes))
+        self.logger.debug(f"Verificando {len(unique_hashes)} hashes de chunks no banco de dados: {self.db_path}")
+        try:
+            cursor = conn.cursor()
+            existing: Set[bytes] = set()
+            for bucket, params in _fixed_arity_batches(unique_hashes):
+                cursor.execute(_CHUNK_HASHES_SQL[bucket], params)
+                existing.update(row[0] for row in cursor.fetchall())
+            return existing
+
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao verificar hashes de chunks: {e}")
+            raise e
+
+    def get_domain_centroid(self, conn: sqlite3.Connection) -> Optional[Tuple[str, np.ndarray, int]]:
+        """
+        Retorna o acumulado dos embeddings dos chunks do domínio: (modelo de embeddings, soma float64, número de chunks),
+        ou None se o domínio ainda não tiver o acumulado.
+        """
+        try:
+            row = conn.execute("SELECT embeddings_model, embedding_sum, chunk_count FROM domain_centroid WHERE id = 1").fetchone()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao recuperar o centroide do dominio: {e}")
+            raise e
+
+        if row is None:
+            return None
+        return row[0], np.frombuffer(row[1], dtype=np.float64), row[2]
+
+    def add_to_domain_centroid(self, conn: sqlite3.Connection, embeddings_model: str, embedding_sum: np.ndarray, count: int) -> None:
+        """
+        Soma embedding_sum/count ao acumulado dos embeddings do domínio. Se o acumulado existente for de outro
+        modelo de embeddings, ele é substituído. Não faz commit: deve rodar na transação que insere os chunks.
+        """
+        current = self.get_domain_centroid(conn)
+        embedding_sum = np.asarray(embedding_sum, dtype=np.float64)
+        if current is not None and current[0] == embeddings_model and current[1].shape == embedding_sum.shape:
+            embedding_sum = current[1] + embedding_sum
+            count += current[2]
+
+        self.logger.debug(f"Atualizando centroide do dominio no banco de dados: {self.db_path}", chunk_count=count)
+        try:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO domain_centroid (id, embeddings_model, embedding_sum, chunk_count, updated_at)
+                VALUES (1, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (embeddings_model, embedding_sum.tobytes(), count)
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao atualizar o centroide do dominio: {e}")
+            raise e
+
+    def remove_from_domain_centroid(self, conn: sqlite3.Connection, embedding_sum: np.ndarray, count: int) -> None:
+        """
+        Desconta embedding_sum/count do acumulado dos embeddings do domínio (chunks removidos). Não faz commit:
+        deve rodar na transação que remove os chunks.
+        """
+        current = self.get_domain_centroid(conn)
+        embedding_sum = np.asarray(embedding_sum, dtype=np.float64)
+        if current is None or not count or current[1].shape != embedding_sum.shape:
+            return
+
+        remaining = max(0, current[2] - count)
+        remaining_sum = current[1] - embedding_sum if remaining else np.zeros_like(embedding_sum)
+        self.logger.debug(f"Descontando chunks do centroide do dominio no banco de dados: {self.db_path}", chunk_count=remaining)
+        try:
+            conn.execute(
+                "UPDATE domain_centroid SET embedding_sum = ?, chunk_count = ?, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
+                (remaining_sum.tobytes(), remaining)
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao atualizar o centroide do dominio: {e}")
+            raise e
+
     def insert_domain(self, domain: Domain, conn: sqlite3.Connection) -> None:
         """
         Insere um domínio de conhecimento no banco de dados de controle.
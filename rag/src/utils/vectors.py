@@ -0,0 +1,8 @@
+import numpy as np
+
+
+def unit_vector(vector: np.ndarray) -> np.ndarray:
+    """Vetor achatado em float32 e normalizado para norma 1; o vetor nulo é devolvido sem alteração."""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
@@ -0,0 +1,32 @@
+-- Substitui a restrição UNIQUE sobre o texto completo de chunks.content por uma coluna content_hash.
+-- O SQLite não remove restrições com ALTER TABLE, então a tabela é recriada preservando os ids
+-- (que também são os ids do índice FAISS) e o contador do AUTOINCREMENT.
+-- Requer a função chunk_content_hash registrada na conexão (SQLiteManager._apply_domain_migrations).
+
+CREATE TEMP TABLE chunks_seq_backup AS SELECT seq FROM sqlite_sequence WHERE name = 'chunks';
+
+CREATE TABLE chunks_migration (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    content_hash BLOB NOT NULL UNIQUE,
+    metadata TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (document_id) REFERENCES document_files(id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+);
+
+INSERT INTO chunks_migration (id, document_id, content, content_hash, metadata, created_at)
+    SELECT id, document_id, content, chunk_content_hash(content), metadata, created_at FROM chunks;
+
+DROP TABLE chunks;
+ALTER TABLE chunks_migration RENAME TO chunks;
+
+INSERT INTO sqlite_sequence (name, seq)
+    SELECT 'chunks', seq FROM chunks_seq_backup
+    WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'chunks');
+UPDATE sqlite_sequence SET seq = (SELECT seq FROM chunks_seq_backup)
+    WHERE name = 'chunks' AND seq < (SELECT seq FROM chunks_seq_backup);
+
+DROP TABLE chunks_seq_backup;
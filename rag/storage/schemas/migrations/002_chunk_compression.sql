@@ -0,0 +1,12 @@
+-- Compressão opcional de chunks por domínio (ver ChunkCompressor).
+-- content e metadata passam a aceitar BLOBs comprimidos; a afinidade TEXT das colunas não converte BLOBs.
+CREATE TABLE IF NOT EXISTS storage_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS compression_dictionaries (
+    id INTEGER PRIMARY KEY, -- dict_id do dicionário zstd
+    data BLOB NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
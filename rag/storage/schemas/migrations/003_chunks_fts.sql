@@ -0,0 +1,30 @@
+-- Índice lexical (FTS5/BM25) dos chunks, usado na recuperação híbrida (QueryConfig.retrieval_strategy).
+-- A tabela é contentless: guarda apenas o índice invertido, já que o texto pode estar comprimido em chunks.
+-- Requer a função chunk_text registrada na conexão (SQLiteManager._register_domain_functions).
+-- Os triggers criados aqui são removidos pela migração 005: o índice passa a ser mantido pelo SQLiteManager.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+INSERT INTO chunks_fts (rowid, content) SELECT id, chunk_text(content) FROM chunks;
+
+DROP TRIGGER IF EXISTS chunks_fts_insert;
+
+CREATE TRIGGER chunks_fts_insert
+    AFTER INSERT ON chunks
+    FOR EACH ROW
+    BEGIN
+        INSERT INTO chunks_fts (rowid, content) VALUES (NEW.id, chunk_text(NEW.content));
+    END;
+
+DROP TRIGGER IF EXISTS chunks_fts_delete;
+
+CREATE TRIGGER chunks_fts_delete
+    AFTER DELETE ON chunks
+    FOR EACH ROW
+    BEGIN
+        INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', OLD.id, chunk_text(OLD.content));
+    END;
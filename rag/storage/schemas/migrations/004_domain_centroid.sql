@@ -0,0 +1,10 @@
+-- Centroide dos embeddings dos chunks do domínio, usado pelo roteamento de domínios (DomainRouter).
+-- Guarda a soma dos embeddings e a contagem, atualizadas a cada arquivo ingerido.
+-- Bancos existentes recebem a soma a partir do índice FAISS na próxima ingestão.
+CREATE TABLE IF NOT EXISTS domain_centroid (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    embeddings_model TEXT NOT NULL,
+    embedding_sum BLOB NOT NULL, -- float64, dimensão do modelo
+    chunk_count INTEGER NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,5 @@
+-- Remove os triggers que mantinham o índice lexical (chunks_fts) com a função chunk_text, registrada apenas nas
+-- conexões abertas pelo SQLiteManager: em qualquer outra conexão, todo INSERT/DELETE em chunks falhava com
+-- "no such function". O índice passa a ser mantido pelo SQLiteManager (insert_chunks e delete_document_file).
+DROP TRIGGER IF EXISTS chunks_fts_insert;
+DROP TRIGGER IF EXISTS chunks_fts_delete;
@@ -20,14 +20,49 @@ CREATE TABLE IF NOT EXISTS document_files (
 CREATE TABLE IF NOT EXISTS chunks (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     document_id INTEGER NOT NULL,
-    content TEXT NOT NULL UNIQUE,
-    metadata TEXT NOT NULL,  -- JSON string containing page_list, index_list, keywords, filename
+    content TEXT NOT NULL, -- texto puro ou BLOB comprimido (ver ChunkCompressor)
+    content_hash BLOB NOT NULL UNIQUE, -- blake2b (16 bytes) do content; ver Chunk.hash_content
+    metadata TEXT NOT NULL,  -- JSON string containing page_list, index_list, keywords, filename (ou BLOB comprimido)
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (document_id) REFERENCES document_files(id)
         ON DELETE CASCADE
         ON UPDATE CASCADE
 );
 
+-- Índice lexical (FTS5/BM25) dos chunks. Contentless: o texto fica apenas em chunks (possivelmente comprimido).
+-- Mantido pelo SQLiteManager (insert_chunks e delete_document_file), e não por triggers: o texto comprimido só
+-- pode ser lido em Python, e triggers com funções registradas na conexão quebrariam INSERT/DELETE em chunks feitos
+-- por outras conexões (CLI do sqlite3, navegadores de banco, scripts de manutenção). Chunks inseridos por outras
+-- conexões não entram na busca lexical; chunks removidos por elas deixam entradas órfãs no índice, ignoradas na
+-- leitura dos chunks (os ids do AUTOINCREMENT nunca são reutilizados)
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Centroide dos embeddings dos chunks (soma e contagem), usado pelo roteamento de domínios
+CREATE TABLE IF NOT EXISTS domain_centroid (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    embeddings_model TEXT NOT NULL,
+    embedding_sum BLOB NOT NULL, -- float64, dimensão do modelo
+    chunk_count INTEGER NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Configurações de armazenamento do domínio (ex.: key = 'compression')
+CREATE TABLE IF NOT EXISTS storage_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- Dicionários zstd treinados para o domínio
+CREATE TABLE IF NOT EXISTS compression_dictionaries (
+    id INTEGER PRIMARY KEY, -- dict_id do dicionário zstd
+    data BLOB NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
 DROP TRIGGER IF EXISTS update_document_file_updated_at;
 
 CREATE TRIGGER update_document_file_updated_at
@@ -36,3 +71,6 @@ CREATE TRIGGER update_document_file_updated_at
     BEGIN
         UPDATE document_files SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
     END;
+
+-- Versão do schema. Bancos com versão anterior são atualizados pelos scripts em schemas/migrations
+PRAGMA user_version = 5;
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+import threading
+
+# Os módulos do agente importam "model" e "module" a partir de agent/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../agent')))
+import module.nlu_cache as nlu_cache_module
+from module.nlu_cache import NLUCache
+
+
+def test_cache_persists_entries(tmp_path):
+    """As entradas gravadas no fechamento são carregadas por um novo cache no mesmo arquivo."""
+    path = str(tmp_path / "nlu_cache.json")
+    cache = NLUCache(path=path)
+    cache.put("Olá!", "", {"intents": ["greeting"]})
+    cache.close()
+
+    restored = NLUCache(path=path)
+    assert restored.get("ola!") == {"intents": ["greeting"]}
+    assert restored.get("ola") is None
+
+
+def test_save_does_not_hold_the_entries_lock(tmp_path, monkeypatch):
+    """A escrita do arquivo não bloqueia get e put de outras threads."""
+    cache = NLUCache(path=str(tmp_path / "nlu_cache.json"), save_interval_seconds=0)
+    writing = threading.Event()
+    release = threading.Event()
+    original_dump = json.dump
+
+    def slow_dump(*args, **kwargs):
+        writing.set()
+        release.wait(5)
+        original_dump(*args, **kwargs)
+
+    monkeypatch.setattr(nlu_cache_module.json, "dump", slow_dump)
+    writer = threading.Thread(target=cache.put, args=("saldo", "", {"intents": ["question"]}))
+    writer.start()
+    assert writing.wait(5)
+
+    # Durante a gravação, as entradas continuam acessíveis, e um put concorrente não espera pela escrita
+    assert cache.get("saldo") == {"intents": ["question"]}
+    put = threading.Thread(target=cache.put, args=("pix", "", {"intents": ["question"]}))
+    put.start()
+    put.join(1)
+    assert not put.is_alive()
+
+    release.set()
+    writer.join(5)
+    # A entrada inserida durante a gravação fica pendente e é gravada no fechamento
+    cache.close()
+    with open(cache.path, encoding="utf-8") as f:
+        assert sorted(entry["text"] for entry in json.load(f)) == ["pix", "saldo"]
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# agent/ vem antes de rag/ no sys.path: os dois têm um main.py, e server.py importa o do agente
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../agent')))
+from server import AgentServer
+
+
+class _StubAgent:
+    """Agent mínimo: responde com o texto recebido, esperando `delay` segundos ou até `release` ser sinalizado."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.release = threading.Event()
+        self.release.set()
+        self.sessions = SimpleNamespace(stats=lambda: {"sessions": 1}, close=lambda: None)
+        self.nlu_cache = SimpleNamespace(stats=lambda: {"hits": 0, "misses": 0, "entries": 0}, close=lambda: None)
+        self.fast_nlu = None
+        self.km = MagicMock()
+        self.km.rag_interface.latency_metrics_prometheus.return_value = ""
+
+    def chat(self, user, text):
+        self.release.wait(5)
+        time.sleep(self.delay)
+        return [f"{user}: {text}"]
+
+    def chat_stream(self, user, text):
+        time.sleep(self.delay)
+        yield {"type": "delta", "index": 0, "text": text[:2]}
+        yield {"type": "response", "index": 0, "text": text}
+
+
+async def _request(app, method, path, body=None, headers=()):
+    """Executa uma requisição na aplicação ASGI e retorna (status, headers, corpo)."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.sleep(3600)
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "client": ("127.0.0.1", 1234),
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def _server(agent, **kwargs) -> AgentServer:
+    return AgentServer(lambda: agent, **kwargs)
+
+
+def test_chat_and_metrics():
+    """Turnos respondidos em JSON e contadores de /metrics atualizados."""
+    async def scenario():
+        app = _server(_StubAgent(), workers=2)
+        await app.startup()
+        status, _, body = await _request(app, "POST", "/chat", {"message": "oi", "session_id": "u1"})
+        assert status == 200
+        assert json.loads(body) == {"responses": ["u1: oi"]}
+        assert (await _request(app, "POST", "/chat", {"message": ""}))[0] == 400
+
+        status, _, body = await _request(app, "GET", "/metrics")
+        app.shutdown()
+        return status, body.decode()
+
+    status, text = asyncio.run(scenario())
+    assert status == 200
+    assert 'agent_requests_total{route="/chat",status="200"} 1' in text
+    assert 'agent_requests_total{route="/chat",status="400"} 1' in text
+    assert "agent_in_flight 0" in text
+    assert "agent_sessions_sessions 1" in text
+    assert 'agent_latency_seconds_count{stage="chat"} 1' in text
+
+
+def test_rejects_when_queue_is_full():
+    """Com todos os workers ocupados e a fila cheia, a requisição recebe 503 com Retry-After."""
+    async def scenario():
+        agent = _StubAgent()
+        agent.release.clear()
+        app = _server(agent, workers=1, max_queue=0)
+        await app.startup()
+        first = asyncio.ensure_future(_request(app, "POST", "/chat", {"message": "um"}))
+        while app.in_flight == 0:
+            await asyncio.sleep(0.01)
+
+        rejected = await _request(app, "POST", "/chat", {"message": "dois"})
+        agent.release.set()
+        accepted = await first
+        metrics = (await _request(app, "GET", "/metrics"))[2].decode()
+        app.shutdown()
+        return rejected, accepted, metrics
+
+    (status, headers, _), accepted, metrics = asyncio.run(scenario())
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+    assert accepted[0] == 200
+    assert 'agent_rejected_total{reason="queue_full"} 1' in metrics
+    assert 'agent_requests_total{route="/chat",status="503"} 1' in metrics
+
+
+def test_request_timeout():
+    """Turnos acima de request_timeout_seconds recebem 504; em streaming, um evento "error"."""
+    async def scenario():
+        app = _server(_StubAgent(delay=0.3), workers=2, request_timeout_seconds=0.1)
+        await app.startup()
+        plain = await _request(app, "POST", "/chat", {"message": "oi"})
+        stream = await _request(app, "POST", "/chat", {"message": "oi", "stream": True})
+        # O worker do turno expirado só é liberado quando o turno termina
+        while app.in_flight:
+            await asyncio.sleep(0.05)
+        app.shutdown()
+        return plain, stream, app.timeouts
+
+    plain, stream, timeouts = asyncio.run(scenario())
+    assert plain[0] == 504
+    assert stream[0] == 200
+    assert stream[2].decode().startswith('event: error\ndata: {"type": "error", "error": "Tempo limite excedido"}\n\n')
+    assert timeouts == 2
+
+
+def test_stream_events():
+    """Eventos do turno em streaming no formato SSE, terminados pelo evento "done"."""
+    async def scenario():
+        app = _server(_StubAgent(), workers=2)
+        await app.startup()
+        response = await _request(app, "POST", "/chat", {"message": "olá"}, headers=[("accept", "text/event-stream")])
+        app.shutdown()
+        return response
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200
+    assert headers[b"content-type"] == b"text/event-stream"
+    assert body.decode() == (
+        'event: delta\ndata: {"type": "delta", "index": 0, "text": "ol"}\n\n'
+        'event: response\ndata: {"type": "response", "index": 0, "text": "olá"}\n\n'
+        'event: done\ndata: {}\n\n'
+    )
+
+
+def test_quick_replies_are_served_from_the_classifier_source():
+    """O front-end recebe o mesmo arquivo de respostas rápidas reconhecidas pelo classificador local."""
+    from module.fast_nlu import QUICK_REPLIES
+
+    async def scenario():
+        app = _server(_StubAgent())
+        return await _request(app, "GET", "/static/quick_replies.json")
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"application/json")
+    data = json.loads(body)
+    served = data["initial"] + data["default"] + [reply for rule in data["follow_up"] for reply in rule["replies"]]
+    assert sorted(served) == sorted(QUICK_REPLIES)
@@ -0,0 +1,116 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+# Os módulos do agente importam "model" e "module" a partir de agent/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../agent')))
+from model.intent import Intent
+from model.semantic_document import SemanticDocument
+from model.state import State
+from module.bt import BeliefTracker
+from module.session_store import SessionStore
+
+
+def _document(*operations):
+    return SemanticDocument(
+        intents=[Intent.QUESTION] * len(operations), operations=list(operations),
+        questions=[f"pergunta {operation}" for operation in operations],
+        entities=[], sentiment="", domain="", dependent=False, out_of_context=False,
+    )
+
+
+def test_session_expires_after_ttl():
+    """Sessões ociosas além de ttl_seconds são descartadas, e o próximo acesso começa um diálogo novo."""
+    store = SessionStore(ttl_seconds=0.05)
+    with store.session("u1") as tracker:
+        tracker.update_state(_document("saldo"))
+    assert store.stats()["states"] == 1
+
+    time.sleep(0.1)
+    store.sweep()
+
+    assert store.stats()["sessions"] == 0
+    assert store.stats()["expired"] == 1
+    assert len(store.get("u1")) == 0
+
+
+def test_lru_eviction_skips_active_sessions():
+    """Acima de max_sessions, a sessão ociosa usada há mais tempo é removida; sessões com turno em andamento ficam."""
+    store = SessionStore(max_sessions=2)
+    with store.session("ativo") as active_tracker:
+        with store.session("b") as tracker_b:
+            pass
+        with store.session("c") as tracker_c:
+            pass
+
+        # "ativo" é a sessão mais antiga, mas tem um turno em andamento: "b" é removida no lugar dela
+        assert store.stats()["evicted"] == 1
+        assert store.get("ativo") is active_tracker
+        assert store.get("c") is tracker_c
+    assert store.get("b") is not tracker_b
+
+
+def test_turns_of_the_same_user_are_serialized():
+    """Turnos concorrentes do mesmo usuário não se sobrepõem; usuários diferentes são atendidos em paralelo."""
+    store = SessionStore()
+    intervals = {}
+
+    def turn(name, user):
+        with store.session(user):
+            start = time.perf_counter()
+            time.sleep(0.1)
+            intervals[name] = (start, time.perf_counter())
+
+    threads = [threading.Thread(target=turn, args=args) for args in (("a1", "a"), ("a2", "a"), ("b1", "b"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first, second = sorted([intervals["a1"], intervals["a2"]])
+    assert second[0] >= first[1]
+    assert intervals["b1"][0] < max(first[1], second[1]) and intervals["b1"][1] > min(first[0], second[0])
+
+
+def test_persist_and_restore_round_trip(tmp_path):
+    """Sessões removidas pelo limite de memória ou abertas no fechamento são restauradas do banco, inclusive no formato antigo (deque)."""
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(max_sessions=1, path=path)
+    with store.session("a") as tracker_a:
+        tracker_a.update_state(_document("saldo", "pix"))
+        expected = [(state.operation, state.current) for state in tracker_a.context]
+    with store.session("b") as tracker:
+        tracker.update_state(_document("boleto"))
+
+    # "a" foi serializada ao ser removida pelo limite e volta com o mesmo contexto
+    assert store.stats()["evicted"] == 1
+    restored = store.get("a")
+    assert restored is not tracker_a
+    assert [(state.operation, state.current) for state in restored.context] == expected
+    assert store.stats()["restored"] == 1
+    store.close()
+
+    # Sessão serializada antes do contexto indexado: o contexto era uma deque em "context"
+    legacy = BeliefTracker.__new__(BeliefTracker)
+    legacy.__dict__ = {"user": "antigo", "context": deque([
+        State(Intent.QUESTION, "saldo", "qual o saldo?", current=False),
+        State(Intent.QUESTION, "pix", "e o pix?", current=True),
+    ])}
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO sessions (user, tracker, updated_at) VALUES (?, ?, ?)", ("antigo", pickle.dumps(legacy), time.time()))
+    conn.close()
+
+    store = SessionStore(path=path)
+    # "a" foi serializada no fechamento do primeiro gerenciador
+    assert [(state.operation, state.current) for state in store.get("a").context] == expected
+    tracker = store.get("antigo")
+    assert len(tracker) == 2
+    assert [state.operation for state in tracker.context] == ["saldo", "pix"]
+    tracker.reset(Intent.QUESTION, "pix")
+    assert [state.operation for state in tracker.context] == ["saldo"]
+    assert store.stats()["restored"] == 2
+    store.close()
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.query_processing.answer_cache import SemanticAnswerCache
+
+
+def _vector(*values):
+    return np.array([values], dtype=np.float32)
+
+
+class TestSemanticAnswerCache:
+    """Suite de testes para o cache semântico de respostas."""
+
+    @pytest.fixture
+    def cache(self):
+        return SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+
+    def _store(self, cache, embedding, answer, scope=(), generations=None):
+        cache.store(embedding, scope, generations or {1: (1, "t1")}, {"answer": answer, "context_chunks": [], "domains": ["d"]})
+
+    def test_hit_above_threshold(self, cache):
+        """Perguntas quase iguais reutilizam a resposta; perguntas diferentes não."""
+        self._store(cache, _vector(1.0, 0.0, 0.0), "resposta")
+
+        hit = cache.lookup(_vector(0.99, 0.05, 0.0), (), {1: (1, "t1")})
+        assert hit["answer"] == "resposta"
+        assert hit["similarity"] >= 0.95
+
+        assert cache.lookup(_vector(0.5, 0.5, 0.0), (), {1: (1, "t1")}) is None
+
+    def test_scope_must_match(self, cache):
+        """Uma resposta da seleção automática não atende uma consulta com domínios informados."""
+        self._store(cache, _vector(1.0, 0.0), "automatica")
+        self._store(cache, _vector(1.0, 0.0), "dominio a", scope=("a",))
+
+        assert cache.lookup(_vector(1.0, 0.0), ("a",), {1: (1, "t1")})["answer"] == "dominio a"
+        assert cache.lookup(_vector(1.0, 0.0), (), {1: (1, "t1")})["answer"] == "automatica"
+        assert cache.lookup(_vector(1.0, 0.0), ("b",), {1: (1, "t1")}) is None
+
+    def test_reingested_domain_invalidates(self, cache):
+        """Uma nova geração do domínio (reingestão) ou a sua remoção invalida as entradas."""
+        self._store(cache, _vector(1.0, 0.0), "antiga")
+
+        assert cache.lookup(_vector(1.0, 0.0), (), {1: (2, "t2")}) is None
+        assert len(cache) == 0
+
+        self._store(cache, _vector(1.0, 0.0), "nova", generations={1: (2, "t2")})
+        assert cache.lookup(_vector(1.0, 0.0), (), {}) is None
+
+    def test_ttl(self, cache, monkeypatch):
+        """Entradas expiradas não são servidas."""
+        now = [1000.0]
+        monkeypatch.setattr("src.query_processing.answer_cache.time.monotonic", lambda: now[0])
+        self._store(cache, _vector(1.0, 0.0), "resposta")
+
+        now[0] += 30
+        assert cache.lookup(_vector(1.0, 0.0), (), {1: (1, "t1")}) is not None
+        now[0] += 31
+        assert cache.lookup(_vector(1.0, 0.0), (), {1: (1, "t1")}) is None
+        assert len(cache) == 0
+
+    def test_max_entries_evicts_least_recently_used(self, cache):
+        cache.configure(threshold=0.95, ttl_seconds=60, max_entries=2)
+        generations = {1: (1, "t1")}
+        self._store(cache, _vector(1.0, 0.0, 0.0), "primeira")
+        self._store(cache, _vector(0.0, 1.0, 0.0), "segunda")
+        # Acesso à primeira: a segunda passa a ser a menos usada recentemente
+        assert cache.lookup(_vector(1.0, 0.0, 0.0), (), generations) is not None
+
+        self._store(cache, _vector(0.0, 0.0, 1.0), "terceira")
+
+        assert len(cache) == 2
+        assert cache.lookup(_vector(0.0, 1.0, 0.0), (), generations) is None
+        assert cache.lookup(_vector(1.0, 0.0, 0.0), (), generations)["answer"] == "primeira"
+        assert cache.lookup(_vector(0.0, 0.0, 1.0), (), generations)["answer"] == "terceira"
+
+    def test_dimension_change_resets(self, cache):
+        """Embeddings de outra dimensão (troca de modelo) não são comparados com as entradas antigas."""
+        self._store(cache, _vector(1.0, 0.0), "2d")
+
+        assert cache.lookup(_vector(1.0, 0.0, 0.0), (), {1: (1, "t1")}) is None
+
+        self._store(cache, _vector(1.0, 0.0, 0.0), "3d")
+        assert len(cache) == 1
+        assert cache.lookup(_vector(1.0, 0.0, 0.0), (), {1: (1, "t1")})["answer"] == "3d"
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.models import Chunk
+from src.query_processing.context_packer import ContextCandidate, ContextPacker
+
+
+def _candidate(chunk_id, content, score, embedding=None, space="m"):
+    chunk = Chunk(id=chunk_id, document_id=1, content=content, metadata={})
+    return ContextCandidate(chunk, score, None if embedding is None else np.array(embedding, dtype=np.float32), space)
+
+
+class TestContextPacker:
+    """Suite de testes para o empacotamento do contexto do prompt."""
+
+    @pytest.fixture
+    def packer(self):
+        return ContextPacker()
+
+    def test_orders_by_score_and_drops_identical_content(self, packer):
+        """Conteúdos idênticos de domínios diferentes entram uma vez; a ordem é a do score."""
+        candidates = [
+            _candidate(1, "a" * 40, 0.5),
+            _candidate(2, "b" * 40, 0.9),
+            _candidate(3, "a" * 40, 0.7),
+        ]
+
+        chunks, stats = packer.pack(candidates, max_tokens=1000)
+
+        assert [chunk.id for chunk in chunks] == [2, 3]
+        assert stats["context_duplicates_dropped"] == 1
+        assert stats["context_tokens"] == 20
+        assert stats["context_tokens_saved"] == 10
+
+    def test_near_duplicates_only_within_the_same_space(self, packer):
+        """Vetores quase iguais do mesmo modelo são duplicados; de modelos diferentes, não são comparados."""
+        candidates = [
+            _candidate(1, "primeiro", 0.9, [1.0, 0.0]),
+            _candidate(2, "quase igual", 0.8, [0.99, 0.05]),
+            _candidate(3, "outro modelo", 0.7, [0.99, 0.05], space="outro"),
+            _candidate(4, "diferente", 0.6, [0.0, 1.0]),
+        ]
+
+        chunks, stats = packer.pack(candidates, max_tokens=1000, dedup_threshold=0.95)
+
+        assert [chunk.id for chunk in chunks] == [1, 3, 4]
+        assert stats["context_duplicates_dropped"] == 1
+
+    def test_token_budget(self, packer):
+        """Chunks que não cabem no orçamento são pulados; chunks menores seguintes ainda entram."""
+        candidates = [
+            _candidate(1, "a" * 40, 0.9),
+            _candidate(2, "b" * 80, 0.8),
+            _candidate(3, "c" * 20, 0.7),
+        ]
+
+        chunks, stats = packer.pack(candidates, max_tokens=20)
+
+        assert [chunk.id for chunk in chunks] == [1, 3]
+        assert stats["context_over_budget_dropped"] == 1
+        assert stats["context_tokens"] == 15
+        assert stats["context_tokens_input"] == 35
+
+    def test_truncates_when_nothing_fits(self, packer):
+        chunks, stats = packer.pack([_candidate(1, "a" * 100, 0.9)], max_tokens=5)
+
+        assert chunks[0].content == "a" * 20
+        assert stats["context_tokens"] == 5
+
+    def test_mmr_prefers_diverse_chunks(self, packer):
+        """Com MMR, um chunk menos relevante e diferente passa à frente de um redundante."""
+        candidates = [
+            _candidate(1, "primeiro", 0.9, [1.0, 0.0, 0.0]),
+            _candidate(2, "redundante", 0.85, [0.9, 0.43, 0.0]),
+            _candidate(3, "diverso", 0.6, [0.0, 0.0, 1.0]),
+        ]
+
+        chunks, _ = packer.pack(candidates, max_tokens=1000, mmr_lambda=0.5)
+        assert [chunk.id for chunk in chunks] == [1, 3, 2]
+
+        chunks, _ = packer.pack(candidates, max_tokens=1000)
+        assert [chunk.id for chunk in chunks] == [1, 2, 3]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from src.query_processing.domain_router import DomainRouter
+from src.utils import SQLiteManager
+from src.models import Domain, DomainConfig
+from src.config.models import SystemConfig
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+VOCABULARY = ["futebol", "gol", "receita", "bolo", "contrato", "clausula"]
+
+
+def bag_of_words_embed(model_name, texts):
+    """Embedding determinístico para os testes: contagem das palavras do vocabulário."""
+    vectors = np.zeros((len(texts), len(VOCABULARY)), dtype=np.float32)
+    for i, text in enumerate(texts):
+        words = DomainRouter._normalize_text(text).split()
+        for j, term in enumerate(VOCABULARY):
+            vectors[i, j] = words.count(term)
+    return vectors + 1e-3
+
+
+class TestDomainRouter:
+    """Suite de testes para o roteamento de domínios por embeddings."""
+
+    @pytest.fixture
+    def sqlite_manager(self, tmp_path):
+        return SQLiteManager(SystemConfig(storage_base_path=str(tmp_path)))
+
+    def _domain(self, sqlite_manager, tmp_path, id, name, description, keywords, centroid_texts):
+        db_path = str(tmp_path / f"{name}.db")
+        with sqlite_manager.get_connection(db_path=db_path) as conn:
+            if centroid_texts:
+                embeddings = bag_of_words_embed(MODEL, centroid_texts)
+                sqlite_manager.add_to_domain_centroid(conn, MODEL, embeddings.sum(axis=0), len(centroid_texts))
+        return Domain(
+            id=id, name=name, description=description, keywords=keywords,
+            db_path=db_path, vector_store_path=str(tmp_path / f"{name}.faiss"), embeddings_dimension=len(VOCABULARY),
+            config=DomainConfig(domain_id=id, embeddings_model=MODEL, faiss_index_type="IndexFlatL2", chunking_strategy="semantic-cluster"),
+        )
+
+    @pytest.fixture
+    def domains(self, sqlite_manager, tmp_path):
+        return [
+            self._domain(sqlite_manager, tmp_path, 1, "Esportes", "Notícias de futebol", "futebol, gol", ["futebol gol", "gol gol"]),
+            self._domain(sqlite_manager, tmp_path, 2, "Culinária", "Receitas de bolo", "receita, bolo", ["receita bolo", "bolo"]),
+            self._domain(sqlite_manager, tmp_path, 3, "Jurídico", "Contratos", "contrato, cláusula", []),
+        ]
+
+    def test_routes_to_best_domain(self, sqlite_manager, domains):
+        router = DomainRouter(sqlite_manager)
+        selected, scores = router.route("Quem marcou o gol?", domains, bag_of_words_embed, min_score=0.3, margin=0.05)
+
+        assert [d.name for d in selected] == ["Esportes"]
+        assert scores["Esportes"] > scores["Culinária"]
+
+    def test_keywords_without_centroid(self, sqlite_manager, domains):
+        """Domínio sem centroide é roteado pela descrição e pelas palavras-chave (sem acento)."""
+        router = DomainRouter(sqlite_manager)
+        selected, _ = router.route("O que diz a clausula 3?", domains, bag_of_words_embed, min_score=0.3, margin=0.05)
+
+        assert [d.name for d in selected] == ["Jurídico"]
+
+    def test_low_confidence_falls_back(self, sqlite_manager, domains):
+        router = DomainRouter(sqlite_manager)
+        selected, scores = router.route("Qual a previsão do tempo?", domains, bag_of_words_embed, min_score=0.3, margin=0.05)
+
+        assert selected is None
+        assert set(scores) == {"Esportes", "Culinária", "Jurídico"}
+
+    def test_single_domain_skips_scoring(self, sqlite_manager, domains):
+        calls = []
+        embed = lambda model, texts: calls.append(texts) or bag_of_words_embed(model, texts)
+
+        selected, _ = DomainRouter(sqlite_manager).route("qualquer", domains[:1], embed, min_score=0.3, margin=0.05)
+
+        assert selected == domains[:1]
+        assert calls == []
+
+    def test_profiles_are_cached(self, sqlite_manager, domains):
+        calls = []
+        embed = lambda model, texts: calls.append(texts) or bag_of_words_embed(model, texts)
+        router = DomainRouter(sqlite_manager)
+
+        router.route("gol", domains, embed, min_score=0.3, margin=0.05)
+        first_calls = len(calls)
+        router.route("bolo", domains, embed, min_score=0.3, margin=0.05)
+
+        # Na segunda consulta, apenas a query é embedada
+        assert len(calls) == first_calls + 1
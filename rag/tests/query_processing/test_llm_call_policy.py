@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from agent.generator import Generator
+from agent.llm_client import LLMClientFactory
+from agent.llm_policy import LLMCallPolicy
+
+
+class _FakeOpenAIServer:
+    """Servidor local compatível com /chat/completions da OpenAI: responde na ordem de `responses` (status, atraso)."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server._lock:
+                    status, delay = server.responses[min(server.requests, len(server.responses) - 1)]
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+                time.sleep(delay)
+                if status == 200:
+                    body = {
+                        "id": "fake", "object": "chat.completion", "created": 0, "model": "fake",
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": f" resposta {server.requests} "}}],
+                    }
+                else:
+                    body = {"error": {"message": f"erro {status}", "type": "fake"}}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _generator(server, **policy_args):
+    policy = LLMCallPolicy(retry_delay_seconds=0.01, retry_max_delay_seconds=0.05, **policy_args)
+    return Generator(model_name="fake", policy=policy, base_url=server.base_url, api_key="test")
+
+
+MESSAGES = [{"role": "user", "content": "Oi"}]
+
+
+def test_retries_transient_errors():
+    """429 e 5xx são repetidos com backoff até a resposta."""
+    with _FakeOpenAIServer([(429, 0), (503, 0), (200, 0)]) as server:
+        assert _generator(server).generate_answer(MESSAGES) == "resposta 3"
+        assert server.requests == 3
+
+
+def test_does_not_retry_client_errors_and_raises():
+    """Erros definitivos não são repetidos, e o erro é propagado em vez de virar resposta."""
+    with _FakeOpenAIServer([(400, 0)]) as server:
+        with pytest.raises(openai.BadRequestError):
+            _generator(server).generate_answer(MESSAGES)
+        assert server.requests == 1
+
+
+def test_gives_up_after_max_retries():
+    with _FakeOpenAIServer([(500, 0)]) as server:
+        with pytest.raises(openai.InternalServerError):
+            _generator(server, max_retries=2).generate_answer(MESSAGES)
+        assert server.requests == 3
+
+
+def test_read_timeout_is_retried():
+    with _FakeOpenAIServer([(200, 1.0), (200, 0)]) as server:
+        generator = _generator(server, read_timeout_seconds=0.2)
+        assert generator.generate_answer(MESSAGES) == "resposta 2"
+
+
+def test_hedged_request_cuts_slow_call():
+    """Acima do percentil das latências recentes, uma requisição duplicada responde primeiro."""
+    with _FakeOpenAIServer([(200, 1.5), (200, 0)]) as server:
+        generator = _generator(server, hedge_enabled=True, hedge_min_samples=5)
+        for _ in range(5):
+            generator.policy.record_latency(0.05)
+
+        start = time.perf_counter()
+        assert generator.generate_answer(MESSAGES) == "resposta 2"
+        assert time.perf_counter() - start < 1.0
+
+        # A versão assíncrona cancela a requisição perdedora
+        server.responses, server.requests = [(200, 1.5), (200, 0)], 0
+        start = time.perf_counter()
+        assert asyncio.run(generator.agenerate_answer(MESSAGES)) == "resposta 2"
+        assert time.perf_counter() - start < 1.0
+
+
+def test_hedging_does_not_cap_calls_and_limits_duplicates():
+    """Com o hedging ativo, as chamadas concorrentes não esperam em fila e só hedge_max_in_flight duplicatas são disparadas."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _FakeOpenAIServer([(200, 0.6)]) as server:
+        generator = _generator(server, hedge_enabled=True, hedge_min_samples=5, hedge_max_in_flight=1)
+        for _ in range(5):
+            generator.policy.record_latency(0.05)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            answers = list(executor.map(lambda _: generator.generate_answer(MESSAGES), range(12)))
+
+        assert len(answers) == 12
+        assert time.perf_counter() - start < 1.1
+        assert server.requests == 13
+
+
+def test_shared_pool_reuses_connections():
+    """Geradores da mesma fábrica compartilham o pool: chamadas seguidas usam a mesma conexão (keep-alive)."""
+    with _FakeOpenAIServer([(200, 0)]) as server:
+        factory = LLMClientFactory(http2=False)
+        first = Generator(model_name="fake", base_url=server.base_url, api_key="test", client_factory=factory)
+        second = Generator(model_name="fake", base_url=server.base_url, api_key="test", client_factory=factory)
+
+        for generator in (first, second, first):
+            generator.generate_answer(MESSAGES)
+
+        assert server.requests == 3
+        assert len(server.connections) == 1
+        factory.close()
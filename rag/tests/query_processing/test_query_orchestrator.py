@@ -2,9 +2,11 @@ import pytest
 import numpy as np
 from unittest.mock import MagicMock
 
-from src.query_processing.query_orchestrator import QueryOrchestrator
+from src.query_processing.query_orchestrator import QueryOrchestrator, _reciprocal_rank_fusion
+from src.query_processing.query_context import QueryContext
 from src.config.models import AppConfig, SystemConfig, IngestionConfig, EmbeddingConfig, VectorStoreConfig, QueryConfig, TextNormalizerConfig, LLMConfig
 from src.models import Chunk, Domain 
+from src.models.domain_config import DomainConfig
 
 class TestQueryOrchestrator:
     """Suite de testes para a classe QueryOrchestrator."""
@@ -104,7 +106,7 @@ class TestQueryOrchestrator:
     def test_empty_query(self, orchestrator, mock_domains): # Pass orchestrator fixture
         """Testa o comportamento com uma query vazia."""
         with pytest.raises(ValueError) as exc_info:
-            orchestrator._process_query("", mock_domains[0]) # Use the fixture
+            orchestrator._process_query(QueryContext(), "", mock_domains[0]) # Use the fixture
         assert "Query vazia ou inválida" in str(exc_info.value)
     
     def test_process_query(self, orchestrator, mocker, mock_domains): # Pass orchestrator fixture
@@ -114,7 +116,7 @@ class TestQueryOrchestrator:
         mock_embeddings = np.array([[0.1] * 384], dtype=np.float32) 
         orchestrator.embedding_generator.generate_embeddings.return_value = mock_embeddings
         
-        result = orchestrator._process_query("teste de query", mock_domains[0])
+        result = orchestrator._process_query(QueryContext(), "teste de query", mock_domains[0])
         
         # Verifica se os métodos foram chamados corretamente
         orchestrator.text_normalizer.normalize.assert_called_once_with("teste de query")
@@ -130,7 +132,7 @@ class TestQueryOrchestrator:
         orchestrator.embedding_generator.generate_embeddings.return_value = np.array([])
         
         with pytest.raises(ValueError) as exc_info:
-            orchestrator._process_query("teste de query", mock_domains[0])
+            orchestrator._process_query(QueryContext(), "teste de query", mock_domains[0])
         
         # Verify mocks were called
         orchestrator.text_normalizer.normalize.assert_called_once_with("teste de query")
@@ -157,15 +159,16 @@ class TestQueryOrchestrator:
         orchestrator.sqlite_manager.get_chunks.return_value = mock_db_chunk
     
         # Initialize metrics data required by the method
-        orchestrator.metrics_data = {"retrieved_chunks": 0}
+        context = QueryContext(metrics={"retrieved_chunks": 0})
 
-        result = orchestrator._retrieve_documents(mock_embedding, mock_domain)
+        result = orchestrator._retrieve_documents(context, mock_embedding, mock_domain)
         
         assert orchestrator.faiss_manager.search_faiss_index.call_count == 1
         orchestrator.faiss_manager.search_faiss_index.assert_any_call(
             query_embedding=mock_embedding, 
             index_path=mock_domain.vector_store_path,
             dimension=mock_domain.embeddings_dimension,
+            k=orchestrator.config.query.retrieval_k,
         )
 
         assert orchestrator.sqlite_manager.get_chunks.call_count == 1
@@ -179,7 +182,7 @@ class TestQueryOrchestrator:
         mock_domain = mock_domains[0]
         
         with pytest.raises(ValueError) as exc_info:
-            orchestrator._retrieve_documents(None, mock_domain)
+            orchestrator._retrieve_documents(QueryContext(), None, mock_domain)
         assert "Vetor de embedding vazio ou inválido" in str(exc_info.value)
     
     def test_prepare_context_prompt(self, orchestrator, test_app_config): 
@@ -243,9 +246,10 @@ class TestQueryOrchestrator:
         
         result = orchestrator.query_llm(test_query)
         
-        orchestrator._select_domains.assert_called_once_with(test_query, None)
-        orchestrator._process_query.assert_called_once_with(test_query, mock_domain)
-        orchestrator._retrieve_documents.assert_called_once_with(mock_embedding, mock_domain)
+        context = orchestrator._select_domains.call_args.args[0]
+        orchestrator._select_domains.assert_called_once_with(context, test_query, None)
+        orchestrator._process_query.assert_called_once_with(context, test_query, mock_domain)
+        orchestrator._retrieve_documents.assert_called_once_with(context, mock_embedding, mock_domain, test_query)
         
         orchestrator.hugging_face_manager.generate_answer.assert_called_once_with(test_query, expected_prompt)
         
@@ -265,13 +269,15 @@ class TestQueryOrchestrator:
         error_message = "Erro de teste"
         
         mocker.patch.object(orchestrator, '_select_domains', side_effect=Exception(error_message))
+        fail_query = mocker.spy(orchestrator, '_fail_query')
         
         with pytest.raises(Exception) as exc_info:
             orchestrator.query_llm(test_query)
             
         assert error_message in str(exc_info.value)
             
-        assert orchestrator.metrics_data["success"] == False 
+        context = fail_query.call_args.args[0]
+        assert context.metrics["success"] == False 
 
     def test_update_config_no_change(self, orchestrator, test_app_config, mocker):
         """Testa update_config: Sem alterações."""
@@ -369,4 +375,242 @@ class TestQueryOrchestrator:
         mock_sm_update.assert_not_called()
         # Verifica se a referência do config foi atualizada
         assert orchestrator.config is new_config
-        assert orchestrator.config != initial_config_ref 
\ No newline at end of file
+        assert orchestrator.config != initial_config_ref 
+
+
+def _mock_domain():
+    return Domain(id=1, name="mock_domain", description="d", keywords="k", db_path="p", vector_store_path="p", embeddings_dimension=3,
+                  config=DomainConfig(domain_id=1, embeddings_model=EmbeddingConfig().model_name, faiss_index_type="IndexFlatIP", chunking_strategy="recursive"))
+
+
+def _stored_vectors(index_path, dimension, ids):
+    """Vetores distintos por id, como os reconstruídos do índice FAISS."""
+    return np.eye(max(ids) + 1, dimension, dtype=np.float32)[ids]
+
+
+def test_reciprocal_rank_fusion():
+    """Ids presentes nos dois rankings sobem; ids de um único ranking mantêm a ordem relativa."""
+    vector_ids = [10, 20, 30]
+    lexical_ids = [30, 40]
+
+    fused = _reciprocal_rank_fusion([vector_ids, lexical_ids], k=60)
+
+    # 20 e 40 empatam (1 / 62): vale a ordem da primeira ocorrência
+    assert fused == [30, 10, 20, 40]
+    assert _reciprocal_rank_fusion([[], []], k=60) == []
+
+
+def test_query_llm_stream(monkeypatch):
+    """Testa o streaming da resposta: trechos repassados na ordem, métricas preenchidas e resposta em cache."""
+    import src.query_processing.query_orchestrator as orchestrator_module
+
+    embedding_generator = MagicMock()
+    embedding_generator.config.model_name = EmbeddingConfig().model_name
+    embedding_generator.generate_embeddings.return_value = np.array([[1.0, 0.0, 0.0]], dtype=np.float32)
+    monkeypatch.setattr(orchestrator_module, "EmbeddingGenerator", MagicMock(return_value=embedding_generator))
+    monkeypatch.setattr(orchestrator_module, "FaissManager", MagicMock())
+
+    llm_generator = MagicMock()
+    llm_generator.generate_answer_stream.return_value = iter(["Esta é ", "a resposta."])
+    config = AppConfig(query=QueryConfig(answer_cache_enabled=True))
+    orchestrator = QueryOrchestrator(config, sqlite_manager=MagicMock(), llm_generator=llm_generator)
+
+    domain = _mock_domain()
+    orchestrator.faiss_manager.get_embeddings.side_effect = _stored_vectors
+    orchestrator.domain_catalog = MagicMock()
+    orchestrator.domain_catalog.get_domains.return_value = [domain]
+    monkeypatch.setattr(orchestrator, "_select_domains", MagicMock(return_value=[domain]))
+    monkeypatch.setattr(orchestrator, "_process_query", MagicMock(return_value=np.array([[1.0, 0.0, 0.0]], dtype=np.float32)))
+    chunks = [Chunk(id=1, document_id=1, content="Chunk 1", metadata={})]
+    monkeypatch.setattr(orchestrator, "_retrieve_documents", MagicMock(return_value=chunks))
+
+    context = QueryContext()
+    assert list(orchestrator.query_llm_stream("Teste de query", context=context)) == ["Esta é ", "a resposta."]
+    llm_generator.generate_answer.assert_not_called()
+    assert context.metrics["answer"] == "Esta é a resposta."
+    assert context.metrics["context_chunks"] == ["Chunk 1"]
+    assert context.metrics["success"] == True
+
+    # A mesma pergunta é atendida pelo cache semântico, sem nova recuperação
+    context = QueryContext()
+    assert list(orchestrator.query_llm_stream("Teste de query", context=context)) == ["Esta é a resposta."]
+    assert context.metrics["answer_cache_hit"] == True
+    orchestrator._retrieve_documents.assert_called_once()
+
+
+def test_answer_cache_scope():
+    """Perguntas que diferem em números ou códigos, ou nos domínios informados, têm escopos diferentes."""
+    scope = QueryOrchestrator._answer_cache_scope
+
+    assert scope("O que diz o artigo 5?", None) == scope("o que diz o Artigo 5", None)
+    assert scope("O que diz o artigo 5?", None) != scope("O que diz o artigo 6?", None)
+    assert scope("Status do AB-1234", None) != scope("Status do AB-1235", None)
+    assert scope("Status do pedido", ["b", "a"]) == scope("Status do pedido", ["a", "b"])
+    assert scope("Status do pedido", ["a"]) != scope("Status do pedido", None)
+
+
+def test_aquery_llm(monkeypatch):
+    """Testa a versão assíncrona: recuperação no executor e resposta pelo cliente assíncrono do LLM."""
+    import asyncio
+    import threading
+    from unittest.mock import AsyncMock
+    import src.query_processing.query_orchestrator as orchestrator_module
+
+    monkeypatch.setattr(orchestrator_module, "EmbeddingGenerator", MagicMock())
+    monkeypatch.setattr(orchestrator_module, "FaissManager", MagicMock())
+
+    llm_generator = MagicMock()
+    llm_generator.agenerate_answer = AsyncMock(return_value="Resposta assíncrona")
+    orchestrator = QueryOrchestrator(AppConfig(), sqlite_manager=MagicMock(), llm_generator=llm_generator)
+
+    domain = _mock_domain()
+    orchestrator.faiss_manager.get_embeddings.side_effect = _stored_vectors
+    monkeypatch.setattr(orchestrator, "_select_domains", MagicMock(return_value=[domain]))
+    monkeypatch.setattr(orchestrator, "_process_query", MagicMock(return_value=np.array([[1.0, 0.0, 0.0]], dtype=np.float32)))
+    retrieval_threads = []
+    def retrieve(*args):
+        retrieval_threads.append(threading.current_thread().name)
+        return [Chunk(id=1, document_id=1, content="Chunk 1", metadata={})]
+    monkeypatch.setattr(orchestrator, "_retrieve_documents", retrieve)
+
+    result = asyncio.run(orchestrator.aquery_llm("Teste de query"))
+
+    assert result["answer"] == "Resposta assíncrona"
+    assert result["context_chunks"] == ["Chunk 1"]
+    assert result["success"] == True
+    llm_generator.agenerate_answer.assert_awaited_once()
+    llm_generator.generate_answer.assert_not_called()
+    assert retrieval_threads[0].startswith("query")
+
+    chunks = asyncio.run(orchestrator.aretrieve_chunks("Teste de query", ["mock_domain"], k=1))
+    assert [chunk.content for chunk in chunks] == ["Chunk 1"]
+
+
+def test_concurrent_queries_do_not_share_state(monkeypatch):
+    """Consultas concorrentes na mesma instância mantêm métricas e respostas separadas."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import src.query_processing.query_orchestrator as orchestrator_module
+
+    monkeypatch.setattr(orchestrator_module, "EmbeddingGenerator", MagicMock())
+    monkeypatch.setattr(orchestrator_module, "FaissManager", MagicMock())
+
+    # As duas consultas só terminam a recuperação depois que ambas começaram
+    barrier = threading.Barrier(2, timeout=5)
+    llm_generator = MagicMock()
+    llm_generator.generate_answer.side_effect = lambda messages: f"resposta: {messages[-1]['content']}"
+    orchestrator = QueryOrchestrator(AppConfig(), sqlite_manager=MagicMock(), llm_generator=llm_generator)
+
+    domain = _mock_domain()
+    orchestrator.faiss_manager.get_embeddings.side_effect = _stored_vectors
+    monkeypatch.setattr(orchestrator, "_select_domains", MagicMock(return_value=[domain]))
+    monkeypatch.setattr(orchestrator, "_process_query", MagicMock(return_value=np.array([[1.0, 0.0, 0.0]], dtype=np.float32)))
+    def retrieve(context, query_embedding, domain, query):
+        barrier.wait()
+        context.metrics["retrieved_chunks"] += 1
+        return [Chunk(id=1, document_id=1, content=f"contexto de {query}", metadata={})]
+    monkeypatch.setattr(orchestrator, "_retrieve_documents", retrieve)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(orchestrator.query_llm, ["pergunta A", "pergunta B"]))
+
+    assert [result["answer"] for result in results] == ["resposta: pergunta A", "resposta: pergunta B"]
+    assert [result["context_chunks"] for result in results] == [["contexto de pergunta A"], ["contexto de pergunta B"]]
+    assert [result["retrieved_chunks"] for result in results] == [1, 1]
+    assert results[0] is not results[1]
+
+
+def test_stage_latencies(monkeypatch):
+    """As etapas da consulta são medidas: durações na consulta e histogramas acumulados na instância."""
+    import src.query_processing.query_orchestrator as orchestrator_module
+
+    monkeypatch.setattr(orchestrator_module, "EmbeddingGenerator", MagicMock())
+    monkeypatch.setattr(orchestrator_module, "FaissManager", MagicMock())
+
+    llm_generator = MagicMock()
+    llm_generator.generate_answer.return_value = "Resposta"
+    llm_generator.generate_answer_stream.return_value = iter(["Res", "posta"])
+    orchestrator = QueryOrchestrator(AppConfig(), sqlite_manager=MagicMock(), llm_generator=llm_generator)
+
+    domain = _mock_domain()
+    orchestrator.faiss_manager.get_embeddings.side_effect = _stored_vectors
+    monkeypatch.setattr(orchestrator, "_select_domains", MagicMock(return_value=[domain]))
+    monkeypatch.setattr(orchestrator, "_process_query", MagicMock(return_value=np.array([[1.0, 0.0, 0.0]], dtype=np.float32)))
+    monkeypatch.setattr(orchestrator, "_retrieve_documents", MagicMock(return_value=[Chunk(id=1, document_id=1, content="Chunk 1", metadata={})]))
+
+    result = orchestrator.query_llm("Teste de query")
+
+    assert isinstance(result["processing_duration"], float)
+    assert {"answer_cache", "domain_selection", "context_packing", "generation"} <= set(result["stage_durations"])
+    assert result["stage_durations"]["generation"] <= result["processing_duration"]
+
+    context = QueryContext()
+    assert "".join(orchestrator.query_llm_stream("Teste de query", context=context)) == "Resposta"
+    assert 0 < context.stage_durations["first_token"] <= context.metrics["processing_duration"]
+
+    with pytest.raises(ValueError):
+        orchestrator.query_llm("")
+
+    snapshot = orchestrator.latency.snapshot()
+    assert snapshot["query"]["count"] == 2
+    assert snapshot["query_failed"]["count"] == 1
+    assert snapshot["generation"]["count"] == 2
+    assert snapshot["first_token"]["count"] == 1
+
+
+def test_follow_up_reuses_previous_retrieval(monkeypatch):
+    """Perguntas de continuação reaproveitam os domínios e os chunks do turno anterior da sessão."""
+    import src.query_processing.query_orchestrator as orchestrator_module
+
+    monkeypatch.setattr(orchestrator_module, "EmbeddingGenerator", MagicMock())
+    monkeypatch.setattr(orchestrator_module, "FaissManager", MagicMock())
+
+    llm_generator = MagicMock()
+    llm_generator.generate_answer.return_value = "Resposta"
+    orchestrator = QueryOrchestrator(AppConfig(), sqlite_manager=MagicMock(), llm_generator=llm_generator)
+
+    domain = _mock_domain()
+    orchestrator.domain_catalog = MagicMock()
+    orchestrator.domain_catalog.get_domains.return_value = [domain]
+    orchestrator.faiss_manager.get_embeddings.side_effect = _stored_vectors
+    orchestrator.faiss_manager.search_faiss_index.return_value = (np.array([[0.9, 0.8]]), np.array([[2, 1]]))
+    orchestrator.sqlite_manager.get_chunks.return_value = [Chunk(id=2, document_id=1, content="Chunk 2", metadata={})]
+    select_domains = MagicMock(return_value=[domain])
+    monkeypatch.setattr(orchestrator, "_select_domains", select_domains)
+    monkeypatch.setattr(orchestrator, "_process_query", MagicMock(return_value=np.array([[1.0, 0.0, 0.0]], dtype=np.float32)))
+    retrieve = MagicMock(return_value=[Chunk(id=1, document_id=1, content="Chunk 1", metadata={}),
+                                       Chunk(id=3, document_id=1, content="Chunk 3", metadata={})])
+    monkeypatch.setattr(orchestrator, "_retrieve_documents", retrieve)
+
+    orchestrator.query_llm("O que é um PIX?", session_id="u1")
+    result = orchestrator.query_llm("E qual o limite?", session_id="u1", follow_up=True)
+
+    # Sem nova seleção de domínios nem recuperação completa: busca incremental e leitura só do chunk novo
+    assert select_domains.call_count == 1
+    assert retrieve.call_count == 1
+    assert orchestrator.faiss_manager.search_faiss_index.call_args.kwargs["k"] == orchestrator.config.query.follow_up_search_k
+    assert orchestrator.sqlite_manager.get_chunks.call_args.args[1] == [2]
+    assert result["domain_routing"] == "follow_up"
+    assert result["follow_up_reuse"] == True
+    assert result["follow_up_reused_chunks"] == 2
+    assert sorted(result["context_chunks"]) == ["Chunk 1", "Chunk 2", "Chunk 3"]
+
+    # Outra sessão, sem turno anterior, passa pela seleção e pela recuperação completas
+    result = orchestrator.query_llm("E qual o limite?", session_id="u2", follow_up=True)
+    assert result["follow_up_reuse"] == False
+    assert select_domains.call_count == 2
+
+    # Uma reingestão do domínio invalida a recuperação guardada
+    domain.total_documents += 1
+    result = orchestrator.query_llm("E o horário?", session_id="u1", follow_up=True)
+    assert result["follow_up_reuse"] == False
+    assert retrieve.call_count == 3
+
+    # Uma resposta do cache semântico não passa pela recuperação: o turno guardado da sessão é descartado
+    cached = {"similarity": 0.99, "domains": [domain.name], "context_chunks": ["Chunk 9"], "answer": "Em cache"}
+    monkeypatch.setattr(orchestrator, "_lookup_answer_cache", MagicMock(return_value=(None, {}, cached)))
+    assert len(orchestrator.retrieval_memory) == 2
+    result = orchestrator.query_llm("Qual o limite do PIX?", session_id="u1")
+    assert result["answer_cache_hit"] == True
+    assert len(orchestrator.retrieval_memory) == 1
+    assert orchestrator.retrieval_memory.get("u1", orchestrator._domain_generations()) is None
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from src.config.models import QueryConfig
+from src.models import Chunk
+from src.query_processing.reranker import CrossEncoderReranker
+
+
+def _chunks(*contents):
+    return [Chunk(id=i, document_id=1, content=content, metadata={}) for i, content in enumerate(contents, start=1)]
+
+
+class TestCrossEncoderReranker:
+    """Suite de testes para o rerank com cross-encoder (modelo simulado)."""
+
+    @pytest.fixture
+    def reranker(self):
+        reranker = CrossEncoderReranker(QueryConfig(rerank_strategy="cross-encoder", rerank_cache_max_entries=3))
+        model = MagicMock()
+        # Score simulado: número de letras "a" do chunk
+        model.predict.side_effect = lambda pairs, **kwargs: np.array([content.count("a") for _, content in pairs], dtype=np.float32)
+        reranker._model = model
+        return reranker
+
+    def test_orders_by_score_and_keeps_top_k(self, reranker):
+        chunks, scores, stats = reranker.rerank("query", 1, _chunks("b", "aaa", "aa"), top_k=2)
+
+        assert [chunk.content for chunk in chunks] == ["aaa", "aa"]
+        assert scores == [3.0, 2.0]
+        assert stats == {"rerank_cache_hits": 0, "rerank_scored": 3}
+        reranker._model.predict.assert_called_once()
+        assert reranker._model.predict.call_args.kwargs["batch_size"] == 16
+
+    def test_scores_are_cached_per_query_and_chunk(self, reranker):
+        reranker.rerank("query", 1, _chunks("a", "aa"), top_k=2)
+
+        _, _, stats = reranker.rerank("query", 1, _chunks("a", "aa"), top_k=2)
+        assert stats == {"rerank_cache_hits": 2, "rerank_scored": 0}
+
+        # Outra query, outro domínio ou o mesmo id com outro conteúdo são recalculados
+        assert reranker.rerank("outra query", 1, _chunks("a"), top_k=1)[2]["rerank_scored"] == 1
+        assert reranker.rerank("query", 2, _chunks("a"), top_k=1)[2]["rerank_scored"] == 1
+        assert reranker.rerank("query", 1, _chunks("novo"), top_k=1)[2]["rerank_scored"] == 1
+
+    def test_cache_is_bounded(self, reranker):
+        reranker.rerank("query", 1, _chunks("a", "aa", "aaa", "aaaa"), top_k=4)
+        assert len(reranker._scores) == 3
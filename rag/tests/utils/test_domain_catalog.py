@@ -0,0 +1,76 @@
+import os
+import pytest
+
+from src.utils import SQLiteManager, DomainCatalog
+from src.models import Domain, DomainConfig
+from src.config.models import SystemConfig
+
+
+class TestDomainCatalog:
+    """Test suite for the DomainCatalog class."""
+
+    @pytest.fixture
+    def sqlite_manager(self, tmp_path):
+        config = SystemConfig(storage_base_path=str(tmp_path), control_db_filename="control_test.db")
+        return SQLiteManager(config)
+
+    @pytest.fixture
+    def catalog(self, sqlite_manager):
+        catalog = DomainCatalog(sqlite_manager)
+        yield catalog
+        catalog.close()
+
+    def _insert_domain(self, sqlite_manager, tmp_path, name):
+        domain = Domain(
+            name=name,
+            description=f"{name} description",
+            keywords=f"{name}, keywords",
+            db_path=str(tmp_path / name / f"{name}.db"),
+            vector_store_path=str(tmp_path / name / "vector_store" / f"{name}.faiss"),
+            embeddings_dimension=384,
+        )
+        with sqlite_manager.get_connection(control=True) as conn:
+            domain_id = sqlite_manager.insert_domain(domain, conn)
+            sqlite_manager.insert_domain_config(DomainConfig(
+                domain_id=domain_id,
+                embeddings_model="sentence-transformers/all-MiniLM-L6-v2",
+                faiss_index_type="IndexFlatL2",
+                chunking_strategy="semantic-cluster",
+            ), conn)
+        return domain
+
+    def test_loads_once_until_control_db_changes(self, sqlite_manager, catalog, tmp_path):
+        """Test the catalog is reused while the control DB is unchanged and reloaded after a commit."""
+        self._insert_domain(sqlite_manager, tmp_path, "first")
+
+        calls = []
+        original_get_domain = sqlite_manager.get_domain
+        sqlite_manager.get_domain = lambda *args, **kwargs: calls.append(args) or original_get_domain(*args, **kwargs)
+
+        assert [d.name for d in catalog.get_domains()] == ["first"]
+        assert [d.name for d in catalog.get_domains()] == ["first"]
+        assert len(calls) == 1
+        assert catalog.get_domains()[0].config.embeddings_model == "sentence-transformers/all-MiniLM-L6-v2"
+
+        self._insert_domain(sqlite_manager, tmp_path, "second")
+
+        assert [d.name for d in catalog.get_domains()] == ["first", "second"]
+        assert len(calls) == 2
+
+        catalog.invalidate()
+        catalog.get_domains()
+        assert len(calls) == 3
+
+    def test_populated_domains(self, sqlite_manager, catalog, tmp_path):
+        """Test only domains with an existing database are reported as populated."""
+        first = self._insert_domain(sqlite_manager, tmp_path, "first")
+        self._insert_domain(sqlite_manager, tmp_path, "second")
+        os.makedirs(os.path.dirname(first.db_path))
+        sqlite_manager.get_connection(db_path=first.db_path).close()
+
+        assert [d.name for d in catalog.get_populated_domains()] == ["first"]
+
+    def test_empty_control_db(self, catalog):
+        """Test an empty control DB yields an empty catalog."""
+        assert catalog.get_domains() == []
+        assert catalog.get_populated_domains() == []
@@ -131,6 +131,32 @@ class TestFaissManager:
         assert reloaded_index.ntotal == len(sample_ids)
         assert reloaded_index.d == TEST_DIMENSION
 
+    def test_get_embeddings_sum(self, faiss_manager, index_path, sample_embeddings, sample_ids):
+        """Test summing all vectors of the index or only the vectors of the given ids."""
+        index_file = Path(index_path)
+        if index_file.exists(): index_file.unlink()
+        faiss_manager.add_embeddings(sample_embeddings, sample_ids, index_path, TEST_DIMENSION)
+
+        total, count = faiss_manager.get_embeddings_sum(index_path, TEST_DIMENSION)
+        assert count == len(sample_ids)
+        np.testing.assert_allclose(total, sample_embeddings.sum(axis=0), rtol=1e-5)
+
+        subset, count = faiss_manager.get_embeddings_sum(index_path, TEST_DIMENSION, ids=[sample_ids[1], sample_ids[3], 42])
+        assert count == 2
+        np.testing.assert_allclose(subset, sample_embeddings[[1, 3]].sum(axis=0), rtol=1e-5)
+
+    def test_get_embeddings(self, faiss_manager, index_path, sample_embeddings, sample_ids):
+        """Test reconstructing the vectors of the given ids, in order, with zeros for unknown ids."""
+        index_file = Path(index_path)
+        if index_file.exists(): index_file.unlink()
+        faiss_manager.add_embeddings(sample_embeddings, sample_ids, index_path, TEST_DIMENSION)
+
+        vectors = faiss_manager.get_embeddings(index_path, TEST_DIMENSION, [sample_ids[3], 42, sample_ids[0]])
+        assert vectors.shape == (3, TEST_DIMENSION)
+        np.testing.assert_allclose(vectors[0], sample_embeddings[3], rtol=1e-5)
+        np.testing.assert_allclose(vectors[1], np.zeros(TEST_DIMENSION))
+        np.testing.assert_allclose(vectors[2], sample_embeddings[0], rtol=1e-5)
+
     def test_add_embeddings_invalid_ids_type(self, faiss_manager, index_path, sample_embeddings):
          """Test adding embeddings with invalid ID types."""
          ids_float = [float(i) for i in range(len(sample_embeddings))]
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from src.utils import LatencyTracker
+from src.utils.latency import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    """Suite de testes para o histograma de latências."""
+
+    def test_percentiles_within_relative_error(self):
+        """Os percentis ficam a menos de ~1,6% dos valores exatos, em várias ordens de grandeza."""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(-4, 1.5) for _ in range(5000))
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for percent in (50, 90, 99):
+            exact = values[int(round(percent / 100 * len(values))) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=0.02, abs=2e-6)
+        assert histogram.count == 5000
+        assert histogram.min == values[0] and histogram.max == values[-1]
+
+    def test_empty_histogram(self):
+        assert LatencyHistogram().percentile(50) is None
+
+
+class TestLatencyTracker:
+    """Suite de testes para o registro de latências por etapa."""
+
+    def test_span_records_stage_and_durations(self):
+        tracker = LatencyTracker()
+        durations = {}
+
+        with tracker.span("faiss_search", durations):
+            pass
+        with pytest.raises(ValueError):
+            with tracker.span("faiss_search", durations):
+                raise ValueError("falha")
+
+        snapshot = tracker.snapshot()
+        assert snapshot["faiss_search"]["count"] == 2
+        assert durations["faiss_search"] == pytest.approx(snapshot["faiss_search"]["sum"])
+
+    def test_prometheus_export(self):
+        tracker = LatencyTracker()
+        tracker.record("generation", 0.5)
+        tracker.record("generation", 1.5)
+
+        text = tracker.to_prometheus()
+
+        assert "# TYPE rag_stage_latency_seconds summary" in text
+        assert 'rag_stage_latency_seconds{stage="generation",quantile="0.5"}' in text
+        assert 'rag_stage_latency_seconds_sum{stage="generation"} 2.000000' in text
+        assert 'rag_stage_latency_seconds_count{stage="generation"} 2' in text
+
+        tracker.reset()
+        assert tracker.snapshot() == {}
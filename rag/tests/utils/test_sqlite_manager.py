@@ -3,6 +3,8 @@ import pytest
 import sqlite3
 import shutil
 import datetime
+import numpy as np
+from unittest.mock import MagicMock
 
 from src.models import DocumentFile, Chunk, Domain
 from src.utils import SQLiteManager
@@ -289,9 +291,335 @@ class TestSQLiteManager:
             retrieved_by_nonexistent_ids = self.manager.get_chunks(conn, chunk_ids=[999, 1000])
             assert retrieved_by_nonexistent_ids == []
 
-            retrieved_with_no_ids = self.manager.get_chunks(conn) 
+            retrieved_with_no_ids = self.manager.get_chunks(conn)
             assert retrieved_with_no_ids == []
 
+    def _insert_numbered_chunks(self, conn, document_file, total):
+        """Inserts `total` chunks with distinct contents and returns their ids."""
+        doc_id = self.manager.insert_document_file(document_file, conn)
+        chunks = [
+            Chunk(document_id=doc_id, content=f"Content {i}", metadata={"index_in_doc": i})
+            for i in range(total)
+        ]
+        ids = self.manager.insert_chunks(chunks, doc_id, conn)
+        conn.commit()
+        return ids
+
+    def test_get_chunks_by_ids_order_duplicates_and_missing(self, sample_document_file, sample_domain_db_path):
+        """Test get_chunks keeps the requested order, ignores unknown ids (e.g. FAISS -1) and repeated ids."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            ids = self._insert_numbered_chunks(conn, sample_document_file, 6)
+
+            request_ids = [ids[4], -1, ids[0], ids[4], 9999, ids[2]]
+            retrieved = self.manager.get_chunks(conn, chunk_ids=request_ids)
+
+            assert [c.id for c in retrieved] == [ids[4], ids[0], ids[2]]
+            assert [c.content for c in retrieved] == ["Content 4", "Content 0", "Content 2"]
+
+    def test_get_chunks_by_ids_larger_than_bucket(self, sample_document_file, sample_domain_db_path):
+        """Test get_chunks with more ids than the largest fixed-arity statement."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            ids = self._insert_numbered_chunks(conn, sample_document_file, 1100)
+
+            request_ids = list(reversed(ids))
+            retrieved = self.manager.get_chunks(conn, chunk_ids=request_ids)
+
+            assert [c.id for c in retrieved] == request_ids
+
+    def test_concurrent_connections_use_their_own_database(self, monkeypatch, sample_document_file, sample_domain_db_path):
+        """Test concurrent queries on different domains sharing the manager read each their own database."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        other_db_path = sample_domain_db_path.replace(".db", "_other.db")
+        if os.path.exists(other_db_path):
+            os.remove(other_db_path)
+        for db_path in (sample_domain_db_path, other_db_path):
+            with self.manager.get_connection(db_path=db_path) as conn:
+                doc_id = self.manager.insert_document_file(sample_document_file.model_copy(), conn)
+                self.manager.insert_chunks([Chunk(document_id=doc_id, content=f"Content of {os.path.basename(db_path)}", metadata={})], doc_id, conn)
+                conn.commit()
+            conn.close()
+
+        # Um pequeno atraso na verificação do arquivo alarga a janela entre threads
+        exists = os.path.exists
+        monkeypatch.setattr(os.path, "exists", lambda path: time.sleep(0.0005) or exists(path))
+
+        def read(db_path):
+            with self.manager.get_connection(db_path=db_path) as conn:
+                content = self.manager.get_chunks(conn, chunk_ids=[1])[0].content
+            conn.close()
+            return db_path, content
+
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(read, [sample_domain_db_path, other_db_path] * 200))
+            assert all(content == f"Content of {os.path.basename(db_path)}" for db_path, content in results)
+        finally:
+            os.remove(other_db_path)
+
+    def test_get_chunks_lazy_metadata(self, sample_document_file, sample_domain_db_path):
+        """Test metadata is decoded on first access and included in model_dump, repr and str."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            ids = self._insert_numbered_chunks(conn, sample_document_file, 2)
+
+            [chunk] = self.manager.get_chunks(conn, chunk_ids=[ids[1]])
+
+            assert "metadata" not in chunk.__dict__
+            assert isinstance(chunk.created_at, datetime.datetime)
+            assert chunk.metadata == {"index_in_doc": 1}
+            assert chunk.model_dump()["metadata"] == {"index_in_doc": 1}
+
+            [other] = self.manager.get_chunks(conn, chunk_ids=[ids[0]])
+            assert other.model_dump()["metadata"] == {"index_in_doc": 0}
+
+            # repr e str incluem o metadata ainda não decodificado
+            [lazy] = self.manager.get_chunks(conn, chunk_ids=[ids[0]])
+            assert "metadata={'index_in_doc': 0}" in repr(lazy)
+            assert "metadata={'index_in_doc': 0}" in str(lazy)
+
+    def test_get_chunks_lazy_metadata_assignment_and_equality(self, sample_document_file, sample_domain_db_path):
+        """Test assigning metadata on a lazy chunk replaces the stored JSON and equality ignores laziness."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            ids = self._insert_numbered_chunks(conn, sample_document_file, 1)
+
+            [chunk] = self.manager.get_chunks(conn, chunk_ids=ids)
+            [same] = self.manager.get_chunks(conn, chunk_ids=ids)
+            # type(same): o SQLiteManager importa os modelos como rag.src.models
+            eager = type(same)(id=same.id, document_id=same.document_id, content=same.content,
+                          metadata={"index_in_doc": 0}, created_at=same.created_at)
+            assert same == eager
+
+            chunk.metadata = {"b": 2}
+            assert chunk.metadata == {"b": 2}
+            assert chunk.model_dump()["metadata"] == {"b": 2}
+
+    def test_insert_duplicate_chunk_content_fails(self, sample_document_file, sample_domain_db_path):
+        """Test the content_hash UNIQUE constraint rejects repeated chunk content."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            self._insert_numbered_chunks(conn, sample_document_file, 1)
+            duplicate = Chunk(document_id=1, content="Content 0", metadata={})
+            with pytest.raises(sqlite3.IntegrityError):
+                self.manager.insert_chunks([duplicate], 1, conn)
+
+    def test_get_existing_content_hashes(self, sample_document_file, sample_domain_db_path):
+        """Test lookup of already stored chunk hashes."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            self._insert_numbered_chunks(conn, sample_document_file, 3)
+
+            stored = Chunk.hash_content("Content 1")
+            new = Chunk.hash_content("Brand new content")
+            assert self.manager.get_existing_content_hashes(conn, [stored, new, stored]) == {stored}
+            assert self.manager.get_existing_content_hashes(conn, []) == set()
+
+    def test_migrate_legacy_domain_database(self, sample_domain_db_path):
+        """Test a database created with the UNIQUE(content) schema is migrated to content_hash, keeping ids."""
+        with sqlite3.connect(sample_domain_db_path) as legacy_conn:
+            legacy_conn.executescript("""
+                CREATE TABLE document_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, path TEXT NOT NULL UNIQUE,
+                    hash TEXT NOT NULL UNIQUE, total_pages INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, document_id INTEGER NOT NULL,
+                    content TEXT NOT NULL UNIQUE, metadata TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (document_id) REFERENCES document_files(id)
+                );
+                INSERT INTO document_files (name, path, hash, total_pages) VALUES ('a.pdf', '/a.pdf', 'h', 1);
+                INSERT INTO chunks (document_id, content, metadata) VALUES (1, 'first', '{}');
+                INSERT INTO chunks (document_id, content, metadata) VALUES (1, 'second', '{}');
+                INSERT INTO chunks (document_id, content, metadata) VALUES (1, 'third', '{}');
+                DELETE FROM chunks WHERE content = 'third';
+            """)
+        legacy_conn.close()
+
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+            rows = conn.execute("SELECT id, content, content_hash FROM chunks ORDER BY id").fetchall()
+            assert rows == [
+                (1, "first", Chunk.hash_content("first")),
+                (2, "second", Chunk.hash_content("second")),
+            ]
+            indexes = conn.execute("PRAGMA index_list(chunks)").fetchall()
+            unique_columns = [
+                conn.execute(f"PRAGMA index_info('{index[1]}')").fetchone()[2] for index in indexes if index[2]
+            ]
+            assert unique_columns == ["content_hash"]
+
+            # O contador do AUTOINCREMENT é preservado: ids de chunks removidos não são reutilizados
+            [new_id] = self.manager.insert_chunks([Chunk(document_id=1, content="fourth", metadata={})], 1, conn)
+            assert new_id == 4
+            # O índice lexical é preenchido com os chunks existentes
+            assert self.manager.search_chunks_fts(conn, "second", k=5) == [2]
+
+    def test_migrations_skip_versions_applied_by_another_process(self, sample_document_file, sample_domain_db_path):
+        """Test a migration already applied by another connection, after this one read user_version, is not rerun."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            ids = self._insert_numbered_chunks(conn, sample_document_file, 3)
+        conn.close()
+
+        class StaleVersionConnection(sqlite3.Connection):
+            """Devolve user_version = 0 na primeira leitura, como se outro processo migrasse o banco logo depois."""
+            stale = True
+
+            def execute(self, sql, *args):
+                if self.stale and sql == "PRAGMA user_version":
+                    self.stale = False
+                    return super().execute("SELECT 0")
+                return super().execute(sql, *args)
+
+        conn = sqlite3.connect(sample_domain_db_path, factory=StaleVersionConnection)
+        self.manager._register_domain_functions(conn)
+        self.manager.logger = MagicMock()
+        self.manager._apply_domain_migrations(conn, sample_domain_db_path)
+
+        # Nenhum script rodou nesta conexão: nada é registrado como migrado
+        self.manager.logger.info.assert_not_called()
+        assert conn.execute("SELECT id FROM chunks ORDER BY id").fetchall() == [(chunk_id,) for chunk_id in ids]
+        assert conn.execute("SELECT count(*) FROM chunks_fts WHERE chunks_fts MATCH 'content'").fetchone()[0] == 3
+        conn.close()
+
+    @pytest.mark.parametrize("mode", ["zlib", "zstd"])
+    def test_compressed_chunks_round_trip(self, mode, sample_document_file, sample_domain_db_path):
+        """Test chunks are stored compressed and read back unchanged, alongside chunks stored before compression."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            plain_ids = self._insert_numbered_chunks(conn, sample_document_file, 2)
+
+            self.manager.set_compression(conn, mode)
+            chunks = [
+                Chunk(document_id=1, content=f"Compressed content {i} " + "lorem ipsum " * 20, metadata={"index_in_doc": i})
+                for i in range(100)
+            ]
+            compressed_ids = self.manager.insert_chunks(chunks, 1, conn)
+            conn.commit()
+
+            assert conn.execute("SELECT typeof(content), typeof(metadata) FROM chunks WHERE id = ?",
+                                (compressed_ids[0],)).fetchone() == ("blob", "blob")
+            if mode == "zstd":
+                assert conn.execute("SELECT COUNT(*) FROM compression_dictionaries").fetchone()[0] == 1
+
+            retrieved = self.manager.get_chunks(conn, chunk_ids=[compressed_ids[5], plain_ids[1]])
+            assert [c.content for c in retrieved] == [chunks[5].content, "Content 1"]
+            assert [c.metadata for c in retrieved] == [{"index_in_doc": 5}, {"index_in_doc": 1}]
+            assert len(self.manager.get_chunks(conn, file_id=1)) == 102
+
+            # Deduplicação continua sobre o texto puro
+            assert self.manager.get_existing_content_hashes(conn, [Chunk.hash_content(chunks[0].content)])
+
+    def test_storage_stats(self, sample_document_file, sample_domain_db_path):
+        """Test storage stats report the compression ratio of compressed chunks."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            self.manager.set_compression(conn, "zlib")
+            doc_id = self.manager.insert_document_file(sample_document_file, conn)
+            chunks = [Chunk(document_id=doc_id, content=f"{i} " + "repeated text " * 50, metadata={}) for i in range(10)]
+            self.manager.insert_chunks(chunks, doc_id, conn)
+            conn.commit()
+
+            stats = self.manager.get_storage_stats(conn)
+
+            assert stats["mode"] == "zlib"
+            assert stats["total_chunks"] == stats["compressed_chunks"] == 10
+            assert stats["raw_bytes"] == sum(len(c.content) + len("{}") for c in chunks)
+            assert stats["compression_ratio"] > 5
+            assert stats["decode_sample_size"] == 10
+
+    def test_search_chunks_fts(self, sample_document_file, sample_domain_db_path):
+        """Test BM25 search matches exact codes and accent-insensitive terms, ignoring stopwords and FTS syntax in the query."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            doc_id = self.manager.insert_document_file(sample_document_file, conn)
+            contents = [
+                "O produto AB-1234 foi descontinuado.",
+                "Manual de instalação do produto XY-9.",
+                "Informações gerais sobre a empresa.",
+            ]
+            ids = self.manager.insert_chunks(
+                [Chunk(document_id=doc_id, content=content, metadata={}) for content in contents], doc_id, conn
+            )
+            conn.commit()
+
+            # Palavras funcionais ("o", "do") não casam com os demais chunks
+            assert self.manager.search_chunks_fts(conn, "Qual o status do AB-1234?", k=5) == [ids[0]]
+            assert self.manager.search_chunks_fts(conn, "O que é de", k=5) == []
+            assert self.manager.search_chunks_fts(conn, "instalacao", k=5) == [ids[1]]
+            assert self.manager.search_chunks_fts(conn, 'produto "NEAR(" OR *', k=1) in ([ids[0]], [ids[1]])
+            assert self.manager.search_chunks_fts(conn, "?!", k=5) == []
+
+    def test_fts_index_follows_compressed_chunk_deletes(self, sample_document_file, sample_domain_db_path):
+        """Test the FTS index covers compressed chunks and drops them when the document is deleted."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            self.manager.set_compression(conn, "zstd")
+            self.manager.begin(conn)
+            doc_id = self.manager.insert_document_file(sample_document_file, conn)
+            chunks = [Chunk(document_id=doc_id, content=f"Item {i} codigo ZX{i:03d} " + "texto " * 30, metadata={}) for i in range(80)]
+            ids = self.manager.insert_chunks(chunks, doc_id, conn)
+            conn.commit()
+
+            assert self.manager.search_chunks_fts(conn, "ZX042", k=5) == [ids[42]]
+
+            conn.execute("PRAGMA foreign_keys = ON")
+            self.manager.delete_document_file(sample_document_file, conn)
+
+            assert self.manager.search_chunks_fts(conn, "ZX042", k=5) == []
+            assert conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 0
+
+    def test_chunks_writable_from_plain_connections(self, sample_document_file, sample_domain_db_path):
+        """Test connections without the manager's SQL functions (sqlite3 CLI, scripts) can insert and delete chunks."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            doc_id = self.manager.insert_document_file(sample_document_file, conn)
+            self.manager.insert_chunks([Chunk(document_id=doc_id, content="Chunk indexado", metadata={})], doc_id, conn)
+            conn.commit()
+        conn.close()
+
+        with sqlite3.connect(sample_domain_db_path) as plain:
+            plain.execute(
+                "INSERT INTO chunks (document_id, content, content_hash, metadata) VALUES (?, ?, ?, ?)",
+                (doc_id, "Chunk externo", Chunk.hash_content("Chunk externo"), "{}"),
+            )
+            plain.execute("DELETE FROM chunks WHERE content = ?", ("Chunk indexado",))
+        plain.close()
+
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            # O chunk removido fora do manager deixa uma entrada órfã, ignorada na leitura dos chunks
+            assert self.manager.get_chunks(conn, chunk_ids=self.manager.search_chunks_fts(conn, "indexado", k=5)) == []
+        conn.close()
+
+    def test_domain_centroid_accumulates(self, sample_domain_db_path):
+        """Test the embedding sum and count accumulate per model and reset when the model changes."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            assert self.manager.get_domain_centroid(conn) is None
+
+            self.manager.add_to_domain_centroid(conn, "model-a", np.array([1.0, 2.0]), 2)
+            self.manager.add_to_domain_centroid(conn, "model-a", np.array([3.0, 0.0]), 1)
+            model, embedding_sum, count = self.manager.get_domain_centroid(conn)
+            assert (model, embedding_sum.tolist(), count) == ("model-a", [4.0, 2.0], 3)
+
+            self.manager.add_to_domain_centroid(conn, "model-b", np.array([1.0, 1.0, 1.0]), 1)
+            model, embedding_sum, count = self.manager.get_domain_centroid(conn)
+            assert (model, embedding_sum.tolist(), count) == ("model-b", [1.0, 1.0, 1.0], 1)
+
+    def test_remove_from_domain_centroid(self, sample_domain_db_path):
+        """Test removed chunks are subtracted from the embedding sum and count, never going below zero."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            self.manager.remove_from_domain_centroid(conn, np.array([1.0, 1.0]), 1)
+            assert self.manager.get_domain_centroid(conn) is None
+
+            self.manager.add_to_domain_centroid(conn, "model-a", np.array([4.0, 2.0]), 3)
+            self.manager.remove_from_domain_centroid(conn, np.array([3.0, 0.0]), 1)
+            model, embedding_sum, count = self.manager.get_domain_centroid(conn)
+            assert (model, embedding_sum.tolist(), count) == ("model-a", [1.0, 2.0], 2)
+
+            self.manager.remove_from_domain_centroid(conn, np.array([1.0, 2.0]), 5)
+            model, embedding_sum, count = self.manager.get_domain_centroid(conn)
+            assert (embedding_sum.tolist(), count) == ([0.0, 0.0], 0)
+
+    def test_set_invalid_compression(self, sample_domain_db_path):
+        """Test an unknown compression mode is rejected."""
+        with self.manager.get_connection(db_path=sample_domain_db_path) as conn:
+            with pytest.raises(ValueError):
+                self.manager.set_compression(conn, "lz4")
+
 
     # --- Control DB Tests ---
 